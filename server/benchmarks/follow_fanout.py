@@ -0,0 +1,195 @@
+# Benchmark de fan-out do modo espectador
+#
+# Sobe o servidor com o backend nulo (opcionalmente com --follow-workers),
+# conecta F espectadores distribuídos entre C processos clientes (para que o
+# lado cliente não seja o gargalo) e envia K comandos NEXT_SLIDE. Mede, para
+# cada slide, o tempo entre o envio do comando e a chegada do estado a cada
+# espectador, além da CPU total do servidor (processo principal + workers).
+#
+# Uso:
+#   python3 benchmarks/follow_fanout.py --followers 2000 --workers 0 --output sem_workers.json
+#   python3 benchmarks/follow_fanout.py --followers 2000 --workers 4 --output com_workers.json
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import websockets
+
+from load_test import SERVER_DIR, find_free_port, git_commit, read_cpu_seconds, summarize, wait_for_server
+
+
+# Processo cliente: conecta "count" espectadores e registra quando cada slide chega
+def client_process(uri, count, last_slide, ready, start, results):
+    async def follower(arrivals):
+        async with websockets.connect(uri, ping_interval=None, max_queue=None) as websocket:
+            await websocket.recv()  # estado inicial
+            ready.put(1)
+            async for message in websocket:
+                data = json.loads(message).get("follow")
+                if data is None:
+                    continue
+                slide = data["slide"]
+                if slide not in arrivals:
+                    arrivals[slide] = []
+                arrivals[slide].append(time.time())
+                if slide >= last_slide:
+                    return
+
+    async def run():
+        arrivals = {}
+        tasks = []
+        for index in range(count):
+            tasks.append(asyncio.create_task(follower(arrivals)))
+            if index % 100 == 99:
+                await asyncio.sleep(0)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return arrivals
+
+    start.wait()
+    results.put(asyncio.run(run()))
+
+
+# Função para somar a CPU do servidor e de seus processos filhos (workers)
+def server_cpu_seconds(pid):
+    total = read_cpu_seconds(pid)
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        children = []
+    for child in children:
+        try:
+            total += read_cpu_seconds(child)
+        except OSError:
+            pass
+    return total
+
+
+async def present(uri, slides, interval):
+    sent = {}
+    async with websockets.connect(uri, ping_interval=None) as websocket:
+        await websocket.recv()
+        await websocket.recv()
+        # Voltar ao slide 1 para que os números sejam conhecidos
+        await websocket.send(json.dumps({"command": "START_PRESENTATION"}))
+        await websocket.recv()
+        await asyncio.sleep(interval)
+        for slide in range(2, slides + 2):
+            sent[slide] = time.time()
+            await websocket.send(json.dumps({"command": "NEXT_SLIDE"}))
+            await websocket.recv()
+            await asyncio.sleep(interval)
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de fan-out do modo espectador")
+    parser.add_argument("--server", default="SlideController_X11.py", help="Script do servidor (relativo a server/)")
+    parser.add_argument("--followers", type=int, default=1000, help="Número de espectadores")
+    parser.add_argument("--workers", type=int, default=0, help="Workers de espectadores do servidor (0 = processo principal)")
+    parser.add_argument("--client-processes", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Processos clientes que dividem os espectadores")
+    parser.add_argument("--slides", type=int, default=20, help="Número de comandos NEXT_SLIDE")
+    parser.add_argument("--interval", type=float, default=0.5, help="Intervalo entre os comandos (s)")
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    port = find_free_port()
+    follow_port = find_free_port() if args.workers > 0 else port
+    last_slide = args.slides + 1
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        command = [
+            sys.executable, os.path.join(SERVER_DIR, args.server),
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--backend", "null",
+            "--max-followers", str(args.followers),
+            "--follow-workers", str(args.workers),
+            "--follow-port", str(follow_port),
+            "--stats-db", os.path.join(work_dir, "follow_stats.db"),
+        ]
+        process = subprocess.Popen(command, cwd=SERVER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            asyncio.run(wait_for_server(f"ws://127.0.0.1:{port}", process))
+            if args.workers > 0:
+                asyncio.run(wait_for_server(f"ws://127.0.0.1:{follow_port}/follow", process))
+
+            context = multiprocessing.get_context("spawn")
+            ready = context.Queue()
+            results = context.Queue()
+            start = context.Event()
+            follow_uri = f"ws://127.0.0.1:{follow_port}/follow"
+            clients = []
+            for index in range(args.client_processes):
+                count = args.followers // args.client_processes + (index < args.followers % args.client_processes)
+                client = context.Process(target=client_process, args=(follow_uri, count, last_slide, ready, start, results))
+                client.start()
+                clients.append(client)
+
+            start.set()
+            for _ in range(args.followers):
+                ready.get(timeout=120)
+            print(f"{args.followers} espectadores conectados ({args.client_processes} processo(s) cliente)")
+
+            cpu_before = server_cpu_seconds(process.pid)
+            started = time.monotonic()
+            sent = asyncio.run(present(f"ws://127.0.0.1:{port}", args.slides, args.interval))
+            arrivals = {}
+            for _ in clients:
+                for slide, times in results.get(timeout=120).items():
+                    arrivals.setdefault(slide, []).extend(times)
+            elapsed = time.monotonic() - started
+            cpu = server_cpu_seconds(process.pid) - cpu_before
+            for client in clients:
+                client.join(10)
+        finally:
+            if process.poll() is None:
+                process.send_signal(signal.SIGINT)
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    # Latência de cada entrega e tempo até o último espectador receber cada slide
+    delivery = []
+    complete = []
+    missing = 0
+    for slide, sent_at in sent.items():
+        times = arrivals.get(slide, [])
+        missing += args.followers - len(times)
+        delivery.extend((t - sent_at) * 1000 for t in times)
+        if times:
+            complete.append((max(times) - sent_at) * 1000)
+
+    report = {
+        "commit": git_commit(),
+        "cpu_count": os.cpu_count(),
+        "followers": args.followers,
+        "workers": args.workers,
+        "slides": args.slides,
+        "delivery": summarize(delivery),
+        "all_followers": summarize(complete),
+        "missing_or_skipped": missing,
+        "server_cpu_ms_per_slide": round(1000 * cpu / args.slides, 2),
+        "elapsed_s": round(elapsed, 3),
+    }
+    d, a = report["delivery"], report["all_followers"]
+    print(f"Entrega: p50={d.get('p50_ms')}ms p95={d.get('p95_ms')}ms p99={d.get('p99_ms')}ms")
+    print(f"Todos os espectadores: p50={a.get('p50_ms')}ms p95={a.get('p95_ms')}ms")
+    print(f"CPU do servidor por slide: {report['server_cpu_ms_per_slide']} ms  Estados não recebidos: {missing}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+# Teste de carga ponta a ponta do servidor WebSocket
+#
+# Sobe o servidor com o backend de entrada nulo, conecta N clientes simulados
+# que enviam uma mistura configurável de comandos de navegação, temporizador e
+# heartbeats, e salva as métricas em JSON para comparar commits na mesma máquina.
+#
+# Uso:
+#   python3 benchmarks/load_test.py --clients 50 --duration 30 --output resultado.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import websockets
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Comandos enviados por cada classe de mensagem
+NAV_COMMANDS = ["NEXT_SLIDE", "PREV_SLIDE"]
+TIMER_COMMANDS = ["TIMER_START", "TIMER_STOP", "TIMER_RESET"]
+
+# Prefixos das mensagens que o servidor envia para todos os clientes
+BROADCAST_PREFIXES = ("Clientes conectados:", "Tempo decorrido:", "ALERTA:", "Avanço automático:")
+WELCOME_PREFIX = "Conectado ao servidor"
+
+
+# Função para interpretar a mistura de mensagens (ex: "nav=70,timer=10,heartbeat=20")
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("nav", "timer", "heartbeat"):
+            raise argparse.ArgumentTypeError(f"Classe de mensagem desconhecida: {name}")
+        mix[name] = float(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("A mistura precisa de pelo menos um peso positivo")
+    return mix
+
+
+# Função para calcular percentil (nearest-rank) de uma lista ordenada
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+# Função para resumir uma lista de latências em milissegundos
+def summarize(values):
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3),
+    }
+
+
+# Função para encontrar uma porta TCP livre
+def find_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Funções para ler CPU e memória do processo do servidor (Linux, via /proc)
+def read_cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime e stime são os campos 14 e 15 (contando a partir de 1)
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def read_memory_kb(pid):
+    memory = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, value = line.split(":", 1)
+                memory[key] = int(value.split()[0])
+    return memory.get("VmRSS", 0), memory.get("VmHWM", 0)
+
+
+# Função para obter o commit atual (para identificar o resultado)
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SERVER_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+# Cliente simulado
+class SimulatedClient:
+    def __init__(self, index, args, results):
+        self.index = index
+        self.args = args
+        self.results = results
+        self.rng = random.Random(args.seed + index)
+        self.pending = None
+        self.broadcast_seen = {}
+        self.websocket = None
+
+    def choose_message(self):
+        classes = list(self.args.mix.keys())
+        weights = list(self.args.mix.values())
+        kind = self.rng.choices(classes, weights)[0]
+        if kind == "nav":
+            return kind, {"command": self.rng.choice(NAV_COMMANDS)}
+        if kind == "timer":
+            return kind, {"command": self.rng.choice(TIMER_COMMANDS)}
+        return kind, {"heartbeat": int(time.time() * 1000)}
+
+    async def connect(self, uri):
+        self.websocket = await websockets.connect(uri, ping_interval=None, max_queue=None)
+
+    async def receive_loop(self):
+        try:
+            async for message in self.websocket:
+                now = time.perf_counter()
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    continue
+                if "heartbeat" in data:
+                    # Eco do heartbeat: RTT a partir do timestamp enviado (ms)
+                    if self.results["measuring"]:
+                        self.results["heartbeat_rtt"].append(time.time() * 1000 - data["heartbeat"])
+                    continue
+                status = data.get("status")
+                if not isinstance(status, str) or status.startswith(WELCOME_PREFIX):
+                    continue
+                if status.startswith(BROADCAST_PREFIXES):
+                    # A mesma mensagem pode se repetir (ex: após TIMER_RESET);
+                    # a ocorrência diferencia cada envio
+                    occurrence = self.broadcast_seen.get(status, 0)
+                    self.broadcast_seen[status] = occurrence + 1
+                    if self.results["measuring"]:
+                        self.results["broadcasts"].setdefault((status, occurrence), []).append(now)
+                elif self.pending is not None and not self.pending.done():
+                    self.pending.set_result(now)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def send_loop(self, deadline):
+        loop = asyncio.get_running_loop()
+        while time.perf_counter() < deadline:
+            # A última espera não passa do fim da medição (senão entraria no tempo decorrido)
+            await asyncio.sleep(min(self.rng.expovariate(self.args.rate), deadline - time.perf_counter()))
+            if time.perf_counter() >= deadline:
+                break
+            kind, payload = self.choose_message()
+            self.results["sent"][kind] += 1
+            if kind == "heartbeat":
+                await self.websocket.send(json.dumps(payload))
+                continue
+            self.pending = loop.create_future()
+            sent_at = time.perf_counter()
+            await self.websocket.send(json.dumps(payload))
+            try:
+                acked_at = await asyncio.wait_for(self.pending, self.args.ack_timeout)
+                self.results["ack_latencies"][kind].append((acked_at - sent_at) * 1000)
+            except asyncio.TimeoutError:
+                self.results["timeouts"] += 1
+            finally:
+                self.pending = None
+
+
+# Função para aguardar o servidor aceitar conexões
+async def wait_for_server(uri, process, timeout=30):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"Servidor encerrou com código {process.returncode}")
+        try:
+            websocket = await websockets.connect(uri, ping_interval=None)
+            await websocket.close()
+            return time.perf_counter() - start
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError("Tempo esgotado aguardando o servidor")
+
+
+async def run_load(args, process, uri):
+    results = {
+        "measuring": False,
+        "sent": {"nav": 0, "timer": 0, "heartbeat": 0},
+        "ack_latencies": {"nav": [], "timer": []},
+        "heartbeat_rtt": [],
+        "broadcasts": {},
+        "timeouts": 0,
+    }
+    results["startup_s"] = await wait_for_server(uri, process)
+
+    # Conectar os clientes em lotes para não saturar o accept
+    clients = [SimulatedClient(i, args, results) for i in range(args.clients)]
+    connect_started = time.perf_counter()
+    for start in range(0, len(clients), args.connect_batch):
+        batch = clients[start:start + args.connect_batch]
+        await asyncio.gather(*[client.connect(uri) for client in batch])
+    results["connect_s"] = time.perf_counter() - connect_started
+    receivers = [asyncio.create_task(client.receive_loop()) for client in clients]
+
+    # Deixar os broadcasts de conexão assentarem antes de medir
+    await asyncio.sleep(args.warmup)
+
+    if args.start_timer:
+        await clients[0].websocket.send(json.dumps({"command": "TIMER_START"}))
+
+    cpu_before = read_cpu_seconds(process.pid)
+    results["measuring"] = True
+    measure_started = time.perf_counter()
+    deadline = measure_started + args.duration
+    await asyncio.gather(*[client.send_loop(deadline) for client in clients])
+    elapsed = time.perf_counter() - measure_started
+    results["measuring"] = False
+    cpu_after = read_cpu_seconds(process.pid)
+    rss_kb, peak_rss_kb = read_memory_kb(process.pid)
+
+    for client in clients:
+        await client.websocket.close()
+    await asyncio.gather(*receivers, return_exceptions=True)
+
+    results["elapsed_s"] = elapsed
+    results["server_cpu_s"] = cpu_after - cpu_before
+    results["server_rss_kb"] = rss_kb
+    results["server_peak_rss_kb"] = peak_rss_kb
+    return results
+
+
+# Função para montar o relatório final
+def build_report(args, results):
+    elapsed = results["elapsed_s"]
+    acked = sum(len(values) for values in results["ack_latencies"].values())
+    all_acks = [v for values in results["ack_latencies"].values() for v in values]
+
+    # Latência de fan-out: do primeiro ao último cliente que recebeu o mesmo broadcast
+    fanout = []
+    for times in results["broadcasts"].values():
+        if len(times) > 1:
+            fanout.append((max(times) - min(times)) * 1000)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "params": {
+            "server": args.server,
+            "clients": args.clients,
+            "duration_s": args.duration,
+            "rate_per_client": args.rate,
+            "mix": args.mix,
+            "seed": args.seed,
+        },
+        "results": {
+            "startup_s": round(results["startup_s"], 4),
+            "connect_all_s": round(results["connect_s"], 4),
+            "messages_sent": results["sent"],
+            "commands_acked": acked,
+            "ack_timeouts": results["timeouts"],
+            "throughput_cmd_s": round(acked / elapsed, 2),
+            "throughput_msg_s": round(sum(results["sent"].values()) / elapsed, 2),
+            "ack_latency": summarize(all_acks),
+            "ack_latency_by_class": {
+                kind: summarize(values) for kind, values in results["ack_latencies"].items()
+            },
+            "broadcast_fanout": summarize(fanout),
+            "heartbeat_rtt": summarize(results["heartbeat_rtt"]),
+            "server_cpu_percent": round(100 * results["server_cpu_s"] / elapsed, 2),
+            "server_rss_kb": results["server_rss_kb"],
+            "server_peak_rss_kb": results["server_peak_rss_kb"],
+        },
+    }
+
+
+def print_report(report):
+    r = report["results"]
+    print(f"Clientes: {report['params']['clients']}  Duração: {report['params']['duration_s']}s")
+    print(f"Vazão: {r['throughput_cmd_s']} comandos/s ({r['throughput_msg_s']} mensagens/s)")
+    ack = r["ack_latency"]
+    if ack["count"]:
+        print(f"Latência de confirmação: p50={ack['p50_ms']}ms p95={ack['p95_ms']}ms p99={ack['p99_ms']}ms")
+    fan = r["broadcast_fanout"]
+    if fan["count"]:
+        print(f"Fan-out de broadcast: p50={fan['p50_ms']}ms p95={fan['p95_ms']}ms p99={fan['p99_ms']}ms")
+    rtt = r["heartbeat_rtt"]
+    if rtt["count"]:
+        print(f"RTT do heartbeat: p50={rtt['p50_ms']}ms p95={rtt['p95_ms']}ms")
+    print(f"Timeouts: {r['ack_timeouts']}")
+    print(f"Servidor: CPU {r['server_cpu_percent']}%  RSS {r['server_rss_kb']} kB (pico {r['server_peak_rss_kb']} kB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do servidor de apresentações")
+    parser.add_argument("--server", default="SlideController_X11.py", help="Script do servidor (relativo a server/)")
+    parser.add_argument("--clients", type=int, default=50, help="Número de clientes simulados")
+    parser.add_argument("--duration", type=float, default=30, help="Duração da medição em segundos")
+    parser.add_argument("--rate", type=float, default=2.0, help="Mensagens por segundo por cliente (média)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("nav=70,timer=10,heartbeat=20"),
+                        help="Pesos das classes de mensagem (nav, timer, heartbeat)")
+    parser.add_argument("--seed", type=int, default=1, help="Semente do gerador aleatório")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Espera após conectar, em segundos")
+    parser.add_argument("--connect-batch", type=int, default=50, help="Conexões abertas em paralelo")
+    parser.add_argument("--ack-timeout", type=float, default=5.0, help="Tempo máximo de espera por confirmação")
+    parser.add_argument("--no-timer", dest="start_timer", action="store_false",
+                        help="Não iniciar o temporizador (sem broadcasts periódicos)")
+    parser.add_argument("--rate-limit", action="store_true", help="Manter o limite de mensagens por cliente do servidor")
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    parser.add_argument("--server-log", default=os.devnull, help="Arquivo para a saída do servidor")
+    args = parser.parse_args()
+
+    port = find_free_port()
+    uri = f"ws://127.0.0.1:{port}"
+
+    # Banco (e journal) temporários: o teste não toca nas estatísticas reais
+    with tempfile.TemporaryDirectory() as work_dir, open(args.server_log, "w") as server_log:
+        command = [
+            sys.executable, os.path.join(SERVER_DIR, args.server),
+            "--host", "127.0.0.1",
+            "--port", str(port),
+            "--max-clients", str(args.clients + 1),
+            "--backend", "null",
+            "--stats-db", os.path.join(work_dir, "load_stats.db"),
+        ]
+        # Sem o limite de mensagens por cliente, para que taxas altas meçam o servidor e não o limitador
+        if not args.rate_limit:
+            command.append("--no-rate-limit")
+
+        process = subprocess.Popen(command, cwd=SERVER_DIR, stdout=server_log, stderr=subprocess.STDOUT)
+        try:
+            results = asyncio.run(run_load(args, process, uri))
+        finally:
+            # Encerrar o servidor como o Ctrl+C faria
+            if process.poll() is None:
+                process.send_signal(signal.SIGINT)
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    report = build_report(args, results)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
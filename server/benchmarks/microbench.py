@@ -0,0 +1,264 @@
+# Microbenchmarks do caminho de cada comando no servidor
+#
+# Mede isoladamente cada etapa do processamento de uma mensagem: parse do JSON
+# (biblioteca padrão e codec do servidor), reconhecimento de heartbeats sem
+# decodificar (caminho rápido), validação pelo esquema, despacho em
+# control_presentation, atualização dos contadores, enfileiramento e escrita
+# (unitária e em lote) no SQLite, serialização do status (a cada resposta e
+# pelo cache de frames), broadcast_status para sockets falsos, criação de uma
+# sala (o B/op é o tamanho de uma sala vazia), busca da sala pelo caminho e
+# pelo código, publicação do estado para 5 e 500 espectadores falsos e
+# cálculo do delta do estado versionado da sala.
+# Reporta ns/op e bytes alocados por op (pico do tracemalloc).
+#
+# Uso:
+#   python3 benchmarks/microbench.py [--filter broadcast] [--json resultado.json]
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+
+# Socket falso que apenas conta as mensagens enviadas
+class FakeSocket:
+    def __init__(self, index):
+        self.remote_address = ("127.0.0.1", 50000 + index)
+        self.subprotocol = None
+        self.sent = 0
+
+    async def send(self, message):
+        self.sent += 1
+
+
+# Conexão falsa de espectador, com a interface usada por broadcast()
+class FakeFollower:
+    class Protocol:
+        def __init__(self):
+            from websockets.protocol import State
+            self.state = State.OPEN
+            self.sent = 0
+
+        def send_text(self, data):
+            self.sent += 1
+
+    class Transport:
+        def get_write_buffer_size(self):
+            return 0
+
+    def __init__(self):
+        self.protocol = self.Protocol()
+        self.transport = self.Transport()
+        self.send_in_progress = None
+
+    def send_data(self):
+        pass
+
+
+# Função para carregar o núcleo do servidor com o backend de entrada nulo
+def load_server(db_dir):
+    from slidecontroller import core, rooms, stats
+
+    # Manter a formatação dos logs no custo medido, mas sem escrever no terminal
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        handlers=[logging.StreamHandler(open(os.devnull, "w"))]
+    )
+
+    core.config = {"max_clients": 10, "backend": "null"}
+    rooms.create_rooms(core.config)
+    stats.init_stats_db(os.path.join(db_dir, "bench_stats.db"))
+    for number in range(2, 101):
+        rooms.add_room(f"sala-{number}", rooms.rooms[rooms.DEFAULT_ROOM].backend)
+    rooms.rooms[rooms.DEFAULT_ROOM].stats.session_id = 1
+    return core
+
+
+# Função para definir os benchmarks (nome, função, é assíncrona)
+def build_benchmarks(server):
+    from slidecontroller import codec, follow, rooms, schema, state, stats
+    from slidecontroller.backends import NullBackend
+    room = rooms.rooms[rooms.DEFAULT_ROOM]
+    join_code = rooms.rooms["sala-50"].join_code
+    follow_room = rooms.rooms["sala-2"]
+
+    # Cada publicação muda o slide, para que o estado nunca seja igual ao anterior
+    def publish_with(count):
+        followers = {FakeFollower() for _ in range(count)}
+
+        def publish():
+            follow_room.followers = followers
+            follow_room.slide += 1
+            follow.publish(follow_room)
+        return publish
+    message = '{"command": "NEXT_SLIDE"}'
+    data = {"command": "NEXT_SLIDE"}
+    skip_data = {"command": "SKIP_SLIDES", "count": 0}
+    goto_data = {"command": "GOTO_SLIDE", "number": 12}
+    heartbeat = '{"heartbeat":1760000000000}'
+    unknown_data = {"command": "UNKNOWN"}
+    result = "Avançou para o próximo slide"
+    row = [(1, "2026-01-01T10:00:00", "NEXT_SLIDE", "127.0.0.1", None)]
+
+    benchmarks = [
+        ("json_parse", lambda: json.loads(message), False),
+        (f"codec_parse_{codec.name}", lambda: codec.loads(message), False),
+        ("heartbeat_fast_path", lambda: server.keepalive_kind(heartbeat), False),
+        ("heartbeat_fast_path_miss", lambda: server.keepalive_kind(message), False),
+        ("schema_validate_next_slide", lambda: schema.validate(data), False),
+        ("schema_validate_goto_slide", lambda: schema.validate(goto_data), False),
+        ("schema_validate_unknown", lambda: schema.validate(unknown_data), False),
+        ("dispatch_next_slide", lambda: server.control_presentation(room, "NEXT_SLIDE", data), False),
+        ("dispatch_skip_slides_0", lambda: server.control_presentation(room, "SKIP_SLIDES", skip_data), False),
+        ("dispatch_unknown", lambda: server.control_presentation(room, "UNKNOWN", data), False),
+        ("stats_update", lambda: stats.record_command_stats(room.stats, "NEXT_SLIDE"), False),
+        ("sqlite_enqueue", lambda: (stats.save_command(room.stats, "NEXT_SLIDE", "127.0.0.1"), stats.command_queue.get_nowait()), False),
+        ("sqlite_write_1", lambda: stats.write_commands(row), False),
+        ("sqlite_write_batch_100", lambda: stats.write_commands(row * 100), False),
+        ("status_serialize", lambda: json.dumps({"status": result}), False),
+        ("status_frame_cached", lambda: codec.status_frame(result), False),
+        ("room_create", lambda: rooms.Room("bench", NullBackend(), "000000"), False),
+        ("room_lookup_path", lambda: rooms.find_room("/sala-50"), False),
+        ("room_lookup_code", lambda: rooms.find_room(f"/join/{join_code}"), False),
+        ("follow_publish_5", publish_with(5), False),
+        ("follow_publish_500", publish_with(500), False),
+        ("state_publish_delta", lambda: (setattr(follow_room, "slide", follow_room.slide + 1), state.publish(follow_room)), False),
+    ]
+
+    for count in (1, 10, 100):
+        clients = {FakeSocket(i) for i in range(count)}
+
+        async def broadcast(clients=clients):
+            room.clients = clients
+            await server.broadcast_status(room, result)
+
+        benchmarks.append((f"broadcast_status_{count}", broadcast, True))
+
+    return benchmarks
+
+
+# Função para medir o tempo total de n execuções
+def time_sync(func, n):
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        func()
+    return time.perf_counter_ns() - start
+
+
+def time_async(loop, func, n):
+    async def runner():
+        start = time.perf_counter_ns()
+        for _ in range(n):
+            await func()
+        return time.perf_counter_ns() - start
+    return loop.run_until_complete(runner())
+
+
+# Função para medir bytes alocados por op (pico acima do uso anterior)
+def measure_allocations(loop, func, is_async, samples):
+    if is_async:
+        async def call():
+            await func()
+        run = lambda: loop.run_until_complete(call())
+    else:
+        run = func
+
+    run()  # aquecer caches antes de medir
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            if is_async:
+                # Medir dentro do loop para não contar a criação da tarefa
+                async def measured():
+                    before = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.reset_peak()
+                    await func()
+                    return tracemalloc.get_traced_memory()[1] - before
+                peaks.append(loop.run_until_complete(measured()))
+            else:
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                func()
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.median(peaks)
+
+
+def run_benchmark(loop, name, func, is_async, min_time, repeat, alloc_samples):
+    timer = (lambda n: time_async(loop, func, n)) if is_async else (lambda n: time_sync(func, n))
+
+    # Calibrar o número de iterações para durar pelo menos min_time
+    n = 1
+    while True:
+        elapsed = timer(n)
+        if elapsed >= min_time * 1e9 or n >= 10_000_000:
+            break
+        n *= 10 if elapsed < min_time * 1e8 else 2
+
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        runs = [timer(n) / n for _ in range(repeat)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return {
+        "name": name,
+        "iterations": n,
+        "ns_per_op": round(min(runs), 1),
+        "ns_per_op_median": round(statistics.median(runs), 1),
+        "bytes_per_op": measure_allocations(loop, func, is_async, alloc_samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks do caminho de comandos do servidor")
+    parser.add_argument("--filter", help="Executar apenas benchmarks cujo nome contém este texto")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Duração mínima de cada repetição (s)")
+    parser.add_argument("--repeat", type=int, default=5, help="Número de repetições")
+    parser.add_argument("--alloc-samples", type=int, default=200, help="Amostras para medir alocações")
+    parser.add_argument("--json", help="Salvar resultados em JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        server = load_server(db_dir)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        results = []
+        print(f"{'benchmark':<28} {'ns/op':>12} {'mediana':>12} {'B/op':>8}")
+        for name, func, is_async in build_benchmarks(server):
+            if args.filter and args.filter not in name:
+                continue
+            result = run_benchmark(loop, name, func, is_async, args.min_time, args.repeat, args.alloc_samples)
+            results.append(result)
+            print(f"{name:<28} {result['ns_per_op']:>12.1f} {result['ns_per_op_median']:>12.1f} {result['bytes_per_op']:>8}")
+        loop.close()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Resultados salvos em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Comparação entre o protocolo JSON e o protocolo binário (slidecontroller.bin)
+#
+# Para mensagens representativas nos dois sentidos (comandos do cliente,
+# respostas, broadcasts do temporizador e pings), reporta o tamanho em bytes
+# de cada codificação e o tempo de codificação e decodificação (ns/op).
+# Os comandos são decodificados como no servidor (json.loads ou
+# wire.decode_command); as mensagens do servidor, como no cliente.
+#
+# Uso:
+#   python3 benchmarks/protocol_bench.py [--json protocolo.json]
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from slidecontroller import wire
+
+
+# Função para definir as mensagens: (nome, conteúdo JSON, codifica binário, decodifica binário)
+def build_messages():
+    notes = "Lembrar de mostrar o gráfico de vendas e abrir para perguntas. " * 4
+    return [
+        ("next_slide", {"command": "NEXT_SLIDE"},
+         lambda: wire.encode_command("NEXT_SLIDE"), wire.decode_command),
+        ("skip_slides", {"command": "SKIP_SLIDES", "count": -3},
+         lambda: wire.encode_command("SKIP_SLIDES", count=-3), wire.decode_command),
+        ("goto_slide", {"command": "GOTO_SLIDE", "number": 42},
+         lambda: wire.encode_command("GOTO_SLIDE", number=42), wire.decode_command),
+        ("publish_notes", {"command": "PUBLISH_NOTES", "notes": notes},
+         lambda: wire.encode_command("PUBLISH_NOTES", notes=notes), wire.decode_command),
+        ("result", {"status": "Avançou para o próximo slide"},
+         lambda: wire.encode_result(wire.NEXT_SLIDE_OK, 12), wire.decode_event),
+        ("timer", {"status": "Tempo: 00:14:03"},
+         lambda: wire.encode_event(wire.TIMER, 843), wire.decode_event),
+        ("clients", {"status": "Clientes conectados: 3"},
+         lambda: wire.encode_event(wire.CLIENTS, 3), wire.decode_event),
+        ("ping", {"ping": int(time.time())},
+         lambda: wire.encode_event(wire.PING, int(time.time())), wire.decode_event),
+    ]
+
+
+# Função para medir ns/op (melhor de "repeat" repetições de pelo menos min_time)
+def measure(func, min_time, repeat):
+    n = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(n):
+            func()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9 or n >= 10_000_000:
+            break
+        n *= 10 if elapsed < min_time * 1e8 else 2
+
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(n):
+            func()
+        runs.append((time.perf_counter_ns() - start) / n)
+    return round(min(runs), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparação entre os protocolos JSON e binário")
+    parser.add_argument("--min-time", type=float, default=0.1, help="Duração mínima de cada repetição (s)")
+    parser.add_argument("--repeat", type=int, default=5, help="Número de repetições")
+    parser.add_argument("--json", help="Salvar resultados em JSON")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'mensagem':<16} {'JSON B':>7} {'bin B':>6} {'JSON enc':>9} {'bin enc':>8} {'JSON dec':>9} {'bin dec':>8}  (ns/op)")
+    for name, payload, encode_binary, decode_binary in build_messages():
+        text = json.dumps(payload)
+        data = encode_binary()
+        result = {
+            "name": name,
+            "json_bytes": len(text.encode("utf-8")),
+            "binary_bytes": len(data),
+            "json_encode_ns": measure(lambda: json.dumps(payload), args.min_time, args.repeat),
+            "binary_encode_ns": measure(encode_binary, args.min_time, args.repeat),
+            "json_decode_ns": measure(lambda: json.loads(text), args.min_time, args.repeat),
+            "binary_decode_ns": measure(lambda: decode_binary(data), args.min_time, args.repeat),
+        }
+        results.append(result)
+        print(f"{name:<16} {result['json_bytes']:>7} {result['binary_bytes']:>6} "
+              f"{result['json_encode_ns']:>9.1f} {result['binary_encode_ns']:>8.1f} "
+              f"{result['json_decode_ns']:>9.1f} {result['binary_decode_ns']:>8.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, f, indent=2)
+        print(f"Resultados salvos em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
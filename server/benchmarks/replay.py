@@ -0,0 +1,284 @@
+# Replay determinístico de sessões gravadas
+#
+# Lê os comandos de uma sessão da tabela "commands" do presentation_stats.db
+# (ou de um export NDJSON com "timestamp", "command", "client_ip" e "args") e
+# os reenvia ao servidor na mesma ordem, em 1x ou acelerado. Cada cliente
+# original ganha sua própria conexão; o próximo comando só é enviado após a
+# confirmação do anterior, para que a ordem de execução seja sempre a mesma.
+#
+# Com --spawn, o script sobe o servidor com o backend "recording" e pode
+# salvar (--save-keys) ou comparar (--expect-keys) a sequência de teclas
+# injetadas, por exemplo antes e depois de uma otimização.
+#
+# Os avanços do avanço automático (client_ip "auto") não são reenviados: o
+# AUTO_ADVANCE_START da sessão faz o servidor avançar sozinho de novo.
+#
+# Uso:
+#   python3 benchmarks/replay.py --db presentation_stats.db --session 12 --speed 10 --spawn --save-keys antes.ndjson
+#   python3 benchmarks/replay.py --ndjson sessao.ndjson --speed 0 --spawn --expect-keys antes.ndjson
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime
+
+import websockets
+
+from load_test import BROADCAST_PREFIXES, SERVER_DIR, WELCOME_PREFIX, find_free_port, summarize, wait_for_server
+
+# Origem dos comandos do avanço automático (também como hash, no registro binário convertido)
+AUTO_ADVANCE_CLIENTS = ("auto", f"hash:{zlib.crc32(b'auto'):08x}")
+
+
+# Função para ler os comandos de uma sessão do banco de estatísticas
+def load_from_db(path, session=None):
+    conn = sqlite3.connect(path)
+    try:
+        if session is None:
+            # Última sessão que tem comandos registrados
+            row = conn.execute("SELECT MAX(session_id) FROM commands").fetchone()
+            session = row[0]
+            if session is None:
+                return None, []
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(commands)")]
+        args_column = "args" if "args" in columns else "NULL"
+        rows = conn.execute(
+            f"SELECT timestamp, command, client_ip, {args_column} FROM commands WHERE session_id=? ORDER BY id",
+            (session,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    commands = []
+    for timestamp, command, client_ip, args in rows:
+        if client_ip in AUTO_ADVANCE_CLIENTS:
+            continue
+        commands.append({
+            "timestamp": timestamp,
+            "command": command,
+            "client_ip": client_ip or "replay",
+            "args": json.loads(args) if args else {},
+        })
+    return session, commands
+
+
+# Função para ler os comandos de um export NDJSON
+def load_from_ndjson(path):
+    commands = []
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "command" not in entry or entry.get("client_ip") in AUTO_ADVANCE_CLIENTS:
+                continue
+            commands.append({
+                "timestamp": entry["timestamp"],
+                "command": entry["command"],
+                "client_ip": entry.get("client_ip") or "replay",
+                "args": entry.get("args") or {},
+            })
+    return commands
+
+
+# Função para converter os timestamps ISO em deslocamentos (s) desde o primeiro comando
+def schedule_offsets(commands):
+    if not commands:
+        return []
+    start = datetime.fromisoformat(commands[0]["timestamp"])
+    return [(datetime.fromisoformat(c["timestamp"]) - start).total_seconds() for c in commands]
+
+
+# Conexão de replay de um cliente original
+class ReplayClient:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.pending = None
+
+    async def receive_loop(self):
+        try:
+            async for message in self.websocket:
+                try:
+                    data = json.loads(message)
+                except ValueError:
+                    continue
+                status = data.get("status")
+                if not isinstance(status, str) or status.startswith((WELCOME_PREFIX,) + BROADCAST_PREFIXES):
+                    continue
+                if self.pending is not None and not self.pending.done():
+                    self.pending.set_result((time.perf_counter(), status))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+
+async def replay(commands, uri, speed, ack_timeout):
+    loop = asyncio.get_running_loop()
+    offsets = schedule_offsets(commands)
+
+    # Uma conexão por cliente original
+    clients = {}
+    receivers = []
+    for client_ip in dict.fromkeys(c["client_ip"] for c in commands):
+        websocket = await websockets.connect(uri, ping_interval=None, max_queue=None)
+        clients[client_ip] = ReplayClient(websocket)
+        receivers.append(asyncio.create_task(clients[client_ip].receive_loop()))
+
+    latencies = []
+    replies = []
+    lag = []
+    started = time.monotonic()
+    for command, offset in zip(commands, offsets):
+        if speed > 0:
+            # Agendar contra o relógio monotônico, sem acumular atraso
+            target = started + offset / speed
+            delay = target - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lag.append(max(0.0, time.monotonic() - target) * 1000)
+
+        client = clients[command["client_ip"]]
+        payload = dict(command["args"])
+        payload["command"] = command["command"]
+        client.pending = loop.create_future()
+        sent_at = time.perf_counter()
+        await client.websocket.send(json.dumps(payload))
+        try:
+            acked_at, status = await asyncio.wait_for(client.pending, ack_timeout)
+            latencies.append((acked_at - sent_at) * 1000)
+            replies.append(status)
+        except asyncio.TimeoutError:
+            replies.append(None)
+        finally:
+            client.pending = None
+    elapsed = time.monotonic() - started
+
+    for client in clients.values():
+        await client.websocket.close()
+    await asyncio.gather(*receivers, return_exceptions=True)
+
+    return {
+        "commands": len(commands),
+        "clients": len(clients),
+        "elapsed_s": round(elapsed, 3),
+        "original_duration_s": round(offsets[-1], 3) if offsets else 0,
+        "timeouts": replies.count(None),
+        "ack_latency": summarize(latencies),
+        "schedule_lag": summarize(lag),
+    }
+
+
+# Função para ler a sequência de teclas gravada pelo backend recording
+def load_keys(path):
+    keys = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                keys.append((entry["event"], entry["key"]))
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de sessões gravadas contra o servidor")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--db", help="Banco de estatísticas (presentation_stats.db)")
+    source.add_argument("--ndjson", help="Export NDJSON de comandos")
+    parser.add_argument("--session", type=int, help="Sessão a reproduzir (padrão: a última com comandos)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Velocidade (1 = tempo real, 0 = sem espera)")
+    parser.add_argument("--uri", default="ws://127.0.0.1:10696", help="Servidor alvo (ignorado com --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="Subir o servidor com o backend recording")
+    parser.add_argument("--server", default="SlideController_X11.py", help="Script do servidor (com --spawn)")
+    parser.add_argument("--save-keys", help="Salvar a sequência de teclas injetadas (com --spawn)")
+    parser.add_argument("--expect-keys", help="Comparar com uma sequência de teclas salva (com --spawn)")
+    parser.add_argument("--ack-timeout", type=float, default=10.0, help="Tempo máximo de espera por confirmação")
+    parser.add_argument("--output", help="Arquivo JSON de saída")
+    args = parser.parse_args()
+
+    if args.db:
+        session, commands = load_from_db(args.db, args.session)
+        print(f"Sessão {session}: {len(commands)} comandos")
+    else:
+        commands = load_from_ndjson(args.ndjson)
+        print(f"{len(commands)} comandos lidos de {args.ndjson}")
+    if not commands:
+        print("Nada para reproduzir")
+        return 1
+
+    if not args.spawn:
+        report = asyncio.run(replay(commands, args.uri, args.speed, args.ack_timeout))
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            keys_file = os.path.join(work_dir, "keys.ndjson")
+            port = find_free_port()
+            uri = f"ws://127.0.0.1:{port}"
+            process = subprocess.Popen([
+                sys.executable, os.path.join(SERVER_DIR, args.server),
+                "--host", "127.0.0.1",
+                "--port", str(port),
+                "--max-clients", "1000",
+                "--backend", "recording",
+                "--record-file", keys_file,
+                "--stats-db", os.path.join(work_dir, "replay_stats.db"),
+                # Replays acelerados excedem o limite de mensagens de um cliente real
+                "--no-rate-limit",
+            ], cwd=SERVER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+            async def spawn_and_replay():
+                await wait_for_server(uri, process)
+                return await replay(commands, uri, args.speed, args.ack_timeout)
+
+            try:
+                report = asyncio.run(spawn_and_replay())
+            finally:
+                if process.poll() is None:
+                    process.send_signal(signal.SIGINT)
+                    try:
+                        process.wait(timeout=10)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+
+            keys = load_keys(keys_file) if os.path.exists(keys_file) else []
+            report["keys_injected"] = len(keys)
+            if args.save_keys:
+                with open(keys_file, encoding="utf-8") as src, open(args.save_keys, "w", encoding="utf-8") as dst:
+                    dst.write(src.read())
+                print(f"Sequência de teclas salva em {args.save_keys}")
+            if args.expect_keys:
+                expected = load_keys(args.expect_keys)
+                mismatch = next(
+                    (i for i, (a, b) in enumerate(zip(expected, keys)) if a != b),
+                    None if len(expected) == len(keys) else min(len(expected), len(keys))
+                )
+                report["keys_match"] = mismatch is None
+                if mismatch is not None:
+                    report["first_mismatch"] = mismatch
+                    print(f"Sequência de teclas DIFERENTE a partir do evento {mismatch} "
+                          f"(esperado {len(expected)} eventos, obtido {len(keys)})")
+                else:
+                    print(f"Sequência de teclas idêntica ({len(keys)} eventos)")
+
+    print(f"{report['commands']} comandos de {report['clients']} cliente(s) em {report['elapsed_s']}s "
+          f"(original: {report['original_duration_s']}s)")
+    ack = report["ack_latency"]
+    if ack["count"]:
+        print(f"Latência de confirmação: p50={ack['p50_ms']}ms p95={ack['p95_ms']}ms p99={ack['p99_ms']}ms")
+    print(f"Timeouts: {report['timeouts']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados salvos em {args.output}")
+    return 0 if report.get("keys_match", True) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+# Comparação entre os motores de estatísticas: tabela "commands" do SQLite e registro binário
+#
+# Grava o mesmo conjunto de comandos (mistura de NEXT_SLIDE, PREV_SLIDE,
+# GOTO_SLIDE e SKIP_SLIDES de 3 clientes) com cada motor, como o servidor:
+# no SQLite, save_command enfileira no loop de eventos e a thread grava em
+# lotes de WRITE_BATCH_SIZE (aqui na mesma thread, em sequência); no
+# registro binário, save_command grava direto no segmento. Reporta o custo
+# por comando no loop de eventos e no total (tempo de parede e de CPU), o
+# tamanho em disco por comando (banco com índices, segmentos com cabeçalho)
+# e o custo de leitura de todos os comandos (SELECT ou mmap).
+#
+# Uso:
+#   python3 benchmarks/stats_engine_bench.py [--commands 100000] [--json estatisticas.json]
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from slidecontroller import cmdlog, stats
+
+
+# Função para gerar os comandos: (comando, endereço do cliente, argumentos)
+def build_commands(count):
+    mix = [
+        ("NEXT_SLIDE", None), ("NEXT_SLIDE", None), ("NEXT_SLIDE", None), ("PREV_SLIDE", None),
+        ("GOTO_SLIDE", {"number": 12}), ("SKIP_SLIDES", {"count": -3}),
+    ]
+    clients = ["192.168.0.10", "192.168.0.11", "10.0.0.7"]
+    return [(mix[i % len(mix)][0], clients[i % len(clients)], mix[i % len(mix)][1]) for i in range(count)]
+
+
+# Função para medir (tempo de parede, tempo de CPU) de uma função, em segundos
+def timed(func):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    func()
+    return time.perf_counter() - wall, time.process_time() - cpu
+
+
+# Motor SQLite: enfileirar (loop de eventos) e gravar em lotes (thread de escrita)
+def bench_sqlite(directory, commands):
+    db_path = os.path.join(directory, "bench_stats.db")
+    stats.init_stats_db(db_path)
+    empty_size = os.path.getsize(db_path)
+    session = stats.StatsSession()
+    session.session_id = 1
+
+    def enqueue():
+        for command, client_ip, args in commands:
+            stats.save_command(session, command, client_ip, args)
+
+    def write():
+        rows = []
+        while not stats.command_queue.empty():
+            rows.append(stats.command_queue.get_nowait()[1])
+            if len(rows) == stats.WRITE_BATCH_SIZE:
+                stats.write_commands(rows)
+                rows = []
+        if rows:
+            stats.write_commands(rows)
+
+    def read():
+        import sqlite3
+        conn = sqlite3.connect(db_path)
+        for _ in conn.execute("SELECT session_id, timestamp, command, client_ip, args FROM commands"):
+            pass
+        conn.close()
+
+    loop_wall, loop_cpu = timed(enqueue)
+    write_wall, write_cpu = timed(write)
+    read_wall, _ = timed(read)
+    return {
+        "loop": (loop_wall, loop_cpu),
+        "total": (loop_wall + write_wall, loop_cpu + write_cpu),
+        "read": read_wall,
+        "bytes": os.path.getsize(db_path) - empty_size,
+    }
+
+
+# Motor binlog: cada comando é gravado no segmento pelo próprio loop de eventos
+def bench_binlog(directory, commands):
+    log_dir = os.path.join(directory, "bench_stats.cmdlog")
+    session = stats.StatsSession()
+    session.session_id = 1
+    stats.command_log = cmdlog.CommandLog(log_dir)
+
+    def append():
+        for command, client_ip, args in commands:
+            stats.save_command(session, command, client_ip, args)
+        stats.command_log.close()
+
+    def read():
+        for _ in cmdlog.read_records(log_dir):
+            pass
+
+    try:
+        loop_wall, loop_cpu = timed(append)
+    finally:
+        stats.command_log = None
+    read_wall, _ = timed(read)
+    size = sum(os.path.getsize(path) for _, _, path in cmdlog.list_segments(log_dir))
+    return {
+        "loop": (loop_wall, loop_cpu),
+        "total": (loop_wall, loop_cpu),
+        "read": read_wall,
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparação entre os motores de estatísticas")
+    parser.add_argument("--commands", type=int, default=100_000, help="Número de comandos gravados")
+    parser.add_argument("--json", help="Salvar resultados em JSON")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    commands = build_commands(args.commands)
+    results = []
+    print(f"{'motor':<8} {'loop ns':>9} {'total ns':>9} {'CPU ns':>9} {'leitura ns':>11} {'B/comando':>10}  (por comando)")
+    for name, bench in (("sqlite", bench_sqlite), ("binlog", bench_binlog)):
+        with tempfile.TemporaryDirectory() as directory:
+            measured = bench(directory, commands)
+        result = {
+            "engine": name,
+            "loop_ns": round(measured["loop"][0] / args.commands * 1e9, 1),
+            "total_ns": round(measured["total"][0] / args.commands * 1e9, 1),
+            "cpu_ns": round(measured["total"][1] / args.commands * 1e9, 1),
+            "read_ns": round(measured["read"] / args.commands * 1e9, 1),
+            "bytes_per_command": round(measured["bytes"] / args.commands, 1),
+        }
+        results.append(result)
+        print(f"{name:<8} {result['loop_ns']:>9.1f} {result['total_ns']:>9.1f} {result['cpu_ns']:>9.1f} "
+              f"{result['read_ns']:>11.1f} {result['bytes_per_command']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "commands": args.commands,
+                "results": results,
+            }, f, indent=2)
+        print(f"Resultados salvos em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
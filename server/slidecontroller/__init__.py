@@ -0,0 +1,4 @@
+# Núcleo compartilhado do servidor de controle de apresentações
+#
+# Os scripts SlideController_<plataforma>.py apenas escolhem o backend de
+# entrada padrão e chamam slidecontroller.core.run().
@@ -0,0 +1,106 @@
+import logging
+
+from . import metrics
+from .scheduler import scheduler
+
+logger = logging.getLogger("presentation-controller")
+
+# Avanço automático dos slides (quiosques, telas de recepção)
+#
+# Cada sala pode avançar sozinha após um intervalo fixo ou uma duração por
+# slide. O próximo avanço é agendado no agendador central, no relógio
+# monotônico do loop, a partir do horário previsto do avanço anterior (e não
+# do momento em que ele de fato ocorreu), para que atrasos não se acumulem.
+# O avanço usa o mesmo caminho dos comandos manuais (control_presentation),
+# por meio da função "advance" informada pelo servidor.
+#
+# Com "loop", depois do último slide (o tamanho da lista de durações, ou
+# "slides" com intervalo fixo) a apresentação volta ao primeiro; sem "loop",
+# o avanço automático termina ali.
+
+# Limites das durações (segundos) e do número de slides com duração própria
+MIN_DURATION = 0.5
+MAX_DURATION = 86400
+MAX_DURATIONS = 1000
+
+auto_advance_lateness = metrics.Histogram(
+    "slidecontroller_auto_advance_lateness_seconds", "Atraso de cada avanço automático em relação ao horário previsto"
+)
+
+class AutoAdvance:
+    def __init__(self, room, advance, interval=None, durations=None, slides=None, loop=False):
+        self.room = room
+        self.advance = advance
+        self.interval = interval
+        self.durations = durations
+        self.slides = len(durations) if durations else slides
+        self.loop = loop
+        self.job = None
+        self.deadline = None
+        self.remaining = None
+        self.paused = False
+
+    # Duração de um slide (slides além da lista usam a última duração)
+    def duration(self, slide):
+        if self.durations:
+            return self.durations[min(slide, len(self.durations)) - 1]
+        return self.interval
+
+    def schedule(self, deadline):
+        if self.job is not None:
+            self.job.cancel()
+        self.deadline = deadline
+        self.job = scheduler.call_at(deadline, self.fire, name=f"avanço automático {self.room.name}")
+
+    def start(self):
+        self.paused = False
+        self.schedule(scheduler.time() + self.duration(self.room.slide))
+
+    # Tarefa do agendador: avança o slide e agenda o próximo avanço
+    def fire(self):
+        self.job = None
+        now = scheduler.time()
+        auto_advance_lateness.observe(max(0.0, now - self.deadline))
+
+        wrap = self.slides is not None and self.room.slide >= self.slides
+        if wrap and not self.loop:
+            logger.info(f"Avanço automático da sala '{self.room.name}' chegou ao último slide")
+            self.room.auto_advance = None
+            return None
+
+        deadline = self.deadline
+        result = self.advance(self.room, wrap)
+
+        # Próximo avanço a partir do horário previsto; se ele já passou
+        # (ex: a injeção de GOTO_SLIDE demorou), a partir de agora
+        if self.room.auto_advance is self and not self.paused:
+            deadline += self.duration(self.room.slide)
+            self.schedule(max(deadline, scheduler.time()))
+        return result
+
+    def pause(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+        self.remaining = max(0.0, self.deadline - scheduler.time())
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        self.schedule(scheduler.time() + self.remaining)
+
+    # Avançar agora; os próximos avanços contam a partir deste
+    def skip(self):
+        self.schedule(scheduler.time())
+
+    # Recomeçar a contagem do slide atual (navegação manual, TIMER_RESET)
+    def restart_slide(self):
+        if self.paused:
+            self.remaining = self.duration(self.room.slide)
+        else:
+            self.start()
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+from collections import deque
+
+from . import tracing
+
+logger = logging.getLogger("presentation-controller")
+
+# Backends de entrada: traduzem as teclas lógicas usadas pelos comandos
+# ("right", "left", "f5", "escape", "home", "enter" ou um caractere) para
+# a forma de injeção de cada plataforma.
+class InputBackend:
+    name = "base"
+
+    # Teclas de cada comando simples; uma tupla representa uma combinação
+    command_keys = {
+        "NEXT_SLIDE": ["right"],
+        "PREV_SLIDE": ["left"],
+        "START_PRESENTATION": ["f5"],
+        "END_PRESENTATION": ["escape"],
+        "BLANK_SCREEN": ["b"],
+    }
+
+    def press(self, key):
+        raise NotImplementedError
+
+    def release(self, key):
+        raise NotImplementedError
+
+    def tap(self, key):
+        with tracing.span("inject_key", backend=self.name, key=key):
+            self.press(key)
+            self.release(key)
+
+    def combo(self, keys):
+        with tracing.span("inject_combo", backend=self.name, keys="+".join(keys)):
+            for key in keys:
+                self.press(key)
+            for key in reversed(keys):
+                self.release(key)
+
+    def send_command(self, command):
+        for key in self.command_keys[command]:
+            if isinstance(key, tuple):
+                self.combo(key)
+            else:
+                self.tap(key)
+
+    # Recriar o controlador após uma falha de injeção
+    def reset(self):
+        pass
+
+    # Criar o backend a partir das configurações (a maioria não usa nenhuma)
+    @classmethod
+    def from_config(cls, config):
+        return cls()
+
+# Backend nulo: não injeta teclas (usado em benchmarks)
+class NullBackend(InputBackend):
+    name = "null"
+
+    def press(self, key):
+        pass
+
+    def release(self, key):
+        pass
+
+# Backend de gravação: não injeta teclas, mas registra cada evento com um
+# timestamp monotônico (para replay e comparação de sequências de teclas)
+class RecordingBackend(InputBackend):
+    name = "recording"
+
+    def __init__(self, path=None, max_events=100000):
+        self.events = deque(maxlen=max_events)
+        self.file = open(path, "a", encoding="utf-8") if path else None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("record_file"))
+
+    def _record(self, event, key):
+        timestamp = time.monotonic()
+        self.events.append((timestamp, event, key))
+        if self.file:
+            self.file.write(json.dumps({"t": timestamp, "event": event, "key": key}) + "\n")
+            self.file.flush()
+
+    def press(self, key):
+        self._record("press", key)
+
+    def release(self, key):
+        self._record("release", key)
+
+# Backend pynput (X11 e Windows)
+class PynputBackend(InputBackend):
+    name = "pynput"
+
+    def __init__(self):
+        from pynput.keyboard import Key, Controller
+        self._key_class = Key
+        self._controller_class = Controller
+        self.controller = Controller()
+
+    def _key(self, key):
+        if len(key) == 1:
+            return key
+        return getattr(self._key_class, key)
+
+    def press(self, key):
+        self.controller.press(self._key(key))
+
+    def release(self, key):
+        self.controller.release(self._key(key))
+
+    def reset(self):
+        self.controller = self._controller_class()
+
+# Backend macOS: pynput com os atalhos do PowerPoint/Keynote para Mac
+class MacOSBackend(PynputBackend):
+    name = "macos"
+
+    command_keys = dict(PynputBackend.command_keys)
+    # No PowerPoint para Mac, geralmente é Cmd+Enter para iniciar
+    command_keys["START_PRESENTATION"] = [("cmd", "enter")]
+
+# Backend Wayland: usa wtype, xdotool ou ydotool (a primeira que funcionar)
+class WaylandBackend(InputBackend):
+    name = "wayland"
+
+    tools = ("wtype", "xdotool", "ydotool")
+
+    # Nome das teclas em cada ferramenta
+    key_map = {
+        "right": {"xdotool": "Right", "wtype": "Right", "ydotool": "right"},
+        "left": {"xdotool": "Left", "wtype": "Left", "ydotool": "left"},
+        "up": {"xdotool": "Up", "wtype": "Up", "ydotool": "up"},
+        "down": {"xdotool": "Down", "wtype": "Down", "ydotool": "down"},
+        "escape": {"xdotool": "Escape", "wtype": "Escape", "ydotool": "esc"},
+        "f5": {"xdotool": "F5", "wtype": "F5", "ydotool": "f5"},
+        "home": {"xdotool": "Home", "wtype": "Home", "ydotool": "home"},
+        "enter": {"xdotool": "Return", "wtype": "Return", "ydotool": "enter"},
+    }
+
+    # Métodos DBUS do LibreOffice Impress, tentados antes do teclado
+    dbus_methods = {
+        "NEXT_SLIDE": "GoToNextSlide",
+        "PREV_SLIDE": "GoToPreviousSlide",
+    }
+
+    def __init__(self):
+        # Procurar no PATH em vez de executar cada ferramenta (evita um fork por ferramenta na inicialização)
+        self.available = []
+        for tool in self.tools:
+            if shutil.which(tool):
+                self.available.append(tool)
+                logger.info(f"Ferramenta '{tool}' encontrada")
+            else:
+                logger.warning(f"Ferramenta '{tool}' não disponível")
+        if not self.available:
+            logger.error("Nenhuma ferramenta de controle de teclado disponível")
+            logger.error("Instale wtype, xdotool ou ydotool para funcionalidade completa")
+        self.dbus = shutil.which("dbus-send") is not None
+
+    def _tool_command(self, tool, key):
+        if len(key) == 1:
+            return [tool, key] if tool == "wtype" else [tool, "key", key]
+        name = self.key_map.get(key, {}).get(tool, key)
+        return [tool, "-k", name] if tool == "wtype" else [tool, "key", name]
+
+    # As ferramentas só sabem pressionar e soltar de uma vez
+    def press(self, key):
+        if not self.available:
+            logger.info(f"Simulando pressionar tecla: {key}")
+            return
+        for tool in self.available:
+            try:
+                with tracing.span("tool", tool=tool):
+                    subprocess.run(self._tool_command(tool, key), check=True)
+                return
+            except Exception as e:
+                logger.warning(f"Falha ao usar {tool}: {e}")
+
+    def release(self, key):
+        pass
+
+    def send_command(self, command):
+        if self.dbus and command in self.dbus_methods:
+            with tracing.span("tool", tool="dbus-send"):
+                subprocess.run([
+                    "dbus-send", "--type=method_call", "--dest=org.libreoffice.LibreOffice.Impress",
+                    "/org/libreoffice/LibreOffice/Impress",
+                    f"org.libreoffice.LibreOffice.Impress.{self.dbus_methods[command]}"
+                ], check=False)
+            return
+        super().send_command(command)
+
+BACKENDS = {
+    "null": NullBackend,
+    "recording": RecordingBackend,
+    "pynput": PynputBackend,
+    "macos": MacOSBackend,
+    "wayland": WaylandBackend,
+}
+
+# Função para escolher o backend conforme a plataforma
+def detect_backend():
+    if sys.platform == "darwin":
+        return "macos"
+    if sys.platform.startswith("linux") and (
+        os.environ.get("WAYLAND_DISPLAY") or os.environ.get("XDG_SESSION_TYPE") == "wayland"
+    ):
+        return "wayland"
+    return "pynput"
+
+# Função para criar o backend de entrada
+def create_backend(name, config=None):
+    if name == "auto":
+        name = detect_backend()
+    if name not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {name}")
+
+    try:
+        backend = BACKENDS[name].from_config(config or {})
+    except Exception as e:
+        if name != "macos":
+            raise
+        # No macOS, o pynput pode precisar de permissões de acessibilidade
+        logger.error(f"Erro ao inicializar controlador de teclado: {e}")
+        logger.warning("No macOS, você precisa conceder permissões de Acessibilidade para este aplicativo")
+        logger.warning("Vá para Preferências do Sistema > Segurança e Privacidade > Privacidade > Acessibilidade")
+        logger.warning("e adicione este aplicativo Python ou Terminal à lista.")
+        backend = NullBackend()
+
+    logger.info(f"Backend de entrada: {backend.name}")
+    return backend
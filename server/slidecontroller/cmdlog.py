@@ -0,0 +1,260 @@
+import functools
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from . import wire
+
+logger = logging.getLogger("presentation-controller")
+
+# Registro binário dos comandos (motor de estatísticas "binlog")
+#
+# Alternativa à tabela "commands" do SQLite para computadores em que até a
+# escrita em lotes pesa (ex: Raspberry Pi com cartão SD). Cada comando é um
+# registro de tamanho fixo acrescentado ao segmento atual com uma única
+# chamada write(), sem thread nem transação:
+#
+#   timestamp (float64, epoch)  sessão (uint32)  comando (uint16, opcode do wire.py)
+#   reservado (uint16)  hash do endereço do cliente (uint32, CRC-32)  argumento (int32)
+#
+# O argumento é o "count" de SKIP_SLIDES ou o "number" de GOTO_SLIDE (0 nos
+# demais). Os segmentos ficam em um diretório, com nomes pelo intervalo de
+# números que cobrem (00000001-00000001.seg); ao passar de SEGMENT_BYTES, um
+# novo segmento é aberto, e cada início do servidor também abre um novo, para
+# que segmentos fechados nunca sejam reescritos. A compactação junta segmentos
+# fechados pequenos em um só (00000001-00000005.seg); um segmento cujo
+# intervalo está contido em outro é ignorado pela leitura, de modo que uma
+# queda no meio da compactação não duplica nem perde registros.
+#
+# A leitura usa mmap; os registros podem ser convertidos para a tabela
+# "commands" do SQLite (--convert-command-log), com o endereço do cliente
+# como "hash:<CRC-32>".
+
+MAGIC = b"SCMDLOG1"
+HEADER = struct.Struct("<8sH6x")
+RECORD = struct.Struct("<dIHHIi")
+SEGMENT_SUFFIX = ".seg"
+
+# Tamanho máximo de um segmento (cerca de 170 mil comandos)
+SEGMENT_BYTES = 4 * 1024 * 1024
+
+# Código dos comandos sem opcode no protocolo binário
+UNKNOWN_COMMAND = 0xFFFF
+
+# Argumento inteiro gravado para cada comando
+ARG_FIELDS = {"SKIP_SLIDES": "count", "GOTO_SLIDE": "number"}
+
+# Função para calcular o hash do endereço de um cliente (com cache: há poucos clientes)
+@functools.lru_cache(maxsize=256)
+def client_hash(client_ip):
+    return zlib.crc32(str(client_ip).encode())
+
+def segment_name(first, last):
+    return f"{first:08d}-{last:08d}{SEGMENT_SUFFIX}"
+
+# Função para listar os segmentos do diretório: ([(primeiro, último, caminho)] válidos, cobertos)
+#
+# Segmentos cobertos por outro maior são restos de uma compactação interrompida.
+def scan_segments(directory):
+    segments = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return [], []
+    for name in names:
+        if not name.endswith(SEGMENT_SUFFIX):
+            continue
+        try:
+            first, last = (int(part) for part in name[:-len(SEGMENT_SUFFIX)].split("-"))
+        except ValueError:
+            continue
+        segments.append((first, last, os.path.join(directory, name)))
+
+    # Maiores intervalos primeiro, para descartar os que eles cobrem
+    segments.sort(key=lambda segment: (segment[0], -segment[1]))
+    valid = []
+    covered = []
+    for first, last, path in segments:
+        if valid and last <= valid[-1][1]:
+            covered.append((first, last, path))
+            continue
+        valid.append((first, last, path))
+    return valid, covered
+
+# Função para listar os segmentos válidos, na ordem de gravação
+def list_segments(directory):
+    return scan_segments(directory)[0]
+
+# Escritor do registro: um segmento aberto por vez
+class CommandLog:
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fd = None
+        self.size = 0
+        os.makedirs(directory, exist_ok=True)
+        segments = list_segments(directory)
+        self.number = segments[-1][1] if segments else 0
+        self.open_segment()
+
+    def open_segment(self):
+        self.number += 1
+        path = os.path.join(self.directory, segment_name(self.number, self.number))
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.write(self.fd, HEADER.pack(MAGIC, RECORD.size))
+        self.size = HEADER.size
+
+    # Função para acrescentar um comando (chamada no loop de eventos)
+    def append(self, session_id, timestamp, command, client_ip, args=None):
+        field = ARG_FIELDS.get(command)
+        arg = args.get(field, 0) if field and args else 0
+        record = RECORD.pack(
+            timestamp, session_id or 0, wire.OPCODES.get(command, UNKNOWN_COMMAND), 0, client_hash(client_ip), arg
+        )
+        os.write(self.fd, record)
+        self.size += RECORD.size
+        if self.size >= self.segment_bytes:
+            self.rotate()
+
+    # Função para fechar o segmento atual e abrir o próximo
+    def rotate(self):
+        os.fsync(self.fd)
+        os.close(self.fd)
+        self.open_segment()
+
+    def close(self):
+        if self.fd is not None:
+            os.fsync(self.fd)
+            os.close(self.fd)
+            self.fd = None
+
+    # Função para compactar os segmentos fechados (todos menos o atual), em uma thread
+    def compact_in_background(self):
+        thread = threading.Thread(
+            target=compact, args=(self.directory, self.segment_bytes, self.number), name="command-log-compaction"
+        )
+        thread.daemon = True
+        thread.start()
+        return thread
+
+# Função para ler os registros de um segmento via mmap (tuplas do RECORD)
+#
+# Um registro incompleto no fim (queda durante a escrita) é ignorado.
+def read_segment(path):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, record_size = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or record_size != RECORD.size:
+                raise ValueError(f"segmento inválido: {path}")
+            end = HEADER.size + (size - HEADER.size) // RECORD.size * RECORD.size
+            view = memoryview(data)[HEADER.size:end]
+            try:
+                yield from RECORD.iter_unpack(view)
+            finally:
+                view.release()
+
+# Função para ler todos os registros, na ordem de gravação
+def read_records(directory):
+    for _, _, path in list_segments(directory):
+        yield from read_segment(path)
+
+# Função para juntar segmentos fechados pequenos
+#
+# Junta sequências de segmentos consecutivos cuja soma cabe em um segmento.
+# O novo segmento é gravado com fsync antes de os antigos serem apagados; até
+# lá, a leitura já o prefere aos que ele cobre. Restos de uma compactação
+# interrompida são apagados primeiro.
+def compact(directory, segment_bytes=SEGMENT_BYTES, active=None):
+    segments, covered = scan_segments(directory)
+    for _, _, path in covered:
+        os.remove(path)
+    segments = [segment for segment in segments if active is None or segment[1] < active]
+    runs = []
+    run = []
+    run_size = 0
+    for segment in segments:
+        size = os.path.getsize(segment[2]) - HEADER.size
+        if run and run_size + size > segment_bytes:
+            runs.append(run)
+            run = []
+            run_size = 0
+        run.append(segment)
+        run_size += size
+    runs.append(run)
+
+    merged = 0
+    for run in runs:
+        if len(run) < 2:
+            continue
+        first, last = run[0][0], run[-1][1]
+        path = os.path.join(directory, segment_name(first, last))
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "wb") as out:
+                out.write(HEADER.pack(MAGIC, RECORD.size))
+                for _, _, segment_path in run:
+                    with open(segment_path, "rb") as f:
+                        f.seek(HEADER.size)
+                        data = f.read()
+                    out.write(data[:len(data) // RECORD.size * RECORD.size])
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(temp_path, path)
+            for _, _, segment_path in run:
+                os.remove(segment_path)
+            merged += len(run)
+        except OSError as e:
+            logger.error(f"Erro ao compactar o registro de comandos: {e}")
+    if merged:
+        logger.info(f"Registro de comandos compactado: {merged} segmentos juntados")
+    return merged
+
+# Função para converter os registros para a tabela "commands" do SQLite
+#
+# Os segmentos convertidos são apagados depois do commit, para que uma nova
+# conversão não duplique os comandos. Retorna o número de comandos.
+def convert_to_sqlite(directory, db_path, batch_size=5000):
+    import sqlite3
+    from datetime import datetime
+    import json
+
+    commands = {opcode: command for command, opcode in wire.OPCODES.items()}
+    segments, covered = scan_segments(directory)
+    conn = sqlite3.connect(db_path)
+    count = 0
+    try:
+        for _, _, path in segments:
+            rows = []
+            for timestamp, session_id, opcode, _, client, arg in read_segment(path):
+                command = commands.get(opcode, "UNKNOWN")
+                field = ARG_FIELDS.get(command)
+                rows.append((
+                    session_id or None,
+                    datetime.fromtimestamp(timestamp).isoformat(),
+                    command,
+                    f"hash:{client:08x}",
+                    json.dumps({field: arg}) if field else None
+                ))
+                if len(rows) >= batch_size:
+                    conn.executemany(
+                        "INSERT INTO commands (session_id, timestamp, command, client_ip, args) VALUES (?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    count += len(rows)
+                    rows = []
+            conn.executemany(
+                "INSERT INTO commands (session_id, timestamp, command, client_ip, args) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            count += len(rows)
+        conn.commit()
+    finally:
+        conn.close()
+    for _, _, path in segments + covered:
+        os.remove(path)
+    return count
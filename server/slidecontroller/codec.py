@@ -0,0 +1,37 @@
+import functools
+import json
+
+# Codificação JSON das mensagens trocadas com os clientes
+#
+# Usa o orjson quando ele está instalado (bem mais rápido para serializar e
+# decodificar) e a biblioteca padrão caso contrário; as mensagens geradas são
+# JSON válido nos dois casos. As respostas de status vêm de um conjunto
+# pequeno de textos (resultados dos comandos, clientes conectados, avisos do
+# temporizador), então o frame já serializado de cada texto fica em cache:
+# cada mensagem é serializada uma vez, e não a cada resposta ou cliente.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Quantidade de frames de status mantidos em cache
+STATUS_CACHE_SIZE = 1024
+
+if orjson is not None:
+    name = "orjson"
+
+    # orjson gera bytes; o WebSocket precisa de texto para enviar um frame de texto
+    def dumps(obj):
+        return orjson.dumps(obj).decode()
+
+    # orjson.JSONDecodeError é subclasse de json.JSONDecodeError (e de ValueError)
+    loads = orjson.loads
+else:
+    name = "json"
+    dumps = json.dumps
+    loads = json.loads
+
+# Função para obter o frame {"status": texto} já serializado
+@functools.lru_cache(maxsize=STATUS_CACHE_SIZE)
+def status_frame(text):
+    return dumps({"status": text})
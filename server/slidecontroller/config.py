@@ -0,0 +1,176 @@
+import logging
+import os
+
+logger = logging.getLogger("presentation-controller")
+
+# Valores padrão (cada script de plataforma pode sobrescrever alguns deles)
+DEFAULT_CONFIG = {
+    "host": "0.0.0.0",
+    "port": 10696,
+    "max_clients": 10,
+    "max_followers": 500,
+    "follow_workers": 0,
+    "follow_port": None,
+    "log_to_file": False,
+    "log_file": "presentation_server.log",
+    "backend": "auto",
+    "stats_db": "presentation_stats.db",
+    "state_journal": None,
+    "stats_engine": "sqlite",
+    "command_log": None,
+    "record_file": None,
+    "metrics_host": "127.0.0.1",
+    "metrics_port": None,
+    "loop_lag_threshold_ms": 100,
+    "trace_file": "presentation_trace.json",
+    "trace_sample_rate": 0.0,
+    "trace_max_bytes": 10 * 1024 * 1024,
+    "admin_token": None,
+    "profile_seconds": 30,
+    "profile_interval_ms": 5,
+    "rooms": None,
+    "auto_advance": None,
+    "rate_limit": True,
+    "rate_limits": None,
+    "rate_limit_disconnect": 0,
+    "navigation_policy": "reject-stale",
+    "navigation_window": 0.5,
+    "navigation_lease": 3.0,
+    "controller_priorities": None,
+    "dwell_report": None,
+    "export": None,
+    "convert_command_log": False,
+}
+
+# Função para carregar configurações
+def load_config(defaults=None, argv=None):
+    config = dict(DEFAULT_CONFIG)
+    if defaults:
+        config.update(defaults)
+
+    # Parser de argumentos da linha de comando
+    import argparse
+    from .backends import BACKENDS
+    parser = argparse.ArgumentParser(description="Servidor de controle de apresentações")
+    parser.add_argument("--host", help="Endereço IP do servidor")
+    parser.add_argument("--port", type=int, help="Porta do servidor")
+    parser.add_argument("--config", help="Arquivo de configuração YAML")
+    parser.add_argument("--max-clients", type=int, help="Número máximo de clientes")
+    parser.add_argument("--max-followers", type=int, help="Número máximo de espectadores por sala")
+    parser.add_argument("--follow-workers", type=int,
+                        help="Processos dedicados aos espectadores, em uma porta própria (apenas Linux; 0 desativa)")
+    parser.add_argument("--follow-port", type=int, help="Porta dos workers de espectadores (padrão: porta + 1)")
+    parser.add_argument("--log-to-file", action="store_true", help="Salvar logs em arquivo")
+    parser.add_argument("--backend", choices=["auto"] + sorted(BACKENDS),
+                        help="Backend de entrada (null e recording não injetam teclas)")
+    parser.add_argument("--stats-db", help="Arquivo do banco de dados de estatísticas")
+    parser.add_argument("--state-journal", help="Arquivo do diário de estado das salas (padrão: ao lado do banco de estatísticas)")
+    parser.add_argument("--stats-engine", choices=["sqlite", "binlog"],
+                        help="Onde gravar os comandos: tabela do SQLite (padrão) ou registro binário (binlog)")
+    parser.add_argument("--command-log", help="Diretório do registro binário de comandos (padrão: ao lado do banco de estatísticas)")
+    parser.add_argument("--record-file", help="Arquivo NDJSON onde o backend recording grava as teclas")
+    parser.add_argument("--metrics-port", type=int, help="Porta do endpoint de métricas Prometheus (desativado por padrão)")
+    parser.add_argument("--loop-lag-threshold", type=int,
+                        help="Atraso do loop de eventos (ms) a partir do qual a pilha é registrada (0 desativa)")
+    parser.add_argument("--trace-sample-rate", type=float,
+                        help="Fração das mensagens rastreadas, de 0 a 1 (0 desativa, padrão)")
+    parser.add_argument("--trace-file", help="Arquivo de rastreamento (formato Trace Event, aberto no Perfetto)")
+    parser.add_argument("--profile-seconds", type=int,
+                        help="Duração do perfil ativado pelo sinal SIGUSR1 ou pela mensagem de administração")
+    parser.add_argument("--no-rate-limit", action="store_true", help="Desativar o limite de mensagens por cliente")
+    parser.add_argument("--rate-limit-disconnect", type=int,
+                        help="Desconectar o cliente após N mensagens descartadas pelo limite em 10 s (0 desativa)")
+    parser.add_argument("--navigation-policy", choices=["none", "reject-stale", "merge-window", "lease"],
+                        help="Política para comandos de navegação simultâneos de vários controles (padrão: reject-stale)")
+    parser.add_argument("--startup-profile", action="store_true", help="Medir o tempo de inicialização e sair")
+    parser.add_argument("--dwell-report", action="store_true",
+                        help="Imprimir o tempo médio e mediano de exibição de cada slide e sair")
+    parser.add_argument("--export", metavar="ARQUIVO",
+                        help="Exportar as estatísticas em NDJSON ou CSV (.gz comprime) e sair")
+    parser.add_argument("--export-table", choices=["commands", "sessions"], default="commands",
+                        help="Tabela exportada (padrão: commands)")
+    parser.add_argument("--export-format", choices=["ndjson", "csv"],
+                        help="Formato da exportação (padrão: pela extensão do arquivo)")
+    parser.add_argument("--since", help="Exportar a partir deste horário (ISO, ex: 2026-03-01 ou 2026-03-01T14:00)")
+    parser.add_argument("--until", help="Exportar até este horário, exclusive (ISO)")
+    parser.add_argument("--convert-command-log", action="store_true",
+                        help="Converter o registro binário de comandos para o banco de estatísticas e sair")
+    parser.add_argument("--session", type=int, help="Sessão do relatório ou da exportação (padrão: todas as sessões)")
+    parser.add_argument("--room", help="Sala do relatório de todas as sessões")
+
+    args = parser.parse_args(argv)
+
+    # Carregar de arquivo YAML se especificado
+    if args.config:
+        try:
+            # Importar yaml apenas se necessário
+            import yaml
+            with open(args.config, 'r') as f:
+                yaml_config = yaml.safe_load(f)
+                if yaml_config and isinstance(yaml_config, dict):
+                    config.update(yaml_config)
+                    logger.info(f"Configurações carregadas de {args.config}")
+        except ImportError:
+            logger.error("Biblioteca YAML não encontrada. Instale com: pip install pyyaml")
+        except Exception as e:
+            logger.error(f"Erro ao carregar arquivo de configuração: {e}")
+
+    # Sobrescrever com argumentos da linha de comando se fornecidos
+    if args.host:
+        config["host"] = args.host
+    if args.port:
+        config["port"] = args.port
+    if args.max_clients:
+        config["max_clients"] = args.max_clients
+    if args.max_followers:
+        config["max_followers"] = args.max_followers
+    if args.follow_workers is not None:
+        config["follow_workers"] = args.follow_workers
+    if args.follow_port:
+        config["follow_port"] = args.follow_port
+    if args.log_to_file:
+        config["log_to_file"] = True
+    if args.backend:
+        config["backend"] = args.backend
+    if args.stats_db:
+        config["stats_db"] = args.stats_db
+    if args.state_journal:
+        config["state_journal"] = args.state_journal
+    if args.stats_engine:
+        config["stats_engine"] = args.stats_engine
+    if args.command_log:
+        config["command_log"] = args.command_log
+    if args.record_file:
+        config["record_file"] = args.record_file
+    if args.metrics_port:
+        config["metrics_port"] = args.metrics_port
+    if args.loop_lag_threshold is not None:
+        config["loop_lag_threshold_ms"] = args.loop_lag_threshold
+    if args.trace_sample_rate is not None:
+        config["trace_sample_rate"] = min(1.0, max(0.0, args.trace_sample_rate))
+    if args.trace_file:
+        config["trace_file"] = args.trace_file
+    if args.profile_seconds:
+        config["profile_seconds"] = args.profile_seconds
+    if args.no_rate_limit:
+        config["rate_limit"] = False
+    if args.rate_limit_disconnect is not None:
+        config["rate_limit_disconnect"] = args.rate_limit_disconnect
+    if args.navigation_policy:
+        config["navigation_policy"] = args.navigation_policy
+
+    if args.dwell_report:
+        config["dwell_report"] = {"session_id": args.session, "room": args.room}
+    if args.convert_command_log:
+        config["convert_command_log"] = True
+    if args.export:
+        config["export"] = {
+            "out_path": args.export, "table": args.export_table, "fmt": args.export_format,
+            "session": args.session, "since": args.since, "until": args.until,
+        }
+
+    # O token de administração não é aceito na linha de comando (ficaria visível no ps)
+    if os.environ.get("SLIDECONTROLLER_ADMIN_TOKEN"):
+        config["admin_token"] = os.environ["SLIDECONTROLLER_ADMIN_TOKEN"]
+
+    return config
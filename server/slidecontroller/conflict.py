@@ -0,0 +1,119 @@
+import time
+
+from . import codec, metrics, schema, wire
+
+# Conflitos entre vários controles da mesma sala
+#
+# Com dois apresentadores e um moderador segurando controles, toques
+# simultâneos viram avanços duplicados. Os comandos de navegação (NEXT_SLIDE,
+# PREV_SLIDE, SKIP_SLIDES, GOTO_SLIDE) podem trazer "version": a versão do
+# estado da sala que o cliente conhecia (state.py). Antes do log, das
+# estatísticas e da injeção, a política da sala decide se o comando é aplicado:
+#
+#   none          todos os comandos são aplicados, como antes
+#   reject-stale  um comando com versão anterior à última mudança de slide é
+#                 recusado (STALE_VERSION), com a versão atual na resposta
+#   merge-window  além disso, um comando igual ao último aplicado (mesmo
+#                 comando e argumentos), vindo de outro controle em até
+#                 "window" segundos, é combinado com ele: é confirmado
+#                 (NAVIGATION_MERGED) sem mover a apresentação de novo. Com
+#                 versão, só é combinado se o cliente ainda não tinha visto o
+#                 comando anterior; sem versão, basta a janela
+#   lease         o controle que navega fica com a posse da navegação por
+#                 "lease" segundos (renovada a cada comando); comandos de
+#                 outros controles nesse tempo são recusados
+#                 (NAVIGATION_LOCKED), salvo de um controle com prioridade
+#                 maior ("priorities": endereço IP -> prioridade, padrão 0)
+#
+# Comandos sem versão nunca são recusados por versão, de modo que clientes
+# que não conhecem o estado versionado continuam funcionando como antes.
+
+POLICIES = ("none", "reject-stale", "merge-window", "lease")
+DEFAULT_POLICY = "reject-stale"
+
+# Janela de combinação e duração da posse (segundos)
+DEFAULT_WINDOW = 0.5
+DEFAULT_LEASE = 3.0
+
+# Resultados da verificação (None: aplicar o comando)
+MERGED = "merged"
+STALE = "stale"
+LOCKED = "locked"
+
+# Código do resultado e texto da resposta dos clientes JSON de cada caso
+OUTCOMES = {
+    MERGED: (wire.NAVIGATION_MERGED, None, "Comando já aplicado por outro controle"),
+    STALE: (wire.ERROR_STALE_VERSION, "STALE_VERSION", "Erro: o slide foi alterado por outro controle"),
+    LOCKED: (wire.ERROR_NAVIGATION_LOCKED, "NAVIGATION_LOCKED", "Erro: outro controle está navegando nesta sala"),
+}
+
+navigation_conflicts = metrics.Counter(
+    "slidecontroller_navigation_conflicts_total", "Comandos de navegação não aplicados por conflito entre controles",
+    "outcome", set(OUTCOMES)
+)
+
+# Política de uma sala, com o último comando de navegação aplicado e a posse atual
+class NavigationPolicy:
+    def __init__(self, policy=DEFAULT_POLICY, window=DEFAULT_WINDOW, lease=DEFAULT_LEASE, priorities=None):
+        if policy not in POLICIES:
+            raise ValueError(f"política de navegação desconhecida: {policy} (use {', '.join(POLICIES)})")
+        self.policy = policy
+        self.window = float(window)
+        self.lease = float(lease)
+        self.priorities = {str(address): int(value) for address, value in (priorities or {}).items()}
+
+        # Último comando aplicado: (comando, argumentos, cliente, horário monotônico)
+        self.last = None
+
+        # Posse da navegação: cliente, sua prioridade e até quando
+        self.holder = None
+        self.holder_priority = 0
+        self.expires = 0.0
+
+    def priority(self, client):
+        return self.priorities.get(client.remote_address[0], 0)
+
+    # Função para decidir um comando já validado: None (aplicar), MERGED, STALE ou LOCKED
+    def check(self, room, client, command, data):
+        if self.policy == "none" or command not in schema.VERSIONED_COMMANDS:
+            return None
+        now = time.monotonic()
+        version = data.get("version")
+        stale = version is not None and version < room.slide_version
+
+        if (self.policy == "lease" and self.holder is not None and self.holder is not client
+                and now < self.expires and self.priority(client) <= self.holder_priority):
+            return LOCKED
+
+        if self.policy == "merge-window" and self.last is not None and (version is None or stale):
+            last_command, last_args, last_client, last_time = self.last
+            if (last_client is not client and now - last_time <= self.window
+                    and last_command == command and last_args == schema.command_args(command, data)):
+                return MERGED
+
+        return STALE if stale else None
+
+    # Função para registrar um comando de navegação aplicado (janela de combinação e posse)
+    def applied(self, client, command, data):
+        if self.policy == "none" or command not in schema.VERSIONED_COMMANDS:
+            return
+        now = time.monotonic()
+        self.last = (command, schema.command_args(command, data), client, now)
+        if self.policy == "lease":
+            if self.holder is not client:
+                self.holder = client
+                self.holder_priority = self.priority(client)
+            self.expires = now + self.lease
+
+    # Função para liberar a posse de um cliente que desconectou
+    def release(self, client):
+        if self.holder is client:
+            self.holder = None
+
+# Função para montar a resposta JSON (sem subprotocolo) de um comando não aplicado
+def conflict_message(room, outcome):
+    _, error, text = OUTCOMES[outcome]
+    reply = {"status": text, "version": room.state_version}
+    if error is not None:
+        reply["error"] = error
+    return codec.dumps(reply)
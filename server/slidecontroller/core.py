@@ -0,0 +1,1151 @@
+from . import startup_profile
+import asyncio
+import hmac
+import logging
+import os
+import signal
+import sys
+import time
+import websockets
+
+from . import autoadvance, codec, conflict, follow, journal, looplag, metrics, profiler, ratelimit, schema, state, tracing, wire
+from .config import load_config
+from .network import log_ip_addresses
+from .scheduler import scheduler
+from . import rooms
+from . import stats as stats_db
+from .stats import record_command_stats, save_command, save_stats
+
+logger = logging.getLogger("presentation-controller")
+
+# Configurações carregadas em main()
+config = {}
+
+# Clientes conectados (de todas as salas), com a sala de cada um
+connected_clients = {}
+
+# Última mensagem recebida de cada cliente (time.monotonic())
+client_last_seen = {}
+
+# Tarefas que só rodam enquanto há clientes conectados (ver update_client_jobs)
+connection_check_job = None
+lag_monitor = None
+
+connected_clients_gauge = metrics.Gauge(
+    "slidecontroller_connected_clients", "Clientes conectados", lambda: len(connected_clients)
+)
+rooms_gauge = metrics.Gauge("slidecontroller_rooms", "Salas configuradas", lambda: len(rooms.rooms))
+
+# Comandos que apenas injetam teclas: mensagem de log, resposta ao cliente e código da resposta binária
+KEY_COMMANDS = {
+    "NEXT_SLIDE": ("Comando: Próximo slide", "Avançou para o próximo slide", wire.NEXT_SLIDE_OK),
+    "PREV_SLIDE": ("Comando: Slide anterior", "Retornou para o slide anterior", wire.PREV_SLIDE_OK),
+    "START_PRESENTATION": ("Comando: Iniciar apresentação", "Apresentação iniciada", wire.PRESENTATION_STARTED),
+    "END_PRESENTATION": ("Comando: Encerrar apresentação", "Apresentação encerrada", wire.PRESENTATION_ENDED),
+    "BLANK_SCREEN": ("Comando: Tela preta", "Tela alternada para preto", wire.SCREEN_BLANKED),
+}
+
+# Origem dos comandos do avanço automático nas estatísticas (coluna client_ip)
+AUTO_ADVANCE_CLIENT = "auto"
+
+# Tamanho máximo das notas publicadas para os espectadores
+MAX_NOTES_LENGTH = 4000
+
+# Intervalo entre os pings de verificação das conexões (segundos)
+CONNECTION_CHECK_INTERVAL = 30
+
+# Heartbeats e pongs do aplicativo ({"heartbeat":1729...} e {"pong":1729...}),
+# reconhecidos sem decodificar o JSON
+KEEPALIVE_MAX_LENGTH = 40
+KEEPALIVE_PREFIXES = {"h": ('{"heartbeat":', "heartbeat"), "p": ('{"pong":', "pong")}
+
+# Mensagens fixas, serializadas uma única vez (JSON e binário)
+ROOM_NOT_FOUND_MESSAGE = codec.dumps({"status": "Erro: Sala não encontrada", "error": "ROOM_NOT_FOUND"})
+ROOM_NOT_FOUND_EVENT = wire.encode_event(wire.ERROR, wire.ERROR_ROOM_NOT_FOUND)
+MAX_CLIENTS_MESSAGE = codec.dumps({
+    "status": "Erro: Limite de clientes atingido, tente novamente mais tarde",
+    "error": "MAX_CLIENTS_REACHED"
+})
+MAX_CLIENTS_EVENT = wire.encode_event(wire.ERROR, wire.ERROR_MAX_CLIENTS)
+SHUTDOWN_MESSAGE = codec.dumps({"status": "Servidor sendo desligado", "server_shutdown": True})
+SHUTDOWN_EVENT = wire.encode_event(wire.SHUTDOWN)
+WELCOME_EVENT = wire.encode_event(wire.WELCOME)
+
+# Função para agendar o próximo segundo do temporizador de uma sala
+def schedule_timer_tick(room, elapsed):
+    room.timer_job = scheduler.call_later(1 - elapsed % 1, timer_tick, room, name=f"temporizador {room.name}")
+
+# Tarefa do agendador para cada segundo do temporizador de uma sala
+#
+# Atualiza o estado e agenda o próximo segundo de forma síncrona; os avisos
+# são enviados pela corrotina retornada, que o agendador executa.
+def timer_tick(room):
+    if not room.timer_active:
+        return None
+
+    # Calcular o tempo total (tempo anterior + tempo atual)
+    elapsed = time.time() - room.timer_start_time
+    total_elapsed = room.timer_elapsed_before_pause + int(elapsed)
+
+    messages = []
+    if total_elapsed != room.timer_seconds:
+        room.timer_seconds = total_elapsed
+
+        # Formatar o tempo
+        minutes, seconds = divmod(room.timer_seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        messages.append((f"Tempo decorrido: {time_str}", wire.encode_event(wire.TIMER, room.timer_seconds)))
+
+        # Verificar se atingiu o tempo limite (se configurado)
+        if room.timer_limit > 0 and room.timer_seconds >= room.timer_limit:
+            messages.append(("ALERTA: Tempo da apresentação esgotado!", wire.encode_event(wire.TIMER_EXPIRED)))
+            room.timer_active = False
+            room.timer_job = None
+            stop_auto_advance(room)
+            journal.record(room)
+
+    if room.timer_active:
+        schedule_timer_tick(room, elapsed)
+    if not messages:
+        return None
+    state.publish(room)
+    return announce_timer(room, messages)
+
+# Função para enviar os avisos do temporizador aos clientes e espectadores da sala
+async def announce_timer(room, messages):
+    for message, event in messages:
+        await broadcast_status(room, message, event)
+    if follow.watched(room):
+        follow.publish(room)
+
+# Função para iniciar o temporizador de uma sala
+def start_timer(room):
+    room.timer_active = True
+    room.timer_start_time = time.time()
+    schedule_timer_tick(room, 0.0)
+
+# Função para cancelar o próximo segundo agendado do temporizador de uma sala
+def cancel_timer_tick(room):
+    if room.timer_job is not None:
+        room.timer_job.cancel()
+        room.timer_job = None
+
+# Função para um passo do avanço automático (chamada pelo agendador)
+#
+# Passa pelo mesmo caminho dos comandos manuais: estatísticas, injeção das
+# teclas, diário de estado e espectadores. Depois do último slide (com
+# "loop"), volta ao primeiro com GOTO_SLIDE.
+def auto_advance_step(room, wrap):
+    command, data = ("GOTO_SLIDE", {"number": 1}) if wrap else ("NEXT_SLIDE", {})
+    record_command_stats(room.stats, command)
+    metrics.commands_total.inc(command)
+    open_session(room)
+    save_command(room.stats, command, AUTO_ADVANCE_CLIENT, data)
+
+    looplag.set_activity(f"avanço automático na sala '{room.name}'")
+    code, result = control_presentation(room, command, data)
+    looplag.set_activity(None)
+    record_room_state(room)
+    if follow.watched(room):
+        follow.publish(room)
+    return broadcast_status(room, f"Avanço automático: {result}", wire.encode_result(code, room.slide))
+
+# Função para registrar o estado de uma sala após um comando: tempo de
+# exibição do slide (estatísticas), diário de estado e deltas do estado
+def record_room_state(room):
+    track_dwell(room)
+    journal.record(room)
+    state.publish(room)
+
+# Função para abrir a sessão de estatísticas da sala, se ainda não há uma
+#
+# A sessão é aberta na conexão do primeiro controle ou, em uma sala sem
+# controles (quiosque), ao iniciar a apresentação ou o avanço automático.
+def open_session(room):
+    if room.stats.session_id is None:
+        save_stats(room.stats)
+
+# Função para acompanhar o tempo de exibição do slide atual
+#
+# O tempo só conta enquanto os slides estão na tela: com a apresentação
+# iniciada ou com o avanço automático em andamento.
+def track_dwell(room):
+    if room.presenting or room.auto_advance is not None:
+        open_session(room)
+        stats_db.track_slide(room.stats, room.slide)
+    else:
+        stats_db.track_slide(room.stats, None)
+
+# Função para iniciar o avanço automático de uma sala (inicia também o temporizador)
+#
+# Sem intervalo nem durações no comando, usa o auto_advance da configuração da sala.
+def start_auto_advance(room, settings):
+    if "interval" not in settings and "durations" not in settings:
+        if room.auto_advance_config is None:
+            return wire.ERROR_INVALID_AUTO_ADVANCE, "Erro: intervalo ou durações do avanço automático não especificados"
+        settings = room.auto_advance_config
+
+    if room.auto_advance is not None:
+        room.auto_advance.cancel()
+    room.auto_advance = autoadvance.AutoAdvance(room, auto_advance_step, **settings)
+    if not room.timer_active:
+        start_timer(room)
+    room.auto_advance.start()
+    record_room_state(room)
+    return wire.AUTO_ADVANCE_STARTED, "Avanço automático iniciado"
+
+# Função para encerrar o avanço automático de uma sala
+def stop_auto_advance(room):
+    if room.auto_advance is not None:
+        room.auto_advance.cancel()
+        room.auto_advance = None
+        logger.info(f"Avanço automático da sala '{room.name}' encerrado")
+
+# Função para recomeçar a contagem do slide atual após uma navegação manual
+def restart_auto_advance(room):
+    if room.auto_advance is not None:
+        room.auto_advance.restart_slide()
+
+# Função para obter o caminho do diário de estado (None se desativado)
+#
+# Sem "state_journal" configurado, o diário fica ao lado do banco de
+# estatísticas, com a extensão .journal.
+def state_journal_path(config, base_dir):
+    path = config["state_journal"]
+    if path is False:
+        return None
+    if not path:
+        path = os.path.splitext(config["stats_db"])[0] + ".journal"
+    return os.path.join(base_dir or os.getcwd(), path)
+
+# Função para obter o diretório do registro binário de comandos
+#
+# Sem "command_log" configurado, fica ao lado do banco de estatísticas, com a
+# extensão .cmdlog.
+def command_log_path(config, base_dir):
+    path = config["command_log"] or os.path.splitext(config["stats_db"])[0] + ".cmdlog"
+    return os.path.join(base_dir or os.getcwd(), path)
+
+# Função para restaurar o estado das salas a partir do diário, após uma queda
+#
+# Restaura slide, notas e temporizador (que continua contando a partir do
+# horário de início registrado, incluindo o tempo em que o servidor ficou
+# fora). Retorna as sessões de estatísticas que ficaram abertas, para serem
+# fechadas com os últimos valores conhecidos.
+def restore_rooms(path):
+    orphaned_sessions = []
+    now = time.time()
+    for name, entry in journal.read_journal(path).items():
+        if entry.get("session") is not None:
+            orphaned_sessions.append((entry["session"], entry["time"], entry["connections"], entry["commands"]))
+
+        room = rooms.rooms.get(name)
+        if room is None or now - entry["time"] > journal.RESTORE_MAX_AGE:
+            continue
+        room.slide = entry["slide"]
+        room.presenting = entry.get("presenting", False)
+        room.blanked = entry.get("blanked", False)
+        room.notes = entry["notes"]
+        room.timer_seconds = entry["timer_seconds"]
+        room.timer_elapsed_before_pause = entry["timer_elapsed_before_pause"]
+        if entry["timer_active"]:
+            room.timer_active = True
+            room.timer_start_time = entry["timer_start_time"]
+            room.timer_seconds = room.timer_elapsed_before_pause + int(now - room.timer_start_time)
+            schedule_timer_tick(room, now - room.timer_start_time)
+        logger.info(
+            f"Estado da sala '{name}' restaurado: slide {room.slide}, "
+            f"temporizador {'ativo' if room.timer_active else 'parado'}"
+        )
+    return orphaned_sessions
+
+# Função para reconhecer um heartbeat ou pong em JSON sem decodificá-lo
+#
+# Retorna "heartbeat", "pong" ou None (mensagem que segue o caminho normal).
+# Sem regex nem json.loads: apenas comparações e uma fatia do timestamp.
+def keepalive_kind(message):
+    # O terceiro caractere separa heartbeat e pong de todo o resto ({"command": ...)
+    candidate = KEEPALIVE_PREFIXES.get(message[2:3])
+    if candidate is None or len(message) > KEEPALIVE_MAX_LENGTH:
+        return None
+    prefix, kind = candidate
+    if not message.startswith(prefix) or message[-1:] != "}":
+        return None
+    timestamp = message[len(prefix):-1].lstrip(" ")
+    return kind if timestamp.isascii() and timestamp.isdigit() else None
+
+# Função para enviar status para todos os clientes de uma sala
+#
+# "event" é a mesma mensagem no protocolo binário; sem ela, todos recebem JSON.
+# Clientes do subprotocolo de estado não recebem os textos (recebem os deltas).
+async def broadcast_status(room, status_message, event=None):
+    clients = [client for client in room.clients if not state.stateful(client)]
+    if clients:
+        started = time.perf_counter()
+        message = codec.status_frame(status_message)
+        await asyncio.gather(
+            *[client.send(event if event is not None and client.subprotocol == wire.BINARY_SUBPROTOCOL else message)
+              for client in clients],
+            return_exceptions=True
+        )
+        metrics.broadcast_latency.observe(time.perf_counter() - started)
+        logger.info(f"Status enviado para {len(clients)} cliente(s) da sala '{room.name}': {status_message}")
+
+# Função para injetar as teclas de um comando, recriando o controlador em caso de falha
+def send_command_keys(backend, command):
+    try:
+        backend.send_command(command)
+    except Exception as keyboard_error:
+        logger.error(f"Erro ao controlar teclado: {keyboard_error}")
+        backend.reset()
+        logger.info("Controlador de teclado reiniciado")
+        backend.send_command(command)
+
+# Função para pular slides: uma tecla de seta por slide, com uma pausa entre elas
+def skip_slides_keys(backend, count):
+    direction = "right" if count > 0 else "left"
+    for _ in range(abs(count)):
+        backend.tap(direction)
+        time.sleep(0.1)  # Pequeno delay entre pressionamentos
+
+# Função para ir para um slide: Home, os dígitos do número e Enter
+def goto_slide_keys(backend, number):
+    # Primeiro vá para o início (geralmente Home)
+    backend.tap("home")
+    time.sleep(0.2)
+
+    # Digite o número do slide
+    for digit in str(number):
+        backend.tap(digit)
+        time.sleep(0.1)
+
+    # Pressione Enter para ir para o slide
+    backend.tap("enter")
+
+# Função para injetar uma sequência de teclas fora do loop de eventos
+#
+# As pausas entre as teclas (SKIP_SLIDES, GOTO_SLIDE) e os subprocessos do
+# backend Wayland bloqueariam o loop, atrasando todas as salas. A sequência
+# roda em uma thread e o lock da sala mantém a ordem dos comandos da mesma
+# sala. A tarefa fica em room.injection, para que a confirmação do comando
+# aguarde as teclas. Os spans das teclas vão para o rastreamento do comando,
+# capturado aqui. Sem loop em execução (benchmarks), injeta direto.
+def inject_keys(room, func, *args):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        func(*args)
+        return
+    room.injection = asyncio.ensure_future(run_injection(room, func, args, tracing.current_trace))
+
+# Função que executa a sequência; retorna (código, texto) do erro, ou None
+async def run_injection(room, func, args, trace=None):
+    async with room.injection_lock:
+        try:
+            await asyncio.to_thread(tracing.call_traced, trace, func, *args)
+        except Exception as e:
+            logger.error(f"Erro ao injetar teclas na sala '{room.name}': {e}")
+            return wire.ERROR_INTERNAL, f"Erro interno: {str(e)}"
+    return None
+
+# Função para controlar a apresentação de uma sala
+#
+# Retorna (código, texto): o texto é a resposta dos clientes JSON e o código,
+# a dos clientes do protocolo binário. Os argumentos já foram validados pelo
+# esquema (schema.validate) antes de chegar aqui. O estado da sala é
+# atualizado na hora; as teclas são injetadas em seguida (inject_keys).
+def control_presentation(room, command, data=None):
+    if data is None:
+        data = {}
+    backend = room.backend
+    try:
+        if command in KEY_COMMANDS:
+            log_message, result, code = KEY_COMMANDS[command]
+            logger.info(log_message)
+            inject_keys(room, send_command_keys, backend, command)
+            if command == "NEXT_SLIDE":
+                room.slide += 1
+            elif command == "PREV_SLIDE":
+                room.slide = max(1, room.slide - 1)
+            elif command == "START_PRESENTATION":
+                room.slide = 1
+                room.presenting = True
+            elif command == "END_PRESENTATION":
+                room.presenting = False
+
+            # A tecla da tela preta alterna; qualquer outra tecla volta aos slides
+            room.blanked = command == "BLANK_SCREEN" and not room.blanked
+            if command in ("NEXT_SLIDE", "PREV_SLIDE", "START_PRESENTATION"):
+                restart_auto_advance(room)
+            return code, result
+
+        elif command == "SKIP_SLIDES":
+            count = data["count"]
+            logger.info(f"Comando: Pular {count} slides")
+
+            inject_keys(room, skip_slides_keys, backend, count)
+            room.slide = max(1, room.slide + count)
+            room.blanked = False
+            restart_auto_advance(room)
+
+            return wire.SLIDES_SKIPPED, f"Pulou {abs(count)} slides {'para frente' if count > 0 else 'para trás'}"
+
+        elif command == "GOTO_SLIDE":
+            # Muitos softwares de apresentação permitem ir para um slide específico usando números + Enter
+            number = data["number"]
+            logger.info(f"Comando: Ir para slide {number}")
+
+            inject_keys(room, goto_slide_keys, backend, number)
+            room.slide = number
+            room.blanked = False
+            restart_auto_advance(room)
+
+            return wire.GOTO_SLIDE_OK, f"Indo para o slide {number}"
+
+        elif command == "TIMER_START":
+            if not room.timer_active:
+                logger.info("Comando: Iniciar temporizador")
+                start_timer(room)
+
+                # O avanço automático acompanha o temporizador
+                if room.auto_advance is not None and room.auto_advance.paused:
+                    room.auto_advance.resume()
+                return wire.TIMER_STARTED, "Temporizador iniciado"
+            return wire.TIMER_ALREADY_ACTIVE, "Temporizador já está ativo"
+
+        elif command == "TIMER_STOP":
+            if room.timer_active:
+                logger.info("Comando: Parar temporizador")
+                room.timer_active = False
+                cancel_timer_tick(room)
+
+                # Salvar o tempo decorrido até o momento
+                current_elapsed = int(time.time() - room.timer_start_time)
+                room.timer_elapsed_before_pause += current_elapsed
+
+                if room.auto_advance is not None and not room.auto_advance.paused:
+                    room.auto_advance.pause()
+                return wire.TIMER_STOPPED, "Temporizador parado"
+            return wire.TIMER_NOT_ACTIVE, "Temporizador não está ativo"
+
+        elif command == "TIMER_RESET":
+            logger.info("Comando: Resetar temporizador")
+            was_active = room.timer_active
+            room.timer_active = False
+            cancel_timer_tick(room)
+
+            room.timer_seconds = 0
+            room.timer_elapsed_before_pause = 0  # Resetar o tempo acumulado
+
+            if was_active:
+                start_timer(room)
+            restart_auto_advance(room)
+
+            return wire.TIMER_RESET, "Temporizador resetado"
+
+        elif command == "PUBLISH_NOTES":
+            notes = data.get("notes", "")
+            logger.info(f"Comando: Publicar notas ({len(notes)} caracteres)")
+            room.notes = notes[:MAX_NOTES_LENGTH]
+            return wire.NOTES_PUBLISHED, "Notas publicadas"
+
+        elif command == "AUTO_ADVANCE_START":
+            logger.info("Comando: Iniciar avanço automático")
+            return start_auto_advance(room, schema.command_args(command, data))
+
+        elif command == "AUTO_ADVANCE_STOP":
+            if room.auto_advance is not None:
+                logger.info("Comando: Encerrar avanço automático")
+                stop_auto_advance(room)
+                return wire.AUTO_ADVANCE_STOPPED, "Avanço automático encerrado"
+            return wire.AUTO_ADVANCE_NOT_ACTIVE, "Avanço automático não está ativo"
+
+        elif command == "AUTO_ADVANCE_PAUSE":
+            if room.auto_advance is not None and not room.auto_advance.paused:
+                logger.info("Comando: Pausar avanço automático")
+                room.auto_advance.pause()
+                return wire.AUTO_ADVANCE_PAUSED, "Avanço automático pausado"
+            return wire.AUTO_ADVANCE_NOT_ACTIVE, "Avanço automático não está em execução"
+
+        elif command == "AUTO_ADVANCE_RESUME":
+            if room.auto_advance is not None and room.auto_advance.paused:
+                logger.info("Comando: Retomar avanço automático")
+                if not room.timer_active:
+                    start_timer(room)
+                room.auto_advance.resume()
+                return wire.AUTO_ADVANCE_RESUMED, "Avanço automático retomado"
+            return wire.AUTO_ADVANCE_NOT_ACTIVE, "Avanço automático não está pausado"
+
+        elif command == "AUTO_ADVANCE_SKIP":
+            if room.auto_advance is not None and not room.auto_advance.paused:
+                logger.info("Comando: Avançar agora (avanço automático)")
+                room.auto_advance.skip()
+                return wire.AUTO_ADVANCE_SKIPPED, "Avançando para o próximo slide"
+            return wire.AUTO_ADVANCE_NOT_ACTIVE, "Avanço automático não está em execução"
+
+        else:
+            logger.warning(f"Comando desconhecido: {command}")
+            return wire.ERROR_UNKNOWN_COMMAND, f"Comando desconhecido: {command}"
+
+    except Exception as e:
+        logger.error(f"Erro ao processar comando '{command}': {e}")
+        return wire.ERROR_INTERNAL, f"Erro interno: {str(e)}"
+
+# Função para iniciar o perfilador; o arquivo fica no diretório do log
+def start_profiler(seconds=None):
+    directory = os.path.dirname(os.path.abspath(config["log_file"]))
+    return profiler.start_profile(
+        directory, seconds or config["profile_seconds"], config["profile_interval_ms"] / 1000
+    )
+
+# Ação de administração: ativar o perfilador por "seconds" segundos
+def admin_profile(data):
+    seconds = data.get("seconds", config["profile_seconds"])
+    if not isinstance(seconds, (int, float)) or isinstance(seconds, bool) or seconds <= 0:
+        return "Erro: duração do perfil inválida"
+    path = start_profiler(seconds)
+    if path is None:
+        return "Perfilador já está ativo"
+    return f"Perfilador ativado; o perfil será salvo em {os.path.basename(path)}"
+
+# Ação de administração: relatório de tempo por slide, de uma sessão ("session")
+# ou de todas as sessões (opcionalmente de uma sala, "room")
+#
+# A consulta roda em uma thread, para não atrasar os comandos das salas.
+async def admin_dwell_report(data):
+    session = data.get("session")
+    room = data.get("room")
+    if (session is not None and type(session) is not int) or (room is not None and type(room) is not str):
+        return "Erro: sessão ou sala inválida"
+    report = await asyncio.to_thread(stats_db.dwell_report, session, room)
+    return {"status": "Relatório de tempo por slide", "report": report}
+
+# Ação de administração: uma página da exportação de "commands" ou "sessions"
+#
+# A resposta traz as linhas e o "cursor" da próxima página (null no fim); o
+# cliente repete a mensagem com esse cursor até o fim da tabela. A página é
+# lida em uma thread, como o relatório de tempo por slide.
+async def admin_export(data):
+    from . import export
+    table = data.get("table", "commands")
+    cursor = data.get("cursor") or 0
+    limit = data.get("limit", export.MAX_ADMIN_PAGE)
+    session = data.get("session")
+    if (table not in export.TABLES or type(cursor) is not int or type(limit) is not int
+            or not 0 < limit <= export.MAX_ADMIN_PAGE or (session is not None and type(session) is not int)):
+        return "Erro: parâmetros da exportação inválidos"
+    try:
+        rows, next_cursor = await asyncio.to_thread(
+            export.export_page, stats_db.db_path, table, cursor, limit, session, data.get("since"), data.get("until")
+        )
+    except (TypeError, ValueError):
+        return "Erro: período da exportação inválido"
+    return {"status": f"Exportação de {table}: {len(rows)} linha(s)", "rows": rows, "cursor": next_cursor}
+
+# Ações de administração disponíveis
+ADMIN_ACTIONS = {
+    "profile": admin_profile,
+    "dwell_report": admin_dwell_report,
+    "export": admin_export,
+}
+
+# Função para processar uma mensagem de administração (exige o admin_token da configuração)
+#
+# Retorna o texto de status ou, para ações com dados, a resposta completa (dict).
+# As ações podem ser funções ou corrotinas (as que consultam o banco).
+async def handle_admin_message(data, client_info):
+    token = config.get("admin_token")
+    supplied = data.get("token")
+    if not token or not isinstance(supplied, str) or not hmac.compare_digest(supplied.encode(), str(token).encode()):
+        logger.warning(f"Mensagem de administração recusada de {client_info}")
+        return "Erro: não autorizado"
+
+    action = ADMIN_ACTIONS.get(data["admin"])
+    if action is None:
+        return f"Ação de administração desconhecida: {data['admin']}"
+    logger.info(f"Administração: '{data['admin']}' solicitado por {client_info}")
+    reply = action(data)
+    if asyncio.iscoroutine(reply):
+        reply = await reply
+    return reply
+
+# Função para enviar o resultado de uma mensagem no protocolo do cliente: código
+# binário, resposta do subprotocolo de estado ou o frame JSON informado
+async def send_result(websocket, binary, room, code, frame):
+    if binary:
+        await websocket.send(wire.encode_result(code, room.slide))
+    elif state.stateful(websocket):
+        await websocket.send(state.result_message(room, code))
+    else:
+        await websocket.send(frame)
+
+# Função para recusar uma mensagem inválida com o código de erro da validação
+#
+# Apenas em nível debug: um cliente com defeito não deve inundar o log.
+async def reject_message(websocket, binary, room, trace, error):
+    schema.invalid_messages.inc(error)
+    logger.debug(f"Mensagem recusada ({error}) de {websocket.remote_address[0]}")
+    tracing.current_trace = None
+    if trace:
+        trace.finish(error=error)
+    await send_result(websocket, binary, room, schema.ERRORS[error][0], schema.error_frames[error])
+
+# Função para responder a um comando de navegação não aplicado por conflito com outro controle
+async def reply_conflict(websocket, binary, room, trace, outcome):
+    conflict.navigation_conflicts.inc(outcome)
+    logger.info(f"Comando de {websocket.remote_address[0]} não aplicado na sala '{room.name}': {outcome}")
+    tracing.current_trace = None
+    if trace:
+        trace.finish(conflict=outcome)
+    code = conflict.OUTCOMES[outcome][0]
+    await send_result(websocket, binary, room, code, None if binary else conflict.conflict_message(room, outcome))
+
+# Função para aplicar a ação do limite de mensagens; retorna True se o cliente foi desconectado
+async def apply_rate_limit(websocket, binary, room, client_info, action):
+    if action == ratelimit.DISCONNECT:
+        ratelimit.rate_limit_disconnects.inc()
+        logger.warning(f"Cliente {client_info} desconectado por excesso de mensagens")
+        await websocket.close(1008, "Excesso de mensagens")
+        return True
+    if action == ratelimit.NOTIFY:
+        logger.warning(f"Limite de mensagens atingido por {client_info}; descartando mensagens")
+        await send_result(websocket, binary, room, wire.ERROR_RATE_LIMITED, ratelimit.RATE_LIMITED_MESSAGE)
+    return False
+
+# Handler para conexões WebSocket
+async def handle_connection(websocket):
+    client_info = f"{websocket.remote_address[0]}:{websocket.remote_address[1]}"
+    logger.info(f"Nova conexão de: {client_info}")
+
+    # Protocolo negociado: binário, JSON com estado versionado ou JSON (clientes sem subprotocolo)
+    binary = websocket.subprotocol == wire.BINARY_SUBPROTOCOL
+    stateful = state.stateful(websocket)
+
+    # Encontrar a sala pelo caminho ou código de acesso
+    room, follow_mode = rooms.find_room(websocket.request.path)
+    if room is None:
+        logger.warning(f"Sala não encontrada ({websocket.request.path}). Recusando conexão de {client_info}")
+        if stateful:
+            await websocket.send(state.result_message(None, wire.ERROR_ROOM_NOT_FOUND))
+        else:
+            await websocket.send(ROOM_NOT_FOUND_EVENT if binary else ROOM_NOT_FOUND_MESSAGE)
+        return
+
+    # Espectadores não contam no limite de clientes nem passam pelos comandos
+    if follow_mode:
+        await follow.handle_follower(websocket, room, config["max_followers"], client_info)
+        return
+
+    # Verificar limite de clientes
+    if len(connected_clients) >= config["max_clients"]:
+        logger.warning(f"Limite de clientes atingido ({config['max_clients']}). Recusando conexão de {client_info}")
+        if stateful:
+            await websocket.send(state.result_message(room, wire.ERROR_MAX_CLIENTS))
+        else:
+            await websocket.send(MAX_CLIENTS_EVENT if binary else MAX_CLIENTS_MESSAGE)
+        return
+
+    # Adicionar cliente à lista de conectados
+    connected_clients[websocket] = room
+    room.clients.add(websocket)
+    update_client_jobs()
+
+    room.stats.stats["total_connections"] += 1
+    metrics.connections_total.inc()
+    looplag.set_activity(f"registro da sessão da sala '{room.name}' para {client_info}")
+    save_stats(room.stats)
+    track_dwell(room)
+    journal.record(room)
+    looplag.set_activity(None)
+
+    try:
+        # Enviar mensagem de boas-vindas (no subprotocolo de estado, o estado completo da sala)
+        state.publish(room, exclude=websocket)
+        if stateful:
+            await websocket.send(state.snapshot_message(room))
+        else:
+            await websocket.send(
+                WELCOME_EVENT if binary else codec.status_frame(f"Conectado ao servidor de apresentações (sala {room.name})")
+            )
+
+        # Notificar número de clientes conectados
+        await broadcast_status(
+            room, f"Clientes conectados: {len(room.clients)}", wire.encode_event(wire.CLIENTS, len(room.clients))
+        )
+
+        # Limitador de mensagens desta conexão
+        limiter = ratelimit.new_limiter()
+
+        # Loop principal para receber mensagens
+        async for message in websocket:
+            received_at = time.perf_counter()
+            client_last_seen[websocket] = time.monotonic()
+
+            # Caminho rápido dos heartbeats e pongs: sem decodificar, sem log e sem
+            # estatísticas. O heartbeat recebe o próprio frame de volta, para que o
+            # cliente meça o RTT com o timestamp que enviou.
+            if isinstance(message, str):
+                keepalive = keepalive_kind(message)
+                echo = keepalive == "heartbeat"
+            else:
+                keepalive = echo = binary and len(message) > 1 and message[0] == wire.HEARTBEAT
+            if keepalive:
+                action = limiter.check("heartbeat") if limiter else None
+                if action is not None:
+                    if await apply_rate_limit(websocket, binary, room, client_info, action):
+                        break
+                elif echo:
+                    await websocket.send(message)
+                continue
+
+            # Rastreamento amostrado; os spans só são coletados na parte síncrona,
+            # para que outras conexões não se misturem a este rastreamento
+            trace = tracing.begin("message", websocket.remote_address[1], client=client_info, bytes=len(message))
+            tracing.current_trace = trace
+            try:
+                with tracing.span("decode"):
+                    if binary and isinstance(message, bytes):
+                        data = wire.decode_command(message)
+                    else:
+                        data = codec.loads(message)
+
+                # Mensagens de administração não são registradas no log (contêm o token)
+                if type(data) is dict and "admin" in data:
+                    if not isinstance(data["admin"], str):
+                        await reject_message(websocket, binary, room, trace, "INVALID_MESSAGE")
+                        continue
+                    tracing.current_trace = None
+                    # Limite próprio, para que tentativas sem token não inundem o log
+                    action = limiter.check("admin") if limiter else None
+                    if action is not None:
+                        if await apply_rate_limit(websocket, binary, room, client_info, action):
+                            break
+                        continue
+                    reply = await handle_admin_message(data, client_info)
+                    if isinstance(reply, dict):
+                        # Respostas com dados (relatório, página da exportação) são serializadas fora do loop
+                        await websocket.send(await asyncio.to_thread(codec.dumps, reply))
+                    else:
+                        await websocket.send(codec.dumps({"status": reply}))
+                    continue
+
+                # Validar antes de qualquer log, estatística ou injeção
+                with tracing.span("validate"):
+                    error = schema.validate(data)
+                if error is not None:
+                    await reject_message(websocket, binary, room, trace, error)
+                    continue
+
+                # Limite de taxa do cliente, antes do log, das estatísticas e da injeção
+                action = limiter.check(ratelimit.message_class(data)) if limiter else None
+                if action is not None:
+                    tracing.current_trace = None
+                    if trace:
+                        trace.finish(error="RATE_LIMITED")
+                    if await apply_rate_limit(websocket, binary, room, client_info, action):
+                        break
+                    continue
+
+                # Heartbeat ou pong fora do formato do caminho rápido (ex: timestamp fracionário)
+                if "command" not in data:
+                    tracing.current_trace = None
+                    if trace:
+                        trace.finish(keepalive=True)
+                    if "heartbeat" in data:
+                        await websocket.send(codec.dumps({"heartbeat": data["heartbeat"]}))
+                    continue
+
+                command = data["command"]
+
+                # Conflito com outros controles da sala (versão do slide, combinação, posse)
+                outcome = room.navigation.check(room, websocket, command, data)
+                if outcome is not None:
+                    await reply_conflict(websocket, binary, room, trace, outcome)
+                    continue
+
+                logger.info(f"Mensagem recebida de {client_info}: {data}")
+
+                # Registrar estatísticas do comando
+                with tracing.span("stats"):
+                    record_command_stats(room.stats, command)
+                    metrics.commands_total.inc(command)
+
+                # Registrar comando no banco de dados (com os argumentos, para permitir replay)
+                with tracing.span("enqueue"):
+                    args = schema.command_args(command, data)
+                    save_command(room.stats, command, websocket.remote_address[0], args)
+
+                # Executar comando
+                looplag.set_activity(f"comando {command} de {client_info} na sala '{room.name}'")
+                room.injection = None
+                with tracing.span("inject", backend=room.backend.name, room=room.name):
+                    code, result = control_presentation(room, command, data)
+                injection = room.injection
+                looplag.set_activity(None)
+                if code < state.FIRST_ERROR_CODE:
+                    room.navigation.applied(websocket, command, data)
+                record_room_state(room)
+                if follow.watched(room):
+                    with tracing.span("publish", followers=len(room.followers)):
+                        follow.publish(room)
+                tracing.current_trace = None
+
+                # Confirmar só depois de as teclas serem injetadas (sem bloquear o loop)
+                if injection is not None:
+                    keys_started = time.perf_counter()
+                    failure = await injection
+                    if failure is not None:
+                        code, result = failure
+                    if trace:
+                        trace.add_span("keys", keys_started, time.perf_counter())
+                metrics.command_latency.observe(time.perf_counter() - received_at, command)
+
+                # Enviar confirmação para o cliente (em JSON sem subprotocolo, com a
+                # versão só se o comando trouxe uma; os demais usam o frame em cache)
+                reply_started = time.perf_counter()
+                if binary:
+                    await websocket.send(wire.encode_result(code, room.slide))
+                elif stateful:
+                    await websocket.send(state.result_message(room, code))
+                elif "version" in data:
+                    await websocket.send(codec.dumps({"status": result, "version": room.state_version}))
+                else:
+                    await websocket.send(codec.status_frame(result))
+                if trace:
+                    trace.add_span("reply", reply_started, time.perf_counter())
+                    trace.finish(command=command)
+
+            except ValueError:
+                # JSON inválido ou mensagem binária malformada
+                await reject_message(websocket, binary, room, trace, "INVALID_MESSAGE")
+            finally:
+                tracing.current_trace = None
+
+    except websockets.exceptions.ConnectionClosed as e:
+        logger.info(f"Conexão fechada com {client_info}: {e}")
+
+    finally:
+        # Remover cliente da lista quando desconectar
+        room.clients.discard(websocket)
+        room.navigation.release(websocket)
+        client_last_seen.pop(websocket, None)
+        if connected_clients.pop(websocket, None) is not None:
+            logger.info(f"Cliente desconectado: {client_info}")
+        update_client_jobs()
+
+        # Notificar número de clientes restantes
+        state.publish(room)
+        if room.clients:
+            await broadcast_status(
+                room, f"Clientes conectados: {len(room.clients)}", wire.encode_event(wire.CLIENTS, len(room.clients))
+            )
+
+# Função de limpeza para encerramento do servidor
+async def shutdown(server):
+    logger.info("Desligando servidor...")
+
+    # Notificar clientes sobre o desligamento
+    if connected_clients:
+        await asyncio.gather(
+            *[client.send(SHUTDOWN_EVENT if client.subprotocol == wire.BINARY_SUBPROTOCOL else SHUTDOWN_MESSAGE)
+              for client in connected_clients],
+            return_exceptions=True
+        )
+
+    # Avisar também os espectadores
+    followers = [websocket for room in rooms.rooms.values() for websocket in room.followers]
+    follow.broadcast(followers, SHUTDOWN_MESSAGE)
+
+    # Fechar todas as conexões
+    for client in list(connected_clients) + followers:
+        await client.close()
+
+    # Parar o servidor
+    server.close()
+    await server.wait_closed()
+    logger.info("Servidor desligado com sucesso")
+
+# Função para ligar ou desligar as tarefas periódicas que dependem de clientes
+#
+# Sem clientes conectados, a verificação das conexões e o monitor de atraso
+# do loop ficam parados, e o servidor não acorda entre os eventos.
+def update_client_jobs():
+    global connection_check_job
+    if connected_clients and connection_check_job is None:
+        connection_check_job = scheduler.every(
+            CONNECTION_CHECK_INTERVAL, check_client_connections,
+            jitter=1.0, slack=5.0, name="verificação das conexões"
+        )
+        if lag_monitor is not None:
+            lag_monitor.resume()
+    elif not connected_clients and connection_check_job is not None:
+        connection_check_job.cancel()
+        connection_check_job = None
+        if lag_monitor is not None:
+            lag_monitor.pause()
+
+# Verificação periódica de conexões (tarefa do agendador, a cada 30 segundos)
+async def check_client_connections():
+    # Enviar ping para verificar clientes ativos
+    now = int(time.time())
+    ping_message = codec.dumps({"ping": now})
+    ping_event = wire.encode_event(wire.PING, now)
+
+    # Clientes que enviaram algo (ex: um heartbeat) desde o último ping não precisam de outro
+    since = time.monotonic() - CONNECTION_CHECK_INTERVAL
+    clients = [client for client in connected_clients if client_last_seen.get(client, 0) < since]
+    results = await asyncio.gather(
+        *[client.send(ping_event if client.subprotocol == wire.BINARY_SUBPROTOCOL else ping_message)
+          for client in clients],
+        return_exceptions=True
+    )
+
+    # Verificar resultados para detectar conexões com problemas
+    for client, result in zip(clients, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Detectado cliente não responsivo: {client.remote_address}")
+
+            try:
+                # Tentar fechar graciosamente
+                await client.close()
+            except:
+                pass
+
+            # Remover da lista se ainda estiver lá
+            client_last_seen.pop(client, None)
+            room = connected_clients.pop(client, None)
+            if room is not None:
+                room.clients.discard(client)
+                state.publish(room)
+                logger.info(f"Cliente removido: {client.remote_address}")
+    update_client_jobs()
+
+# Função principal
+async def main(defaults=None, base_dir=None):
+    global config, lag_monitor
+
+    startup_profile.mark("importações")
+
+    # Carregar configurações
+    config = load_config(defaults)
+    startup_profile.mark("configuração")
+
+    # Configurar logging para arquivo se solicitado
+    if config["log_to_file"]:
+        file_handler = logging.FileHandler(config["log_file"])
+        file_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+        logger.addHandler(file_handler)
+        logger.info(f"Logs sendo salvos em {config['log_file']}")
+
+    # Modo --dwell-report: imprimir o relatório de tempo por slide e sair, sem iniciar o servidor
+    if config["dwell_report"] is not None:
+        stats_db.init_stats_db(os.path.join(base_dir or os.getcwd(), config["stats_db"]))
+        print(stats_db.format_dwell_report(stats_db.dwell_report(**config["dwell_report"])))
+        return
+
+    # Modo --convert-command-log: passar o registro binário para a tabela "commands" e sair
+    if config["convert_command_log"]:
+        from . import cmdlog
+        stats_db.init_stats_db(os.path.join(base_dir or os.getcwd(), config["stats_db"]))
+        try:
+            count = cmdlog.convert_to_sqlite(command_log_path(config, base_dir), stats_db.db_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro na conversão do registro de comandos: {e}")
+            return
+        logger.info(f"Conversão concluída: {count} comando(s) gravados em {stats_db.db_path}")
+        return
+
+    # Modo --export: exportar as estatísticas e sair, sem iniciar o servidor
+    if config["export"] is not None:
+        from . import export
+        stats_db.init_stats_db(os.path.join(base_dir or os.getcwd(), config["stats_db"]))
+        try:
+            count = export.export_table(stats_db.db_path, **config["export"])
+        except ValueError as e:
+            logger.error(f"Erro na exportação: {e}")
+            return
+        logger.info(f"Exportação concluída: {count} linha(s) de {config['export']['table']}")
+        return
+
+    # Rastreamento de mensagens (desativado com taxa 0)
+    if config["trace_sample_rate"] > 0:
+        tracing.configure(
+            os.path.join(base_dir or os.getcwd(), config["trace_file"]),
+            config["trace_sample_rate"], config["trace_max_bytes"]
+        )
+
+    # Criar as salas, cada uma com seu backend de entrada
+    rooms.create_rooms(config)
+
+    # Limite de mensagens por cliente
+    ratelimit.configure(config)
+    startup_profile.mark("backend de entrada")
+
+    # Restaurar o estado das salas se o servidor não foi encerrado normalmente
+    # (no --startup-profile, o diário real não é lido, reescrito nem apagado)
+    journal_path = None if startup_profile.is_child() else state_journal_path(config, base_dir)
+    if journal_path:
+        if not journal.lock(journal_path):
+            logger.error(f"O diário de estado {journal_path} está em uso por outro servidor")
+            logger.info("Use --stats-db ou --state-journal para separar as instâncias.")
+            sys.exit(1)
+        orphaned_sessions = restore_rooms(journal_path)
+
+        # Fechar as sessões que ficaram abertas na queda anterior antes de
+        # reescrever o diário, que é o único registro delas
+        if orphaned_sessions:
+            stats_db.init_stats_db(os.path.join(base_dir or os.getcwd(), config["stats_db"]))
+            stats_db.close_sessions(orphaned_sessions)
+            logger.info(f"Sessões abertas fechadas após encerramento inesperado: {len(orphaned_sessions)}")
+        journal.start(journal_path, [journal.room_record(room) for room in rooms.rooms.values()])
+        startup_profile.mark("diário de estado")
+
+    # Configurações do servidor
+    host = config["host"]
+    port = config["port"]
+
+    logger.info("Iniciando servidor de controle de apresentações...")
+
+    try:
+        # Iniciar o servidor antes de descobrir os IPs, para aceitar conexões o quanto antes
+        # Sem compressão: as mensagens são pequenas, e a compressão por conexão
+        # impediria que o estado dos espectadores fosse serializado uma única vez
+        server = await websockets.serve(
+            handle_connection, host, port, compression=None, select_subprotocol=wire.select_subprotocol
+        )
+    except OSError as e:
+        logger.error(f"Erro ao iniciar servidor: {e}")
+        logger.error("A porta já está em uso ou não está disponível. Tente uma porta diferente.")
+        logger.info("Você pode usar --port para especificar uma porta diferente.")
+        sys.exit(1)
+    logger.info(f"Servidor WebSocket iniciado em {host}:{port}")
+    logger.debug(f"Codificação JSON: {codec.name}")
+    startup_profile.mark("servidor aceitando conexões")
+
+    # O banco de estatísticas fica ao lado do script, salvo caminho absoluto
+    stats_db.init_stats_db(os.path.join(base_dir or os.getcwd(), config["stats_db"]))
+    stats_db.start_command_writer()
+    if config["stats_engine"] == "binlog":
+        stats_db.open_command_log(command_log_path(config, base_dir))
+        logger.info("Comandos gravados no registro binário")
+
+    # Endpoint de métricas opcional, em uma porta separada
+    metrics_server = None
+    if config["metrics_port"]:
+        metrics_server = await metrics.start_metrics_server(config["metrics_host"], config["metrics_port"])
+
+    # Workers de espectadores opcionais (SO_REUSEPORT só distribui as conexões no Linux)
+    follow_hub = None
+    if config["follow_workers"] > 0:
+        if sys.platform.startswith("linux"):
+            from . import workers
+            follow_hub = workers.WorkerHub(
+                config["follow_workers"], host, config["follow_port"] or port + 1, config["max_followers"]
+            )
+            await follow_hub.start()
+        else:
+            logger.warning("Workers de espectadores exigem Linux; os espectadores serão atendidos pelo processo principal")
+
+    # Monitor do atraso do loop de eventos; a verificação das conexões e a
+    # amostragem do atraso são tarefas do agendador, ativas enquanto há clientes
+    lag_monitor = looplag.LoopLagMonitor(threshold=config["loop_lag_threshold_ms"] / 1000)
+    lag_monitor.start()
+
+    # Salas em modo quiosque: avanço automático desde a abertura do servidor
+    for room in rooms.rooms.values():
+        if room.auto_advance_autostart:
+            start_auto_advance(room, {})
+            logger.info(f"Avanço automático da sala '{room.name}' iniciado")
+
+    # Sinal SIGUSR1: ativar o perfilador sem reiniciar o servidor (indisponível no Windows)
+    if hasattr(signal, "SIGUSR1"):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, start_profiler)
+
+    try:
+        if startup_profile.is_child():
+            # Modo --startup-profile: informar o tempo e encerrar
+            startup_profile.report_ready()
+            return
+
+        # Exibir todos os IPs de rede encontrados (será mostrado no console)
+        log_ip_addresses(port)
+        rooms.log_rooms()
+        logger.info("Pressione Ctrl+C para encerrar")
+
+        # Manter servidor em execução
+        await asyncio.Future()
+    except asyncio.CancelledError:
+        # Ocorre quando o loop principal é cancelado
+        pass
+    finally:
+        # Cancelar as tarefas agendadas (temporizadores, verificação das conexões, monitor)
+        lag_monitor.stop()
+        scheduler.stop()
+
+        # Garantir que os servidores sejam encerrados corretamente
+        await shutdown(server)
+        if follow_hub is not None:
+            await follow_hub.stop()
+        if metrics_server is not None:
+            metrics_server.close()
+            await metrics_server.wait_closed()
+
+        # Gravar comandos pendentes (e o tempo dos slides em exibição) e salvar estatísticas finais
+        for room in rooms.rooms.values():
+            stats_db.track_slide(room.stats, None)
+        stats_db.stop_command_writer()
+        for room in rooms.rooms.values():
+            if room.stats.session_id is not None:
+                save_stats(room.stats, session_end=True)
+        journal.stop()
+        tracing.shutdown()
+
+# Função chamada pelos scripts de cada plataforma
+def run(defaults=None, script=None):
+    # Necessário para iniciar os workers de espectadores em executáveis do PyInstaller
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+
+    # Configuração de logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    if startup_profile.requested() and not startup_profile.is_child():
+        sys.exit(startup_profile.run_profile(script or sys.argv[0]))
+
+    base_dir = os.path.dirname(os.path.abspath(script)) if script else None
+
+    try:
+        # Fix para asyncio no Windows
+        if sys.platform.startswith('win'):
+            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+        # Criar e gerenciar o loop de eventos manualmente para melhor controle
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        main_task = loop.create_task(main(defaults, base_dir))
+
+        try:
+            loop.run_until_complete(main_task)
+        except KeyboardInterrupt:
+            logger.info("Interrupção de teclado detectada...")
+            # Cancelar a tarefa principal
+            main_task.cancel()
+            # Esperar que a tarefa conclua sua limpeza
+            try:
+                loop.run_until_complete(main_task)
+            except asyncio.CancelledError:
+                pass
+        finally:
+            loop.close()
+            logger.info("Programa encerrado")
+    except Exception as e:
+        logger.error(f"Erro crítico no servidor: {e}")
@@ -0,0 +1,177 @@
+import csv
+import gzip
+import json
+import sqlite3
+from datetime import datetime
+
+from . import codec
+
+# Exportação das tabelas de estatísticas em NDJSON ou CSV
+#
+# As linhas são lidas em páginas pela chave primária (WHERE id > <última
+# lida> ORDER BY id LIMIT n), e cada página é escrita antes da próxima ser
+# lida: a memória usada não depende do tamanho do banco. Os filtros de sessão
+# e de período usam os índices de session_id e do horário; o período é
+# convertido uma vez em um intervalo de ids, que as páginas percorrem pela
+# chave primária. O NDJSON de "commands" pode ser reproduzido com
+# benchmarks/replay.py --ndjson.
+
+# Colunas exportadas de cada tabela e a coluna de horário usada no período
+TABLES = {
+    "commands": ("id", "session_id", "timestamp", "command", "client_ip", "args"),
+    "sessions": ("id", "start_time", "end_time", "total_connections", "total_commands", "room"),
+}
+TIME_COLUMNS = {"commands": "timestamp", "sessions": "start_time"}
+SESSION_COLUMNS = {"commands": "session_id", "sessions": "id"}
+FORMATS = ("ndjson", "csv")
+
+# Linhas por página (exportação para arquivo) e máximo por mensagem de administração
+PAGE_SIZE = 1000
+MAX_ADMIN_PAGE = 1000
+
+# Função para normalizar um horário ISO (data ou data e hora) no formato gravado no banco
+def parse_time(value):
+    return datetime.fromisoformat(value).isoformat() if value else None
+
+# Função para converter o período em um intervalo de ids (primeiro id, último id)
+#
+# Os ids crescem com o horário; as páginas ainda conferem o horário de cada
+# linha, caso o relógio do computador tenha sido ajustado.
+def id_range(conn, table, since, until):
+    column = TIME_COLUMNS[table]
+    first = last = None
+    if since is not None:
+        row = conn.execute(
+            f"SELECT id FROM {table} WHERE {column} >= ? ORDER BY {column}, id LIMIT 1", (since,)
+        ).fetchone()
+        if row is None:
+            return None
+        first = row[0]
+    if until is not None:
+        row = conn.execute(
+            f"SELECT id FROM {table} WHERE {column} < ? ORDER BY {column} DESC, id DESC LIMIT 1", (until,)
+        ).fetchone()
+        if row is None:
+            return None
+        last = row[0]
+    return first, last
+
+# Classe que lê uma tabela em páginas, a partir de um cursor (último id lido)
+class PageReader:
+    def __init__(self, conn, table, session=None, since=None, until=None):
+        if table not in TABLES:
+            raise ValueError(f"tabela desconhecida: {table}")
+        self.conn = conn
+        self.table = table
+        self.empty = False
+
+        # Condições da consulta; o "+" impede que o horário seja usado como
+        # índice, para que cada página siga a chave primária
+        time_column = TIME_COLUMNS[table]
+        conditions = ["id > ?"]
+        params = []
+        if session is not None:
+            conditions.append(f"{SESSION_COLUMNS[table]} = ?")
+            params.append(session)
+        if since is not None or until is not None:
+            bounds = id_range(conn, table, since, until)
+            if bounds is None:
+                self.empty = True
+            else:
+                first, last = bounds
+                if first is not None:
+                    conditions.append("id >= ?")
+                    params.append(first)
+                if last is not None:
+                    conditions.append("id <= ?")
+                    params.append(last)
+        if since is not None:
+            conditions.append(f"+{time_column} >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append(f"+{time_column} < ?")
+            params.append(until)
+        self.params = params
+        self.query = (
+            f"SELECT {', '.join(TABLES[table])} FROM {table} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?"
+        )
+
+    # Retorna as próximas linhas (tuplas) após o id "cursor"
+    def page(self, cursor, limit):
+        if self.empty:
+            return []
+        return self.conn.execute(self.query, [cursor] + self.params + [limit]).fetchall()
+
+    # Percorre todas as linhas, página por página
+    def rows(self, page_size=PAGE_SIZE):
+        cursor = 0
+        while True:
+            page = self.page(cursor, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            cursor = page[-1][0]
+
+# Função para converter uma linha em dict (args de "commands" volta a ser um objeto)
+def row_dict(table, row):
+    entry = dict(zip(TABLES[table], row))
+    if table == "commands":
+        entry["args"] = json.loads(entry["args"]) if entry["args"] else {}
+    return entry
+
+# Função para abrir o arquivo de saída (".gz" comprime)
+def open_output(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", compresslevel=6, encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+# Função para escolher o formato pela extensão do arquivo (padrão NDJSON)
+def guess_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "ndjson"
+
+# Função para exportar uma tabela para um arquivo; retorna o número de linhas
+def export_table(db_path, out_path, table="commands", fmt=None, session=None, since=None, until=None):
+    fmt = fmt or guess_format(out_path)
+    if fmt not in FORMATS:
+        raise ValueError(f"formato desconhecido: {fmt}")
+
+    since = parse_time(since)
+    until = parse_time(until)
+    conn = sqlite3.connect(db_path)
+    try:
+        reader = PageReader(conn, table, session, since, until)
+    except Exception:
+        conn.close()
+        raise
+    out = open_output(out_path)
+    count = 0
+    try:
+        if fmt == "csv":
+            writer = csv.writer(out)
+            writer.writerow(TABLES[table])
+            for row in reader.rows():
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in reader.rows():
+                out.write(codec.dumps(row_dict(table, row)) + "\n")
+                count += 1
+    finally:
+        conn.close()
+        out.close()
+    return count
+
+# Função para ler uma página para a mensagem de administração
+#
+# Retorna (linhas como dicts, próximo cursor ou None no fim).
+def export_page(db_path, table="commands", cursor=0, limit=MAX_ADMIN_PAGE, session=None, since=None, until=None):
+    conn = sqlite3.connect(db_path)
+    try:
+        reader = PageReader(conn, table, session, parse_time(since), parse_time(until))
+        page = reader.page(cursor, limit)
+    finally:
+        conn.close()
+    next_cursor = page[-1][0] if len(page) == limit else None
+    return [row_dict(table, row) for row in page], next_cursor
@@ -0,0 +1,144 @@
+import logging
+
+import websockets
+from websockets.asyncio.server import broadcast
+
+from . import codec, metrics
+from .scheduler import scheduler
+
+logger = logging.getLogger("presentation-controller")
+
+# Modo espectador: a plateia se conecta somente para leitura
+# (ws://host:porta/<sala>/follow) e recebe o estado da sala: slide atual,
+# temporizador e notas publicadas pelo apresentador. Espectadores não passam
+# pelo caminho dos comandos nem geram registros de estatísticas.
+#
+# O estado é serializado uma única vez por mudança e enviado a todos os
+# espectadores com broadcast(), sem uma tarefa por conexão. A entrega é do
+# último valor: um espectador lento (com o buffer de escrita cheio) não
+# acumula estados intermediários; ele recebe apenas o estado mais recente
+# quando o buffer esvaziar.
+
+# Buffer de escrita (bytes) acima do qual o espectador é considerado lento
+SLOW_BUFFER_BYTES = 64 * 1024
+
+# Intervalo de verificação dos espectadores lentos (segundos)
+CATCH_UP_INTERVAL = 0.25
+
+followers_gauge = metrics.Gauge(
+    "slidecontroller_followers", "Espectadores conectados (todas as salas)"
+)
+snapshots_published = metrics.Counter(
+    "slidecontroller_follow_snapshots_total", "Estados publicados para os espectadores"
+)
+snapshots_skipped = metrics.Counter(
+    "slidecontroller_follow_snapshots_skipped_total", "Estados não enviados a espectadores lentos (substituídos pelo mais recente)"
+)
+
+# Total de espectadores, atualizado na entrada e saída
+total_followers = 0
+
+# Funções chamadas com (sala, mensagem) a cada estado publicado (ex: workers de espectadores)
+relays = []
+
+# Função para saber se alguém acompanha a sala (espectadores locais ou workers)
+def watched(room):
+    return bool(room.followers or relays)
+
+# Função para montar o estado da sala enviado aos espectadores
+def room_snapshot(room):
+    minutes, seconds = divmod(room.timer_seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return {
+        "follow": {
+            "room": room.name,
+            "slide": room.slide,
+            "timer": f"{hours:02d}:{minutes:02d}:{seconds:02d}",
+            "timer_active": room.timer_active,
+            "notes": room.notes,
+        }
+    }
+
+# Função para publicar o estado da sala, se ele mudou
+def publish(room):
+    message = codec.dumps(room_snapshot(room))
+    if message == room.snapshot_message:
+        return
+    for relay in relays:
+        relay(room, message)
+    deliver(room, message)
+
+# Função para enviar um estado já serializado aos espectadores da sala
+def deliver(room, message):
+    room.snapshot_message = message
+    if not room.followers:
+        return
+
+    snapshots_published.inc()
+    ready = []
+    for websocket in room.followers:
+        if websocket in room.stale_followers:
+            snapshots_skipped.inc()
+        elif websocket.transport.get_write_buffer_size() > SLOW_BUFFER_BYTES:
+            room.stale_followers.add(websocket)
+            snapshots_skipped.inc()
+        else:
+            ready.append(websocket)
+    broadcast(ready, message)
+
+    if room.stale_followers and room.catch_up_job is None:
+        room.catch_up_job = scheduler.every(
+            CATCH_UP_INTERVAL, catch_up, room, slack=CATCH_UP_INTERVAL / 2, name=f"espectadores lentos {room.name}"
+        )
+
+# Tarefa periódica que envia o estado mais recente aos espectadores lentos
+# quando seus buffers esvaziam; é cancelada quando não resta nenhum
+def catch_up(room):
+    ready = [
+        websocket for websocket in room.stale_followers
+        if websocket.transport.get_write_buffer_size() <= SLOW_BUFFER_BYTES
+    ]
+    if ready:
+        room.stale_followers.difference_update(ready)
+        broadcast(ready, room.snapshot_message)
+    if not room.stale_followers:
+        room.catch_up_job.cancel()
+        room.catch_up_job = None
+
+# Handler para conexões de espectadores
+#
+# Com refresh=False, o estado não é recalculado na entrada do primeiro
+# espectador (nos workers, o estado vem sempre do processo principal).
+async def handle_follower(websocket, room, max_followers, client_info, refresh=True):
+    global total_followers
+
+    if len(room.followers) >= max_followers:
+        logger.warning(f"Limite de espectadores da sala '{room.name}' atingido ({max_followers}). Recusando {client_info}")
+        await websocket.send(codec.dumps({
+            "status": "Erro: Limite de espectadores atingido",
+            "error": "MAX_FOLLOWERS_REACHED"
+        }))
+        return
+
+    # Sem espectadores o estado não é publicado; o primeiro a entrar o atualiza
+    if refresh and not room.followers:
+        room.snapshot_message = codec.dumps(room_snapshot(room))
+
+    room.followers.add(websocket)
+    total_followers += 1
+    followers_gauge.set(total_followers)
+    logger.debug(f"Espectador {client_info} entrou na sala '{room.name}' ({len(room.followers)} espectador(es))")
+
+    try:
+        await websocket.send(room.snapshot_message)
+
+        # Somente leitura: mensagens recebidas são descartadas
+        async for _ in websocket:
+            pass
+    except websockets.exceptions.ConnectionClosed:
+        pass
+    finally:
+        room.followers.discard(websocket)
+        room.stale_followers.discard(websocket)
+        total_followers -= 1
+        followers_gauge.set(total_followers)
@@ -0,0 +1,188 @@
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+from . import codec, metrics
+
+logger = logging.getLogger("presentation-controller")
+
+# Diário do estado das salas, para recuperação após uma queda
+#
+# Cada mudança de estado de uma sala (slide, notas, transições do
+# temporizador, abertura da sessão de estatísticas) é acrescentada ao arquivo
+# como uma linha NDJSON com o estado completo da sala. Uma thread separada
+# grava os registros em lotes, com um único fsync por lote. Ao iniciar, o
+# servidor lê o diário (apenas o último registro de cada sala importa),
+# restaura o slide e o temporizador e fecha as sessões que ficaram abertas, sem
+# consultar o banco de estatísticas. Em um encerramento normal o diário é
+# apagado; ele só existe depois de uma queda (ou enquanto o servidor roda).
+# Um lock exclusivo impede que dois processos usem o mesmo diário.
+
+# Tempo (segundos) que a thread espera por mais registros antes de gravar um lote
+BATCH_DELAY = 0.05
+
+# Tamanho a partir do qual o diário é reescrito só com o último estado de cada sala
+COMPACT_BYTES = 256 * 1024
+
+# Estados mais antigos que isto não são restaurados (a sessão ainda é fechada)
+RESTORE_MAX_AGE = 6 * 3600
+
+journal_queue = queue.Queue()
+writer_thread = None
+journal_path = None
+lock_file = None
+
+journal_fsyncs = metrics.Counter(
+    "slidecontroller_state_journal_fsyncs_total", "Lotes gravados (com fsync) no diário de estado"
+)
+
+# Função para montar o registro do estado de uma sala
+def room_record(room):
+    return {
+        "room": room.name,
+        "time": time.time(),
+        "session": room.stats.session_id,
+        "session_start": room.stats.stats["start_time"],
+        "connections": room.stats.stats["total_connections"],
+        "commands": room.stats.stats["commands_executed"],
+        "slide": room.slide,
+        "presenting": room.presenting,
+        "blanked": room.blanked,
+        "notes": room.notes,
+        "timer_active": room.timer_active,
+        "timer_seconds": room.timer_seconds,
+        "timer_start_time": room.timer_start_time,
+        "timer_elapsed_before_pause": room.timer_elapsed_before_pause,
+    }
+
+# Função para registrar o estado atual de uma sala (não bloqueia o loop de eventos)
+def record(room):
+    if writer_thread is not None:
+        journal_queue.put(codec.dumps(room_record(room)))
+
+# Função para ler o diário: último registro de cada sala
+#
+# Uma linha incompleta no fim do arquivo (queda durante a escrita) é ignorada.
+def read_journal(path):
+    latest = {}
+    try:
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    entry = codec.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and "room" in entry:
+                    latest[entry["room"]] = entry
+    except FileNotFoundError:
+        pass
+    return latest
+
+# Função para reescrever o diário com os registros informados (arquivo temporário + rename)
+def compact(path, lines):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+# Thread que grava os registros em lotes, com um fsync por lote
+def journal_writer(f, latest):
+    while True:
+        line = journal_queue.get()
+        if line is None:
+            break
+        lines = [line]
+        stop = False
+        deadline = time.monotonic() + BATCH_DELAY
+        while True:
+            try:
+                line = journal_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if line is None:
+                stop = True
+                break
+            lines.append(line)
+        try:
+            f.write("".join(line + "\n" for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
+            journal_fsyncs.inc()
+
+            # Guardar o último registro de cada sala para a compactação
+            for line in lines:
+                latest[codec.loads(line)["room"]] = line
+            if f.tell() > COMPACT_BYTES:
+                f.close()
+                compact(journal_path, latest.values())
+                f = open(journal_path, "a", encoding="utf-8")
+        except Exception as e:
+            logger.error(f"Erro ao gravar o diário de estado: {e}")
+        if stop:
+            break
+    f.close()
+
+# Função para obter o lock exclusivo do diário (False se outro processo já o tem)
+#
+# O lock fica em um arquivo ao lado do diário (<diário>.lock), porque o
+# diário é substituído a cada compactação. O arquivo de lock não é apagado:
+# apagá-lo permitiria que dois processos travassem arquivos diferentes.
+def lock(path):
+    global lock_file
+    f = open(path + ".lock", "a+")
+    try:
+        if sys.platform.startswith("win"):
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    lock_file = f
+    return True
+
+# Função para liberar o lock do diário
+def unlock():
+    global lock_file
+    if lock_file is not None:
+        lock_file.close()
+        lock_file = None
+
+# Função para abrir o diário e iniciar a thread de escrita
+#
+# O diário começa com os registros informados (o estado restaurado das salas),
+# descartando o histórico anterior.
+def start(path, entries):
+    global writer_thread, journal_path
+    journal_path = path
+    latest = {entry["room"]: codec.dumps(entry) for entry in entries}
+    compact(path, latest.values())
+    f = open(path, "a", encoding="utf-8")
+    writer_thread = threading.Thread(target=journal_writer, args=(f, latest), name="state-journal")
+    writer_thread.daemon = True
+    writer_thread.start()
+
+# Função para encerrar a thread de escrita; em um encerramento normal, o diário é apagado
+def stop(clean=True):
+    global writer_thread
+    if writer_thread is None:
+        unlock()
+        return
+    journal_queue.put(None)
+    writer_thread.join(5.0)
+    writer_thread = None
+    if clean:
+        try:
+            os.remove(journal_path)
+        except OSError as e:
+            logger.warning(f"Não foi possível apagar o diário de estado: {e}")
+    unlock()
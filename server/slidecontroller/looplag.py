@@ -0,0 +1,108 @@
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from . import metrics
+from .scheduler import scheduler
+
+logger = logging.getLogger("presentation-controller")
+
+# O que o loop de eventos está fazendo agora (ex: o comando em andamento),
+# incluído no log quando o loop fica bloqueado
+current_activity = None
+
+slow_callbacks = metrics.Counter(
+    "slidecontroller_slow_callbacks_total", "Vezes em que o loop de eventos ficou bloqueado além do limite"
+)
+
+# Função para registrar a atividade em andamento (None quando terminar)
+def set_activity(activity):
+    global current_activity
+    current_activity = activity
+
+# Monitor de atraso do loop de eventos
+#
+# Uma tarefa periódica do agendador roda a cada "interval" segundos e registra
+# o atraso de cada execução. Uma thread de vigia acorda logo após a próxima
+# execução esperada; se ela ainda não aconteceu após "threshold" segundos,
+# captura a pilha da thread do loop (o callback que está bloqueando) e a
+# registra no log junto com a atividade em andamento.
+#
+# O monitor só fica ativo enquanto há clientes conectados (resume/pause): sem
+# clientes, nem a tarefa nem a thread de vigia acordam.
+class LoopLagMonitor:
+    def __init__(self, interval=0.5, threshold=0.1):
+        self.interval = interval
+        self.threshold = threshold
+        self.last_tick = time.monotonic()
+        self.stall_reported = False
+        self.loop_thread_id = None
+        self.job = None
+        self.active = threading.Event()
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        if self.threshold > 0:
+            watchdog = threading.Thread(target=self.watchdog, name="loop-lag-watchdog")
+            watchdog.daemon = True
+            watchdog.start()
+
+    def resume(self):
+        if self.job is None:
+            self.last_tick = time.monotonic()
+            self.job = scheduler.every(self.interval, self.tick, name="monitor de atraso do loop")
+            self.active.set()
+
+    def pause(self):
+        if self.job is not None:
+            self.active.clear()
+            self.job.cancel()
+            self.job = None
+
+    def stop(self):
+        self.pause()
+        self.stopped.set()
+        self.active.set()
+
+    def tick(self):
+        now = time.monotonic()
+        lag = max(0.0, now - self.last_tick - self.interval)
+        metrics.event_loop_lag.observe(lag)
+        if self.stall_reported:
+            logger.warning(f"Loop de eventos voltou a responder após {lag * 1000:.0f} ms de atraso")
+        self.last_tick = now
+        self.stall_reported = False
+
+    def watchdog(self):
+        while True:
+            # Sem clientes, esperar sem prazo até o monitor ser retomado
+            self.active.wait()
+            if self.stopped.is_set():
+                return
+
+            # Dormir até o momento em que o atraso passaria do limite
+            deadline = self.last_tick + self.interval + self.threshold
+            if self.stopped.wait(max(0.0, deadline - time.monotonic())):
+                return
+            if not self.active.is_set():
+                continue
+            late = time.monotonic() - self.last_tick - self.interval
+            if late >= self.threshold and not self.stall_reported:
+                self.stall_reported = True
+                self.report_stall(late)
+            elif self.stall_reported:
+                # Já reportado: verificar de novo após um intervalo
+                if self.stopped.wait(self.interval):
+                    return
+
+    def report_stall(self, late):
+        slow_callbacks.inc()
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "(pilha indisponível)\n"
+        logger.warning(
+            f"Loop de eventos bloqueado há {late * 1000:.0f} ms "
+            f"(atividade: {current_activity or 'desconhecida'}). Pilha do callback em execução:\n{stack}"
+        )
@@ -0,0 +1,171 @@
+import asyncio
+import bisect
+import logging
+import os
+
+logger = logging.getLogger("presentation-controller")
+
+# Comandos conhecidos; qualquer outro nome vira o rótulo "other", para que
+# nomes enviados pelos clientes não criem séries novas sem limite
+COMMAND_LABELS = {
+    "NEXT_SLIDE", "PREV_SLIDE", "START_PRESENTATION", "END_PRESENTATION",
+    "BLANK_SCREEN", "SKIP_SLIDES", "GOTO_SLIDE",
+    "TIMER_START", "TIMER_STOP", "TIMER_RESET", "PUBLISH_NOTES",
+    "AUTO_ADVANCE_START", "AUTO_ADVANCE_PAUSE", "AUTO_ADVANCE_RESUME", "AUTO_ADVANCE_SKIP", "AUTO_ADVANCE_STOP",
+}
+
+# Limites dos histogramas de latência (segundos)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Métricas registradas, na ordem de exportação
+registry = []
+
+# Função para limitar um valor de rótulo a um conjunto conhecido
+def bounded_label(value, allowed, other="other"):
+    return value if value in allowed else other
+
+# Contador com um rótulo opcional de valores limitados
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, label=None, allowed=None):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.allowed = allowed
+        self.values = {}
+        registry.append(self)
+
+    def inc(self, label_value=None, amount=1):
+        if self.allowed is not None:
+            label_value = bounded_label(label_value, self.allowed)
+        self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def samples(self):
+        for label_value, value in sorted(self.values.items(), key=lambda item: str(item[0])):
+            yield self.name, self._labels(label_value), value
+
+    def _labels(self, label_value, extra=""):
+        parts = []
+        if self.label is not None and label_value is not None:
+            parts.append(f'{self.label}="{label_value}"')
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+# Medidor: valor definido diretamente ou calculado no momento da coleta
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, function=None):
+        super().__init__(name, help_text)
+        self.function = function
+
+    def set(self, value):
+        self.values[None] = value
+
+    def samples(self):
+        if self.function is not None:
+            value = self.function()
+            if value is not None:
+                yield self.name, "", value
+        elif None in self.values:
+            yield self.name, "", self.values[None]
+
+# Histograma com limites fixos e um rótulo opcional de valores limitados
+class Histogram(Counter):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label=None, allowed=None, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label, allowed)
+        self.buckets = buckets
+
+    def observe(self, value, label_value=None):
+        if self.allowed is not None:
+            label_value = bounded_label(label_value, self.allowed)
+        series = self.values.get(label_value)
+        if series is None:
+            # Contagem por faixa (a última é +Inf), soma e total
+            series = self.values[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for label_value, (counts, total, count) in sorted(self.values.items(), key=lambda item: str(item[0])):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket", self._labels(label_value, f'le="{le}"'), cumulative
+            yield f"{self.name}_sum", self._labels(label_value), total
+            yield f"{self.name}_count", self._labels(label_value), count
+
+# Função para obter a memória residente do processo (bytes)
+def resident_memory_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Sem /proc (macOS), usar o pico de memória
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return None
+
+# Métricas do servidor
+connections_total = Counter("slidecontroller_connections_total", "Conexões aceitas")
+commands_total = Counter("slidecontroller_commands_total", "Comandos recebidos por tipo", "command", COMMAND_LABELS)
+command_latency = Histogram(
+    "slidecontroller_command_injection_seconds",
+    "Tempo entre o recebimento da mensagem e o fim da injeção das teclas",
+    "command", COMMAND_LABELS
+)
+broadcast_latency = Histogram("slidecontroller_broadcast_seconds", "Tempo de envio de um broadcast para todos os clientes")
+sqlite_write_latency = Histogram("slidecontroller_sqlite_write_seconds", "Tempo de escrita de um lote de comandos no SQLite")
+event_loop_lag = Histogram("slidecontroller_event_loop_lag_seconds", "Atraso dos despertares agendados no loop de eventos")
+memory = Gauge("process_resident_memory_bytes", "Memória residente do processo", resident_memory_bytes)
+
+# Função para formatar todas as métricas no formato texto do Prometheus
+def render():
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+    return "\n".join(lines) + "\n"
+
+# Handler HTTP mínimo: apenas GET /metrics
+async def handle_metrics_request(reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        # Descartar os cabeçalhos
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            body = render().encode("utf-8")
+            status = "200 OK"
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = b"Not Found\n"
+            status = "404 Not Found"
+            content_type = "text/plain; charset=utf-8"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+# Função para iniciar o endpoint de métricas (apenas local, por padrão)
+async def start_metrics_server(host, port):
+    server = await asyncio.start_server(handle_metrics_request, host, port)
+    logger.info(f"Métricas disponíveis em http://{host}:{port}/metrics")
+    return server
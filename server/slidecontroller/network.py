@@ -0,0 +1,67 @@
+import logging
+import socket
+
+logger = logging.getLogger("presentation-controller")
+
+# Prefixos de IPs de rede local (192.168.x.x, 172.x.x.x, 10.x.x.x)
+LOCAL_PREFIXES = ('192.168.', '172.', '10.')
+
+# Função para obter os endereços IP de rede local da máquina
+def get_ip_addresses():
+    try:
+        import netifaces
+    except ImportError:
+        # Sem netifaces (ex: Windows), usar os endereços associados ao hostname
+        return get_hostname_ip_addresses()
+
+    ip_addresses = []
+
+    # Encontrar endereços IP (IPv4) de todas as interfaces
+    for interface in netifaces.interfaces():
+        try:
+            addrs = netifaces.ifaddresses(interface)
+            if netifaces.AF_INET in addrs:
+                for addr in addrs[netifaces.AF_INET]:
+                    ip = addr['addr']
+                    if ip.startswith(LOCAL_PREFIXES):
+                        ip_addresses.append((interface, ip))
+        except:
+            pass
+
+    return ip_addresses
+
+# Função para obter endereços IP via socket (funciona no Windows)
+def get_hostname_ip_addresses():
+    ip_addresses = []
+
+    try:
+        hostname = socket.gethostname()
+        host_info = socket.getaddrinfo(hostname, None)
+
+        for addr in host_info:
+            ip = addr[4][0]
+            if ip.startswith(LOCAL_PREFIXES) and (("Adaptador de rede", ip) not in ip_addresses):
+                ip_addresses.append(("Adaptador de rede", ip))
+    except Exception as e:
+        logger.error(f"Erro ao obter endereços IP: {e}")
+
+    return ip_addresses
+
+# Função para exibir os IPs que devem ser usados no aplicativo
+def log_ip_addresses(port):
+    ip_addresses = get_ip_addresses()
+    if ip_addresses:
+        logger.info("Endereços IP disponíveis:")
+        for i, (interface, ip) in enumerate(ip_addresses, 1):
+            logger.info(f"{i}. Interface: {interface} - IP: {ip} - Use no app: {ip}:{port}")
+    else:
+        logger.warning("Nenhum endereço IP de rede local encontrado")
+        try:
+            local_ip = socket.gethostbyname(socket.gethostname())
+            logger.info(f"Usando IP padrão: {local_ip}:{port}")
+        except:
+            logger.warning("Não foi possível determinar o IP local")
+            logger.info(f"Usando endereço genérico: 127.0.0.1:{port}")
+
+    logger.info(f"Porta: {port}")
+    logger.info("No aplicativo, use apenas o IP (sem 'ws://')")
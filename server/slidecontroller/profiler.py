@@ -0,0 +1,88 @@
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger("presentation-controller")
+
+# Perfilador estatístico sob demanda
+#
+# Enquanto ativo, uma thread captura a pilha de todas as outras threads a
+# cada "interval" segundos e conta quantas vezes cada pilha apareceu. Ao final,
+# grava as pilhas no formato "collapsed" (uma linha "a;b;c contagem" por
+# pilha), aceito pelo flamegraph.pl, speedscope e Perfetto. Quando nenhum
+# perfil está em andamento, não há nenhuma thread nem custo no servidor.
+
+# Duração máxima de um perfil (segundos)
+MAX_SECONDS = 600
+
+# Perfil em andamento (None quando desativado)
+active = None
+
+# Função para descrever um frame na pilha colapsada
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    def __init__(self, path, seconds, interval=0.005):
+        self.path = path
+        self.seconds = seconds
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="sampling-profiler")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def sample(self, names):
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            key = ";".join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+        self.samples += 1
+
+    def run(self):
+        global active
+        deadline = time.monotonic() + self.seconds
+        try:
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self.sample(names)
+                time.sleep(self.interval)
+            self.write()
+            logger.info(f"Perfil salvo em {self.path} ({self.samples} amostras)")
+        except Exception as e:
+            logger.error(f"Erro no perfilador: {e}")
+        finally:
+            active = None
+
+    def write(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+# Função para iniciar um perfil de "seconds" segundos (None se já houver um em andamento)
+def start_profile(directory, seconds, interval=0.005):
+    global active
+    if active is not None:
+        return None
+    seconds = max(1, min(MAX_SECONDS, seconds))
+    filename = f"presentation_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded"
+    path = os.path.join(directory, filename)
+    active = SamplingProfiler(path, seconds, interval)
+    active.start()
+    logger.info(f"Perfilador ativado por {seconds}s (amostra a cada {interval * 1000:.0f} ms)")
+    return path
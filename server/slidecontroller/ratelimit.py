@@ -0,0 +1,135 @@
+import time
+
+from . import codec, metrics
+
+# Limite de taxa das mensagens recebidas, por conexão
+#
+# Cada cliente tem um token bucket por classe de mensagem (navegação,
+# temporizador, notas, heartbeat e administração), para que um celular com defeito ou um
+# botão de volume preso (useVolumeButtons no aplicativo) não sature a injeção
+# de teclas da sala. A verificação acontece logo após a validação, antes do
+# log, das estatísticas, do SQLite e da injeção. Mensagens acima do limite são
+# descartadas; o cliente recebe um único aviso por rajada (os descartes
+# seguintes são silenciosos até uma mensagem voltar a ser aceita).
+# Opcionalmente, o cliente é desconectado após muitos descartes em pouco tempo.
+
+# Limites padrão por classe: (mensagens por segundo, rajada máxima)
+DEFAULT_LIMITS = {
+    "nav": (10, 20),
+    "timer": (2, 5),
+    "notes": (1, 3),
+    "heartbeat": (1, 5),
+    "admin": (2, 10),
+}
+
+# Classe de cada comando; mensagens sem comando (heartbeat, pong) são "heartbeat"
+COMMAND_CLASSES = {
+    "NEXT_SLIDE": "nav",
+    "PREV_SLIDE": "nav",
+    "START_PRESENTATION": "nav",
+    "END_PRESENTATION": "nav",
+    "BLANK_SCREEN": "nav",
+    "SKIP_SLIDES": "nav",
+    "GOTO_SLIDE": "nav",
+    "TIMER_START": "timer",
+    "TIMER_STOP": "timer",
+    "TIMER_RESET": "timer",
+    "AUTO_ADVANCE_START": "timer",
+    "AUTO_ADVANCE_PAUSE": "timer",
+    "AUTO_ADVANCE_RESUME": "timer",
+    "AUTO_ADVANCE_SKIP": "timer",
+    "AUTO_ADVANCE_STOP": "timer",
+    "PUBLISH_NOTES": "notes",
+}
+
+# Janela (segundos) em que os descartes são somados para o limite de desconexão
+DISCONNECT_WINDOW = 10.0
+
+# Ações para mensagens acima do limite
+DROP = "drop"
+NOTIFY = "notify"
+DISCONNECT = "disconnect"
+
+# Limites em uso (definidos em configure); vazio desativa o limite
+limits = {}
+disconnect_threshold = 0
+
+rate_limited = metrics.Counter(
+    "slidecontroller_rate_limited_total", "Mensagens descartadas pelo limite de taxa, por classe",
+    "class", set(DEFAULT_LIMITS)
+)
+rate_limit_disconnects = metrics.Counter(
+    "slidecontroller_rate_limit_disconnects_total", "Clientes desconectados por excesso de mensagens"
+)
+
+RATE_LIMITED_MESSAGE = codec.dumps({"status": "Erro: muitas mensagens, aguarde", "error": "RATE_LIMITED"})
+
+# Função para aplicar as configurações (rate_limit, rate_limits e rate_limit_disconnect)
+def configure(config):
+    global limits, disconnect_threshold
+    limits = {}
+    if config.get("rate_limit", True):
+        overrides = config.get("rate_limits") or {}
+        for name, (rate, burst) in DEFAULT_LIMITS.items():
+            rate, burst = overrides.get(name, (rate, burst))
+            limits[name] = (float(rate), float(burst))
+    disconnect_threshold = config.get("rate_limit_disconnect") or 0
+
+# Função para obter a classe de uma mensagem já validada
+def message_class(data):
+    command = data.get("command")
+    return COMMAND_CLASSES[command] if command is not None else "heartbeat"
+
+# Função para criar o limitador de uma conexão (None se o limite estiver desativado)
+def new_limiter():
+    return ClientLimiter() if limits else None
+
+# Token bucket no relógio monotônico
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now):
+        tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if tokens >= 1:
+            self.tokens = tokens - 1
+            return True
+        self.tokens = tokens
+        return False
+
+# Limitador de uma conexão: um bucket por classe
+class ClientLimiter:
+    def __init__(self):
+        self.buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in limits.items()}
+        self.notified = False
+        self.window_start = 0.0
+        self.window_drops = 0
+
+    # Retorna None se a mensagem pode seguir, ou DROP, NOTIFY ou DISCONNECT
+    def check(self, kind):
+        now = time.monotonic()
+        bucket = self.buckets.get(kind)
+        if bucket is None or bucket.take(now):
+            self.notified = False
+            return None
+
+        rate_limited.inc(kind)
+        if disconnect_threshold:
+            if now - self.window_start > DISCONNECT_WINDOW:
+                self.window_start = now
+                self.window_drops = 0
+            self.window_drops += 1
+            if self.window_drops >= disconnect_threshold:
+                return DISCONNECT
+
+        # Heartbeats não recebem aviso; os demais, um aviso por rajada
+        if self.notified or kind == "heartbeat":
+            return DROP
+        self.notified = True
+        return NOTIFY
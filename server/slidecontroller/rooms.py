@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import random
+from urllib.parse import parse_qs, urlsplit
+
+from . import schema
+from .backends import create_backend
+from .conflict import NavigationPolicy
+from .stats import StatsSession
+
+logger = logging.getLogger("presentation-controller")
+
+# Salas: cada apresentação tem seus próprios clientes, temporizador, estado
+# do slide, backend de entrada e sessão de estatísticas. Todas são servidas na
+# mesma porta; o cliente escolhe a sala pelo caminho (ws://host:porta/<sala>)
+# ou pelo código de acesso (ws://host:porta/join/<código> ou ?code=<código>).
+# O sufixo /follow (ws://host:porta/<sala>/follow) conecta como espectador.
+class Room:
+    def __init__(self, name, backend, join_code=None, timer_limit=0, auto_advance=None, navigation=None):
+        self.name = name
+        self.join_code = join_code
+        self.backend = backend
+        self.clients = set()
+        self.stats = StatsSession(name)
+
+        # Espectadores (somente leitura) e último estado publicado para eles
+        self.followers = set()
+        self.stale_followers = set()
+        self.snapshot_message = None
+        self.catch_up_job = None
+
+        # Slide atual, apresentação em andamento e tela preta, estimados a partir
+        # dos comandos, e notas do apresentador
+        self.slide = 1
+        self.presenting = False
+        self.blanked = False
+        self.notes = ""
+
+        # Último estado enviado aos clientes do subprotocolo de estado, sua versão
+        # e a versão da última mudança de slide
+        self.state = None
+        self.state_version = 0
+        self.slide_version = 0
+
+        # Política para comandos de navegação simultâneos de vários controles
+        self.navigation = navigation or NavigationPolicy()
+
+        # Injeção de teclas em andamento (tarefa da última sequência) e o lock
+        # que mantém as sequências da sala em ordem
+        self.injection = None
+        self.injection_lock = asyncio.Lock()
+
+        # Temporizador
+        self.timer_limit = timer_limit
+        self.timer_active = False
+        self.timer_seconds = 0
+        self.timer_job = None
+        self.timer_start_time = 0
+        self.timer_elapsed_before_pause = 0  # Tempo acumulado antes da última pausa
+
+        # Avanço automático: configuração padrão da sala, se iniciado ao abrir o
+        # servidor, e o avanço em andamento (AutoAdvance ou None)
+        auto_advance = dict(auto_advance or {})
+        self.auto_advance_autostart = auto_advance.pop("autostart", False)
+        self.auto_advance_config = auto_advance or None
+        self.auto_advance = None
+
+# Salas por nome e por código de acesso
+rooms = {}
+rooms_by_code = {}
+
+# Sala usada quando nenhuma sala é configurada
+DEFAULT_ROOM = "default"
+
+# Função para gerar um código de acesso de 6 dígitos ainda não usado
+def generate_join_code():
+    while True:
+        code = f"{random.randint(0, 999999):06d}"
+        if code not in rooms_by_code:
+            return code
+
+# Função para registrar uma sala
+def add_room(name, backend, join_code=None, timer_limit=0, auto_advance=None, navigation=None):
+    if name in rooms:
+        raise ValueError(f"Sala duplicada: {name}")
+    join_code = str(join_code) if join_code is not None else generate_join_code()
+    if join_code in rooms_by_code:
+        raise ValueError(f"Código de acesso duplicado: {join_code}")
+    room = Room(name, backend, join_code, timer_limit, auto_advance, navigation)
+    rooms[name] = room
+    rooms_by_code[join_code] = room
+    return room
+
+# Função para criar as salas da configuração
+#
+# Sem a chave "rooms", há uma única sala com o backend global. Cada sala
+# configurada pode sobrescrever backend, record_file, join_code, timer_limit,
+# auto_advance e a política de navegação (navigation_policy,
+# navigation_window, navigation_lease e controller_priorities):
+#
+#   rooms:
+#     auditorio: {backend: pynput, join_code: "482913", navigation_policy: lease}
+#     sala-2: {backend: recording, record_file: sala2.ndjson}
+#     recepcao: {auto_advance: {interval: 15, slides: 8, loop: true, autostart: true}}
+def create_rooms(config):
+    rooms.clear()
+    rooms_by_code.clear()
+
+    room_configs = config.get("rooms") or {DEFAULT_ROOM: {}}
+    for name, options in room_configs.items():
+        room_config = dict(config)
+        room_config.update(options or {})
+        auto_advance = room_config.get("auto_advance")
+        if auto_advance is not None:
+            validate_auto_advance(name, auto_advance)
+        navigation = NavigationPolicy(
+            room_config.get("navigation_policy") or "reject-stale",
+            room_config.get("navigation_window", 0.5),
+            room_config.get("navigation_lease", 3.0),
+            room_config.get("controller_priorities")
+        )
+        backend = create_backend(room_config["backend"], room_config)
+        add_room(
+            str(name), backend, room_config.get("join_code"), room_config.get("timer_limit", 0), auto_advance, navigation
+        )
+    return rooms
+
+# Função para validar o auto_advance da configuração com o esquema do comando AUTO_ADVANCE_START
+def validate_auto_advance(name, auto_advance):
+    settings = {key: value for key, value in auto_advance.items() if key != "autostart"}
+    if ("interval" not in settings and "durations" not in settings
+            or schema.validate(dict(settings, command="AUTO_ADVANCE_START")) is not None):
+        raise ValueError(f"auto_advance inválido na sala {name}: informe interval ou durations (de 0.5 a 86400 s)")
+
+# Função para encontrar a sala pelo caminho da conexão
+#
+# Retorna (sala, espectador); a sala é None se não existir.
+def find_room(path):
+    path = path or "/"
+    code = None
+    if "?" in path:
+        parts = urlsplit(path)
+        code = parse_qs(parts.query).get("code")
+        path = parts.path
+
+    segments = path.strip("/").split("/")
+    follow = segments[-1] == "follow"
+    if follow:
+        segments = segments[:-1] or [""]
+
+    if code:
+        return rooms_by_code.get(code[0]), follow
+    if segments == [""]:
+        # Sem caminho: primeira sala (compatível com clientes anteriores às salas)
+        return next(iter(rooms.values()), None), follow
+    if len(segments) == 2 and segments[0] == "join":
+        return rooms_by_code.get(segments[1]), follow
+    if len(segments) == 1:
+        return rooms.get(segments[0]), follow
+    return None, follow
+
+# Função para exibir como entrar em cada sala
+def log_rooms():
+    if len(rooms) == 1 and DEFAULT_ROOM in rooms:
+        return
+    for room in rooms.values():
+        logger.info(f"Sala '{room.name}': caminho /{room.name} ou código {room.join_code} ({room.backend.name})")
@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+
+logger = logging.getLogger("presentation-controller")
+
+# Agendador central das tarefas periódicas e temporizadas do servidor
+#
+# Todas as tarefas (temporizadores das salas, verificação das conexões,
+# monitor de atraso do loop, reenvio aos espectadores lentos) ficam em um
+# heap de prazos, e um único callback do loop (loop.call_at) fica armado para
+# o próximo despertar. Sem tarefas pendentes, nada fica armado e o processo
+# não acorda.
+#
+# Cada tarefa pode ter uma folga ("slack"): ela pode ser adiada em até esse
+# tempo para rodar junto com outra tarefa que acordou o loop, de modo que
+# tarefas com prazos próximos compartilham um único despertar. Tarefas
+# periódicas podem ter jitter, uma variação aleatória de cada intervalo.
+# As funções podem ser síncronas ou corrotinas (executadas como tarefas).
+#
+# Tarefas canceladas saem dos heaps só ao chegar ao topo; como o avanço
+# automático recria uma tarefa (de até um dia) a cada navegação, os heaps são
+# reconstruídos quando as canceladas passam de COMPACT_THRESHOLD e da metade
+# das entradas.
+
+# Número de tarefas canceladas nos heaps a partir do qual eles são reconstruídos
+COMPACT_THRESHOLD = 64
+
+# Tarefa agendada; cancel() a remove do agendador
+class Job:
+    __slots__ = ("scheduler", "deadline", "callback", "args", "interval", "jitter", "slack", "name", "cancelled")
+
+    def __init__(self, scheduler, deadline, callback, args, interval, jitter, slack, name):
+        self.scheduler = scheduler
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.jitter = jitter
+        self.slack = slack
+        self.name = name or getattr(callback, "__name__", "tarefa")
+        self.cancelled = False
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            self.scheduler._cancelled(self)
+
+
+class Scheduler:
+    def __init__(self):
+        # Dois heaps com remoção preguiçosa: por prazo (o que está vencido) e
+        # por prazo + folga (quando o loop precisa acordar)
+        self.deadlines = []
+        self.latest = []
+        self.counter = itertools.count()
+        self.cancelled = 0
+        self.handle = None
+        self.armed_at = None
+        self.loop = None
+        self.tasks = set()
+
+    # Função para agendar uma tarefa em um instante do relógio do loop
+    def call_at(self, deadline, callback, *args, slack=0.0, name=None):
+        return self._push(Job(self, deadline, callback, args, None, 0.0, slack, name))
+
+    # Função para agendar uma tarefa após "delay" segundos
+    def call_later(self, delay, callback, *args, slack=0.0, name=None):
+        return self.call_at(self._loop().time() + delay, callback, *args, slack=slack, name=name)
+
+    # Função para agendar uma tarefa periódica (a primeira execução após "first", ou um intervalo)
+    def every(self, interval, callback, *args, jitter=0.0, slack=0.0, first=None, name=None):
+        delay = interval if first is None else first
+        job = Job(self, self._loop().time() + delay, callback, args, interval, jitter, slack, name)
+        return self._push(job)
+
+    # Função para cancelar todas as tarefas (no encerramento do servidor)
+    def stop(self):
+        if self.handle is not None:
+            self.handle.cancel()
+        self.handle = None
+        self.armed_at = None
+        self.deadlines.clear()
+        self.latest.clear()
+        self.cancelled = 0
+        for task in list(self.tasks):
+            task.cancel()
+        self.loop = None
+
+    # Instante atual no relógio do loop (monotônico), a referência de call_at
+    def time(self):
+        return self._loop().time()
+
+    # Número de tarefas agendadas (para métricas e testes)
+    def pending(self):
+        return sum(1 for _, _, job in self.deadlines if not job.cancelled and job.deadline is not None)
+
+    def _loop(self):
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        return self.loop
+
+    def _push(self, job):
+        sequence = next(self.counter)
+        heapq.heappush(self.deadlines, (job.deadline, sequence, job))
+        heapq.heappush(self.latest, (job.deadline + job.slack, sequence, job))
+        self._arm()
+        return job
+
+    # Função chamada quando uma tarefa é cancelada
+    def _cancelled(self, job):
+        if job.deadline is not None:
+            self.cancelled += 1
+            if self.cancelled > COMPACT_THRESHOLD and self.cancelled * 2 > len(self.deadlines):
+                self._compact()
+        # Desarmar (ou adiar) o despertar, se era esta a próxima tarefa
+        self._arm()
+
+    # Função para reconstruir os heaps só com as entradas ainda válidas
+    def _compact(self):
+        self.deadlines = [
+            entry for entry in self.deadlines if not entry[2].cancelled and entry[2].deadline == entry[0]
+        ]
+        heapq.heapify(self.deadlines)
+        self.latest = [
+            entry for entry in self.latest
+            if not entry[2].cancelled and entry[2].deadline is not None and entry[0] == entry[2].deadline + entry[2].slack
+        ]
+        heapq.heapify(self.latest)
+        self.cancelled = 0
+
+    # Função para armar o callback do loop para o próximo despertar necessário
+    def _arm(self):
+        latest = self.latest
+        while latest and (latest[0][2].cancelled or latest[0][2].deadline is None
+                          or latest[0][0] != latest[0][2].deadline + latest[0][2].slack):
+            heapq.heappop(latest)
+        if not latest:
+            if self.handle is not None:
+                self.handle.cancel()
+                self.handle = None
+                self.armed_at = None
+            return
+
+        when = latest[0][0]
+        if self.handle is not None:
+            if self.armed_at == when:
+                return
+            self.handle.cancel()
+        self.handle = self._loop().call_at(when, self._run)
+        self.armed_at = when
+
+    # Callback do loop: executa todas as tarefas já vencidas
+    def _run(self):
+        # O loop pode disparar o callback uma fração antes do instante armado
+        now = max(self.loop.time(), self.armed_at)
+        self.handle = None
+        self.armed_at = None
+
+        due = []
+        deadlines = self.deadlines
+        while deadlines and deadlines[0][0] <= now:
+            deadline, _, job = heapq.heappop(deadlines)
+            if job.cancelled:
+                self.cancelled -= 1
+                continue
+            if job.deadline != deadline:
+                continue
+            due.append((job, deadline))
+            job.deadline = None
+
+        for job, deadline in due:
+            # Uma tarefa anterior do mesmo despertar pode ter cancelado esta
+            if not job.cancelled:
+                self._execute(job, deadline, now)
+        self._arm()
+
+    def _execute(self, job, deadline, now):
+        if job.interval is not None:
+            # Reagendar antes de executar, a partir do prazo anterior (sem deriva);
+            # períodos perdidos não são acumulados
+            delay = job.interval
+            if job.jitter:
+                delay = max(0.0, delay + random.uniform(-job.jitter, job.jitter))
+            job.deadline = deadline + delay
+            if job.deadline <= now:
+                job.deadline = now + delay
+            sequence = next(self.counter)
+            heapq.heappush(self.deadlines, (job.deadline, sequence, job))
+            heapq.heappush(self.latest, (job.deadline + job.slack, sequence, job))
+
+        try:
+            result = job.callback(*job.args)
+            if asyncio.iscoroutine(result):
+                task = self.loop.create_task(result)
+                self.tasks.add(task)
+                task.add_done_callback(self._task_done)
+        except Exception as e:
+            logger.error(f"Erro na tarefa agendada '{job.name}': {e}")
+
+    def _task_done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Erro na tarefa agendada: {task.exception()}")
+
+
+# Agendador do processo
+scheduler = Scheduler()
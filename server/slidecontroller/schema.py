@@ -0,0 +1,164 @@
+from . import autoadvance, codec, metrics, wire
+
+# Esquema das mensagens dos clientes
+#
+# Cada comando declara os seus argumentos (tipo, limites, se é obrigatório e
+# o erro retornado quando o valor é inválido). O esquema é compilado uma vez,
+# na importação, em uma lista de funções de verificação por comando; cada
+# mensagem é validada antes de qualquer log, estatística ou injeção de teclas,
+# e mensagens inválidas são recusadas com um código de erro estruturado.
+#
+# Além dos comandos, são aceitas as mensagens de controle enviadas pelo
+# aplicativo ({"heartbeat": ...} e {"pong": ...}), que não geram resposta.
+
+# Limites dos argumentos (SKIP_SLIDES injeta uma tecla a cada 0,1 s: 100 slides
+# ocupam a injeção da sala por 10 s)
+MAX_SKIP_SLIDES = 100
+MAX_SLIDE_NUMBER = 100000
+
+# Erros de validação: código do protocolo binário e resposta dos clientes JSON
+ERRORS = {
+    "INVALID_MESSAGE": (wire.ERROR_INVALID_MESSAGE, "Erro: formato de mensagem inválido"),
+    "UNKNOWN_COMMAND": (wire.ERROR_UNKNOWN_COMMAND, "Erro: comando desconhecido"),
+    "MISSING_COUNT": (wire.ERROR_MISSING_COUNT, "Erro: número de slides não especificado"),
+    "INVALID_SLIDE": (wire.ERROR_INVALID_SLIDE, "Erro: número do slide não especificado ou inválido"),
+    "INVALID_NOTES": (wire.ERROR_INVALID_NOTES, "Erro: notas inválidas"),
+    "INVALID_AUTO_ADVANCE": (wire.ERROR_INVALID_AUTO_ADVANCE, "Erro: configuração de avanço automático inválida"),
+    "INVALID_VERSION": (wire.ERROR_INVALID_VERSION, "Erro: versão do estado inválida"),
+}
+
+COMMAND_SCHEMA = {
+    "NEXT_SLIDE": {},
+    "PREV_SLIDE": {},
+    "START_PRESENTATION": {},
+    "END_PRESENTATION": {},
+    "BLANK_SCREEN": {},
+    "SKIP_SLIDES": {
+        "count": {"type": int, "min": -MAX_SKIP_SLIDES, "max": MAX_SKIP_SLIDES, "error": "MISSING_COUNT"},
+    },
+    "GOTO_SLIDE": {
+        "number": {"type": int, "min": 1, "max": MAX_SLIDE_NUMBER, "error": "INVALID_SLIDE"},
+    },
+    "TIMER_START": {},
+    "TIMER_STOP": {},
+    "TIMER_RESET": {},
+    # Sem "notes", as notas publicadas são apagadas; textos longos são truncados no servidor
+    "PUBLISH_NOTES": {
+        "notes": {"type": str, "required": False, "error": "INVALID_NOTES"},
+    },
+    # Sem "interval" nem "durations", vale o auto_advance da configuração da sala
+    "AUTO_ADVANCE_START": {
+        "interval": {
+            "type": (int, float), "min": autoadvance.MIN_DURATION, "max": autoadvance.MAX_DURATION,
+            "required": False, "error": "INVALID_AUTO_ADVANCE",
+        },
+        "durations": {
+            "type": list, "min": 1, "max": autoadvance.MAX_DURATIONS, "required": False,
+            "items": {"type": (int, float), "min": autoadvance.MIN_DURATION, "max": autoadvance.MAX_DURATION},
+            "error": "INVALID_AUTO_ADVANCE",
+        },
+        "slides": {"type": int, "min": 1, "max": MAX_SLIDE_NUMBER, "required": False, "error": "INVALID_AUTO_ADVANCE"},
+        "loop": {"type": bool, "required": False, "error": "INVALID_AUTO_ADVANCE"},
+    },
+    "AUTO_ADVANCE_PAUSE": {},
+    "AUTO_ADVANCE_RESUME": {},
+    "AUTO_ADVANCE_SKIP": {},
+    "AUTO_ADVANCE_STOP": {},
+}
+
+# Mensagens de controle (sem "command"), identificadas pela chave
+CONTROL_SCHEMA = {
+    "heartbeat": {"type": (int, float), "error": "INVALID_MESSAGE"},
+    "pong": {"type": (int, float), "error": "INVALID_MESSAGE"},
+}
+
+invalid_messages = metrics.Counter(
+    "slidecontroller_invalid_messages_total", "Mensagens recusadas na validação, por código de erro",
+    "error", set(ERRORS)
+)
+
+# Respostas de erro dos clientes JSON, serializadas uma única vez
+error_frames = {
+    name: codec.dumps({"status": text, "error": name}) for name, (_, text) in ERRORS.items()
+}
+
+_missing = object()
+
+# Função para compilar a verificação de um valor (True se for válido)
+#
+# type() em vez de isinstance(): True e False não são aceitos como números.
+# Em textos e listas, "min" e "max" limitam o tamanho; "items" valida cada
+# elemento de uma lista.
+def compile_value(spec):
+    types = spec["type"] if isinstance(spec["type"], tuple) else (spec["type"],)
+    low = spec.get("min")
+    high = spec.get("max")
+    sized = str in types or list in types
+    items = compile_value(spec["items"]) if "items" in spec else None
+
+    def valid(value):
+        if type(value) not in types:
+            return False
+        size = len(value) if sized else value
+        if (low is not None and size < low) or (high is not None and size > high):
+            return False
+        return items is None or all(items(item) for item in value)
+    return valid
+
+# Função para compilar a verificação de um argumento
+def compile_field(name, spec):
+    valid = compile_value(spec)
+    required = spec.get("required", True)
+    error = spec["error"]
+
+    def check(data):
+        value = data.get(name, _missing)
+        if value is _missing:
+            return error if required else None
+        return None if valid(value) else error
+    return check
+
+# Função para compilar o esquema: nome -> tupla de verificações
+def compile_schema(schema):
+    return {
+        name: tuple(compile_field(field, spec) for field, spec in fields.items())
+        for name, fields in schema.items()
+    }
+
+command_checks = compile_schema(COMMAND_SCHEMA)
+control_checks = {key: compile_field(key, spec) for key, spec in CONTROL_SCHEMA.items()}
+
+# Comandos de navegação aceitam "version", a versão do estado da sala que o
+# cliente conhecia (conflict.py). Não é um argumento do comando: não é gravado
+# com os argumentos nem reproduzido pelo replay.
+VERSIONED_COMMANDS = {"NEXT_SLIDE", "PREV_SLIDE", "SKIP_SLIDES", "GOTO_SLIDE"}
+version_check = compile_field("version", {"type": int, "min": 0, "required": False, "error": "INVALID_VERSION"})
+
+# Função para validar uma mensagem já decodificada
+#
+# Retorna o nome do erro (chave de ERRORS) ou None se a mensagem for válida.
+def validate(data):
+    if type(data) is not dict:
+        return "INVALID_MESSAGE"
+
+    command = data.get("command", _missing)
+    if command is _missing:
+        for key, check in control_checks.items():
+            if key in data:
+                return check(data)
+        return "INVALID_MESSAGE"
+
+    checks = command_checks.get(command) if type(command) is str else None
+    if checks is None:
+        return "UNKNOWN_COMMAND"
+    for check in checks:
+        error = check(data)
+        if error is not None:
+            return error
+    if command in VERSIONED_COMMANDS:
+        return version_check(data)
+    return None
+
+# Função para extrair os argumentos declarados de um comando válido (gravados para replay)
+def command_args(command, data):
+    return {field: data[field] for field in COMMAND_SCHEMA[command] if field in data}
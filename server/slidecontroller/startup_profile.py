@@ -0,0 +1,105 @@
+# Perfil de inicialização do servidor (--startup-profile)
+#
+# O processo pai reexecuta o servidor com "python -X importtime" e a variável
+# de ambiente SLIDECONTROLLER_STARTUP_PROFILE. O filho marca as fases da
+# inicialização, avisa assim que passa a aceitar conexões e encerra; o pai
+# imprime o tempo total e o detalhamento das importações.
+import os
+import sys
+import time
+
+ENV_VAR = "SLIDECONTROLLER_STARTUP_PROFILE"
+READY_PREFIX = "STARTUP_PROFILE_READY "
+
+# Instante em que este módulo foi importado (deve ser a primeira importação do servidor)
+_start = time.perf_counter()
+_marks = []
+
+
+# Função para verificar se o perfil foi solicitado na linha de comando
+def requested(argv=None):
+    return "--startup-profile" in (sys.argv if argv is None else argv)
+
+
+# Função para verificar se este processo é o filho que está sendo medido
+def is_child():
+    return os.environ.get(ENV_VAR) == "1"
+
+
+# Função para marcar o fim de uma fase da inicialização
+def mark(phase):
+    if is_child():
+        _marks.append((phase, time.perf_counter()))
+
+
+# Função chamada pelo filho quando o servidor já aceita conexões
+def report_ready():
+    import json
+    phases = []
+    previous = _start
+    for phase, instant in _marks:
+        phases.append([phase, round((instant - previous) * 1000, 2)])
+        previous = instant
+    print(READY_PREFIX + json.dumps({"wall_time": time.time(), "phases": phases}), flush=True)
+
+
+# Função para interpretar uma linha da saída de "python -X importtime"
+def parse_import_line(line):
+    # Formato: "import time:   self | cumulative | nome (com recuo por nível)"
+    if not line.startswith("import time:"):
+        return None
+    fields = line[len("import time:"):].split("|")
+    if len(fields) != 3:
+        return None
+    try:
+        self_us = int(fields[0])
+        cumulative_us = int(fields[1])
+    except ValueError:
+        return None
+    name = fields[2].rstrip()
+    depth = (len(name) - len(name.lstrip(" "))) // 2
+    return name.strip(), depth, self_us, cumulative_us
+
+
+# Função executada pelo pai: reexecuta o servidor e imprime o relatório
+def run_profile(script, top=15):
+    import json
+    import subprocess
+
+    command = [sys.executable]
+    if not getattr(sys, "frozen", False):
+        command += ["-X", "importtime", script]
+    command += sys.argv[1:]
+
+    env = dict(os.environ)
+    env[ENV_VAR] = "1"
+
+    started = time.time()
+    process = subprocess.run(command, env=env, capture_output=True, text=True, timeout=60)
+
+    ready = None
+    for line in process.stdout.splitlines():
+        if line.startswith(READY_PREFIX):
+            ready = json.loads(line[len(READY_PREFIX):])
+    if ready is None:
+        print("O servidor não chegou a aceitar conexões:")
+        print(process.stdout[-2000:])
+        print(process.stderr[-2000:])
+        return 1
+
+    print(f"Pronto para aceitar conexões em {(ready['wall_time'] - started) * 1000:.1f} ms "
+          f"(incluindo a inicialização do interpretador)")
+    print("")
+    print("Fases da inicialização:")
+    for phase, ms in ready["phases"]:
+        print(f"  {phase:<30} {ms:>9.1f} ms")
+
+    imports = [entry for entry in map(parse_import_line, process.stderr.splitlines()) if entry]
+    if imports:
+        top_level = [entry for entry in imports if entry[1] == 0]
+        total_ms = sum(entry[3] for entry in top_level) / 1000
+        print("")
+        print(f"Importações de nível superior (total {total_ms:.1f} ms, {len(imports)} módulos):")
+        for name, _, _, cumulative_us in sorted(top_level, key=lambda e: e[3], reverse=True)[:top]:
+            print(f"  {name:<30} {cumulative_us / 1000:>9.1f} ms")
+    return 0
@@ -0,0 +1,127 @@
+import logging
+
+from websockets.asyncio.server import broadcast
+
+from . import codec, metrics, schema, wire
+
+logger = logging.getLogger("presentation-controller")
+
+# Estado estruturado das salas para os clientes de controle
+#
+# Clientes que negociam o subprotocolo "slidecontroller.state" não recebem os
+# textos de status ({"status": "Clientes conectados: 3"}). Ao conectar,
+# recebem o estado completo da sala com a versão atual:
+#
+#   {"state": {"slide": 4, "presenting": true, ...}, "room": "default", "version": 12}
+#
+# e, a cada mudança, apenas os campos alterados, com a nova versão:
+#
+#   {"delta": {"slide": 5}, "version": 13}
+#
+# A versão cresce uma unidade por mudança, de modo que o cliente aplica os
+# deltas sem interpretar texto e descarta o que já conhece (versão menor ou
+# igual à sua). As respostas aos comandos trazem o nome do resultado (os
+# mesmos códigos do protocolo binário) e a versão após o comando, que o
+# cliente pode enviar nos comandos de navegação seguintes (conflict.py):
+#
+#   {"result": "NEXT_SLIDE_OK", "version": 13}
+#
+# Os erros (validação, limite de mensagens, conflitos, limite de clientes)
+# vêm no mesmo formato, com o nome também em "error":
+#
+#   {"result": "STALE_VERSION", "error": "STALE_VERSION", "version": 13}
+#
+# Campos: slide, presenting (apresentação em andamento), blanked (tela
+# preta), clients (clientes de controle conectados), timer_active,
+# timer_seconds, timer_limit (0: sem limite) e timer_expired. O slide, a
+# apresentação e a tela preta são estimados a partir dos comandos.
+
+# Nomes dos códigos de resultado e de erro
+RESULT_NAMES = {
+    wire.NEXT_SLIDE_OK: "NEXT_SLIDE_OK",
+    wire.PREV_SLIDE_OK: "PREV_SLIDE_OK",
+    wire.PRESENTATION_STARTED: "PRESENTATION_STARTED",
+    wire.PRESENTATION_ENDED: "PRESENTATION_ENDED",
+    wire.SCREEN_BLANKED: "SCREEN_BLANKED",
+    wire.SLIDES_SKIPPED: "SLIDES_SKIPPED",
+    wire.GOTO_SLIDE_OK: "GOTO_SLIDE_OK",
+    wire.TIMER_STARTED: "TIMER_STARTED",
+    wire.TIMER_ALREADY_ACTIVE: "TIMER_ALREADY_ACTIVE",
+    wire.TIMER_STOPPED: "TIMER_STOPPED",
+    wire.TIMER_NOT_ACTIVE: "TIMER_NOT_ACTIVE",
+    wire.TIMER_RESET: "TIMER_RESET",
+    wire.NOTES_PUBLISHED: "NOTES_PUBLISHED",
+    wire.AUTO_ADVANCE_STARTED: "AUTO_ADVANCE_STARTED",
+    wire.AUTO_ADVANCE_PAUSED: "AUTO_ADVANCE_PAUSED",
+    wire.AUTO_ADVANCE_RESUMED: "AUTO_ADVANCE_RESUMED",
+    wire.AUTO_ADVANCE_SKIPPED: "AUTO_ADVANCE_SKIPPED",
+    wire.AUTO_ADVANCE_STOPPED: "AUTO_ADVANCE_STOPPED",
+    wire.AUTO_ADVANCE_NOT_ACTIVE: "AUTO_ADVANCE_NOT_ACTIVE",
+    wire.NAVIGATION_MERGED: "NAVIGATION_MERGED",
+    wire.ERROR_INTERNAL: "INTERNAL_ERROR",
+    wire.ERROR_MAX_CLIENTS: "MAX_CLIENTS_REACHED",
+    wire.ERROR_ROOM_NOT_FOUND: "ROOM_NOT_FOUND",
+    wire.ERROR_RATE_LIMITED: "RATE_LIMITED",
+    wire.ERROR_STALE_VERSION: "STALE_VERSION",
+    wire.ERROR_NAVIGATION_LOCKED: "NAVIGATION_LOCKED",
+}
+RESULT_NAMES.update({code: name for name, (code, _) in schema.ERRORS.items()})
+
+# Códigos a partir deste são erros
+FIRST_ERROR_CODE = 64
+
+deltas_published = metrics.Counter(
+    "slidecontroller_state_deltas_total", "Mudanças de estado enviadas aos clientes do subprotocolo de estado"
+)
+
+# Função para saber se um cliente usa o subprotocolo de estado
+def stateful(websocket):
+    return websocket.subprotocol == wire.STATE_SUBPROTOCOL
+
+# Função para montar o estado atual de uma sala
+def room_state(room):
+    return {
+        "slide": room.slide,
+        "presenting": room.presenting,
+        "blanked": room.blanked,
+        "clients": len(room.clients),
+        "timer_active": room.timer_active,
+        "timer_seconds": room.timer_seconds,
+        "timer_limit": room.timer_limit,
+        "timer_expired": room.timer_limit > 0 and room.timer_seconds >= room.timer_limit,
+    }
+
+# Função para registrar o estado da sala e enviar o que mudou
+#
+# Chamada após cada mudança possível (comandos, temporizador, entrada e saída
+# de clientes); sem mudança, não faz nada. "exclude" não recebe o delta (o
+# cliente que acabou de entrar, que recebe o estado completo em seguida).
+def publish(room, exclude=None):
+    current = room_state(room)
+    previous = room.state or {}
+    if current == previous:
+        return
+    delta = {key: value for key, value in current.items() if previous.get(key) != value}
+    room.state = current
+    room.state_version += 1
+    if "slide" in delta:
+        room.slide_version = room.state_version
+
+    clients = [client for client in room.clients if client is not exclude and stateful(client)]
+    if clients:
+        deltas_published.inc()
+        broadcast(clients, codec.dumps({"delta": delta, "version": room.state_version}))
+
+# Função para montar a mensagem com o estado completo (enviada na conexão)
+def snapshot_message(room):
+    publish(room)
+    return codec.dumps({"state": room.state, "room": room.name, "version": room.state_version})
+
+# Função para montar a resposta a um comando (sem sala, como em ROOM_NOT_FOUND, sem versão)
+def result_message(room, code):
+    reply = {"result": RESULT_NAMES.get(code, code)}
+    if room is not None:
+        reply["version"] = room.state_version
+    if code >= FIRST_ERROR_CODE:
+        reply["error"] = reply["result"]
+    return codec.dumps(reply)
@@ -0,0 +1,354 @@
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from . import metrics
+
+logger = logging.getLogger("presentation-controller")
+
+# Banco de dados atual (definido por init_stats_db)
+db_path = None
+
+# Registro binário dos comandos (motor "binlog", definido por open_command_log);
+# None grava os comandos na tabela "commands"
+command_log = None
+
+# Estatísticas de uma sessão (uma por sala; session_id é definido por save_stats)
+class StatsSession:
+    def __init__(self, room=None):
+        self.room = room
+        self.session_id = None
+        self.stats = {
+            "total_connections": 0,
+            "commands_executed": 0,
+            "start_time": time.time(),
+            "command_counts": {}
+        }
+
+        # Slide em exibição e desde quando (relógio monotônico e horário), para o tempo por slide
+        self.current_slide = None
+        self.slide_entered = None
+        self.slide_entered_at = None
+
+# Função para inicializar banco de dados de estatísticas
+def init_stats_db(path):
+    global db_path
+    import sqlite3
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+
+    # Criar tabela de sessões
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        start_time TEXT,
+        end_time TEXT,
+        total_connections INTEGER,
+        total_commands INTEGER,
+        room TEXT
+    )
+    ''')
+
+    # Criar tabela de comandos
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS commands (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER,
+        timestamp TEXT,
+        command TEXT,
+        client_ip TEXT,
+        args TEXT,
+        FOREIGN KEY (session_id) REFERENCES sessions (id)
+    )
+    ''')
+
+    # Tempo de exibição de cada slide: uma linha por exibição, gravada quando o
+    # slide muda, para que o relatório não precise reprocessar os comandos
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS slide_dwell (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER,
+        room TEXT,
+        slide INTEGER,
+        entered_at TEXT,
+        dwell_ms INTEGER,
+        FOREIGN KEY (session_id) REFERENCES sessions (id)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS slide_dwell_session ON slide_dwell (session_id, slide, dwell_ms)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS slide_dwell_room ON slide_dwell (room, slide, dwell_ms, session_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS slide_dwell_slide ON slide_dwell (slide, dwell_ms)")
+
+    # Bancos criados por versões anteriores não têm as colunas de argumentos e de sala
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(commands)")]
+    if "args" not in columns:
+        cursor.execute("ALTER TABLE commands ADD COLUMN args TEXT")
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(sessions)")]
+    if "room" not in columns:
+        cursor.execute("ALTER TABLE sessions ADD COLUMN room TEXT")
+
+    # Índices usados pelos filtros de sessão e de período da exportação
+    cursor.execute("CREATE INDEX IF NOT EXISTS commands_session ON commands (session_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS commands_timestamp ON commands (timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS sessions_start_time ON sessions (start_time)")
+
+    conn.commit()
+    conn.close()
+
+    db_path = path
+    return db_path
+
+# Função para salvar as estatísticas de uma sessão
+def save_stats(session, session_end=False):
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Se for primeira vez ou sessão terminando, registrar sessão
+    stats = session.stats
+    if session_end or session.session_id is None:
+        if session_end and session.session_id is not None:
+            # Atualizar sessão existente
+            cursor.execute(
+                "UPDATE sessions SET end_time=?, total_connections=?, total_commands=? WHERE id=?",
+                (
+                    datetime.now().isoformat(),
+                    stats["total_connections"],
+                    stats["commands_executed"],
+                    session.session_id
+                )
+            )
+        else:
+            # Criar nova sessão
+            cursor.execute(
+                "INSERT INTO sessions (start_time, end_time, total_connections, total_commands, room) VALUES (?, ?, ?, ?, ?)",
+                (
+                    datetime.fromtimestamp(stats["start_time"]).isoformat(),
+                    None,
+                    stats["total_connections"],
+                    stats["commands_executed"],
+                    session.room
+                )
+            )
+            session.session_id = cursor.lastrowid
+
+    conn.commit()
+    conn.close()
+
+# Função para fechar sessões que ficaram abertas após uma queda do servidor
+#
+# sessions: lista de (session_id, end_time, total_connections, total_commands),
+# com os valores do último estado conhecido (diário de estado). Só atualiza
+# sessões ainda sem end_time, pela chave primária.
+def close_sessions(sessions):
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "UPDATE sessions SET end_time=?, total_connections=?, total_commands=? WHERE id=? AND end_time IS NULL",
+        [
+            (datetime.fromtimestamp(end_time).isoformat(), connections, commands, session_id)
+            for session_id, end_time, connections, commands in sessions
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+# Função para atualizar os contadores de comandos
+def record_command_stats(session, command):
+    stats = session.stats
+    stats["commands_executed"] += 1
+    stats["command_counts"][command] = stats["command_counts"].get(command, 0) + 1
+
+# Fila de linhas a gravar ("command" ou "dwell", linha): a escrita no SQLite
+# acontece em uma thread separada, em lotes, para não bloquear o loop de
+# eventos a cada comando
+command_queue = queue.Queue()
+writer_thread = None
+
+# Tamanho máximo de um lote de escrita
+WRITE_BATCH_SIZE = 500
+
+queue_depth = metrics.Gauge(
+    "slidecontroller_sqlite_write_queue_depth", "Comandos aguardando gravação no SQLite", command_queue.qsize
+)
+
+# Função para abrir o registro binário dos comandos (motor de estatísticas "binlog")
+#
+# Sessões e tempos de exibição continuam no SQLite; só os comandos, a escrita
+# mais frequente, vão para o registro.
+def open_command_log(directory):
+    global command_log
+    from . import cmdlog
+    command_log = cmdlog.CommandLog(directory)
+    command_log.compact_in_background()
+    return command_log
+
+# Função para registrar um comando no banco de dados (ou no registro binário)
+def save_command(session, command, client_ip, args=None):
+    if command_log is not None:
+        command_log.append(session.session_id, time.time(), command, client_ip, args)
+        return
+    command_queue.put(("command", (
+        session.session_id,
+        datetime.now().isoformat(),
+        command,
+        client_ip,
+        json.dumps(args) if args else None
+    )))
+
+# Função para acompanhar o slide em exibição de uma sessão
+#
+# Quando o slide muda, o tempo de exibição do anterior é enfileirado para a
+# tabela slide_dwell. slide=None encerra a exibição atual (fim da
+# apresentação ou do servidor).
+def track_slide(session, slide):
+    if slide == session.current_slide:
+        return
+    now = time.monotonic()
+    if session.current_slide is not None and session.session_id is not None:
+        command_queue.put(("dwell", (
+            session.session_id,
+            session.room,
+            session.current_slide,
+            datetime.fromtimestamp(session.slide_entered_at).isoformat(),
+            round((now - session.slide_entered) * 1000)
+        )))
+    session.current_slide = slide
+    session.slide_entered = now
+    session.slide_entered_at = time.time()
+
+# Função para gravar um lote de comandos
+def write_commands(rows):
+    import sqlite3
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO commands (session_id, timestamp, command, client_ip, args) VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+    metrics.sqlite_write_latency.observe(time.perf_counter() - started)
+
+# Função para gravar um lote de tempos de exibição
+def write_dwell(rows):
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO slide_dwell (session_id, room, slide, entered_at, dwell_ms) VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.commit()
+    conn.close()
+
+# Função para montar o relatório de tempo por slide
+#
+# Com session_id, de uma sessão; sem ele, de todas as sessões (da sala
+# "room", se informada). Retorna, para cada slide, o número de exibições e a
+# média, a mediana e o total do tempo de exibição em milissegundos. Totais e
+# contagens vêm de um GROUP BY; a mediana, de uma busca no índice ordenado
+# por (slide, dwell_ms), sem ler todas as linhas.
+def dwell_report(session_id=None, room=None):
+    import sqlite3
+    conditions = []
+    params = []
+    if session_id is not None:
+        conditions.append("session_id=?")
+        params.append(session_id)
+    if room is not None:
+        conditions.append("room=?")
+        params.append(room)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    slide_where = f" WHERE {' AND '.join(conditions + ['slide=?'])}"
+
+    conn = sqlite3.connect(db_path)
+    try:
+        groups = conn.execute(
+            f"SELECT slide, COUNT(*), SUM(dwell_ms) FROM slide_dwell{where} GROUP BY slide ORDER BY slide", params
+        ).fetchall()
+        sessions = conn.execute(f"SELECT COUNT(DISTINCT session_id) FROM slide_dwell{where}", params).fetchone()[0]
+
+        slides = []
+        for slide, views, total in groups:
+            # Um elemento do meio (quantidade ímpar) ou os dois do meio (par)
+            middle = conn.execute(
+                f"SELECT dwell_ms FROM slide_dwell{slide_where} ORDER BY dwell_ms LIMIT ? OFFSET ?",
+                params + [slide, 2 - views % 2, (views - 1) // 2]
+            ).fetchall()
+            slides.append({
+                "slide": slide,
+                "views": views,
+                "mean_ms": round(total / views),
+                "median_ms": round(sum(value for value, in middle) / len(middle)),
+                "total_ms": total,
+            })
+    finally:
+        conn.close()
+    return {"session": session_id, "room": room, "sessions": sessions, "slides": slides}
+
+# Função para formatar o relatório de tempo por slide como tabela (--dwell-report)
+def format_dwell_report(report):
+    if report["session"] is not None:
+        title = f"Tempo por slide da sessão {report['session']}"
+    else:
+        title = f"Tempo por slide em {report['sessions']} sessão(ões)"
+        if report["room"] is not None:
+            title += f" da sala '{report['room']}'"
+    if not report["slides"]:
+        return f"{title}: nenhum registro"
+
+    lines = [title, f"{'slide':>6} {'exibições':>10} {'média':>10} {'mediana':>10} {'total':>10}"]
+    for entry in report["slides"]:
+        lines.append(
+            f"{entry['slide']:>6} {entry['views']:>10} {entry['mean_ms'] / 1000:>9.1f}s "
+            f"{entry['median_ms'] / 1000:>9.1f}s {entry['total_ms'] / 1000:>9.1f}s"
+        )
+    return "\n".join(lines)
+
+# Thread que esvazia a fila de comandos em lotes
+def command_writer():
+    while True:
+        row = command_queue.get()
+        if row is None:
+            break
+        rows = [row]
+        stop = False
+        while len(rows) < WRITE_BATCH_SIZE:
+            try:
+                row = command_queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is None:
+                stop = True
+                break
+            rows.append(row)
+        try:
+            commands = [values for kind, values in rows if kind == "command"]
+            if commands:
+                write_commands(commands)
+            dwell = [values for kind, values in rows if kind == "dwell"]
+            if dwell:
+                write_dwell(dwell)
+        except Exception as e:
+            logger.error(f"Erro ao gravar comandos no banco de dados: {e}")
+        if stop:
+            break
+
+# Funções para iniciar e encerrar a thread de escrita (o encerramento grava o que restou na fila)
+def start_command_writer():
+    global writer_thread
+    writer_thread = threading.Thread(target=command_writer, name="stats-writer")
+    writer_thread.daemon = True
+    writer_thread.start()
+
+def stop_command_writer():
+    global command_log
+    if writer_thread is not None and writer_thread.is_alive():
+        command_queue.put(None)
+        writer_thread.join(5.0)
+    if command_log is not None:
+        command_log.close()
+        command_log = None
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger("presentation-controller")
+
+# Rastreamento por mensagem: cada mensagem amostrada vira um conjunto de
+# spans (decodificação, validação, estatísticas, fila, injeção das teclas,
+# resposta) gravados no formato Trace Event do Chrome (eventos "X"), que pode
+# ser aberto no Perfetto (ui.perfetto.dev) ou em chrome://tracing.
+
+# Gravador atual (None quando o rastreamento está desativado)
+writer = None
+sample_rate = 0.0
+
+# Rastreamento em andamento no loop de eventos (para spans dentro dos backends)
+current_trace = None
+
+# Nas threads de injeção das teclas, os spans dos backends vão para o
+# rastreamento do comando que iniciou a injeção (call_traced), e não para
+# current_trace, que é do loop de eventos
+_loop_thread = threading.get_ident()
+_thread = threading.local()
+
+_pid = os.getpid()
+
+# Função para converter perf_counter em microssegundos
+def _us(instant):
+    return round(instant * 1_000_000, 1)
+
+# Arquivo de rastreamento com rotação por tamanho
+class TraceWriter:
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.file = None
+        self.size = 0
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, "w", encoding="utf-8")
+        # O formato aceita o array sem o "]" final, o que permite gravar incrementalmente
+        self.file.write("[\n")
+        self.size = 2
+
+    def _rotate(self):
+        self.file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self._open()
+
+    def write(self, events):
+        data = "".join(json.dumps(event, ensure_ascii=False) + ",\n" for event in events)
+        if self.size + len(data) > self.max_bytes:
+            self._rotate()
+        self.file.write(data)
+        self.file.flush()
+        self.size += len(data)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+# Rastreamento de uma mensagem
+class Trace:
+    def __init__(self, name, tid, args):
+        self.name = name
+        self.tid = tid
+        self.args = args
+        self.start = time.perf_counter()
+        self.events = []
+
+    def add_span(self, name, start, end, args=None):
+        event = {
+            "name": name, "ph": "X", "pid": _pid, "tid": self.tid,
+            "ts": _us(start), "dur": _us(end - start),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.perf_counter(), args)
+
+    def finish(self, **args):
+        self.args.update(args)
+        self.add_span(self.name, self.start, time.perf_counter(), self.args)
+        if writer is not None:
+            try:
+                writer.write(self.events)
+            except OSError as e:
+                logger.error(f"Erro ao gravar rastreamento: {e}")
+
+# Função para configurar o rastreamento (taxa entre 0 e 1)
+def configure(path, rate, max_bytes=10 * 1024 * 1024, backups=3):
+    global writer, sample_rate
+    sample_rate = rate
+    if rate > 0:
+        writer = TraceWriter(path, max_bytes, backups)
+        logger.info(f"Rastreamento de {rate:.0%} das mensagens em {path}")
+
+def shutdown():
+    global writer
+    if writer is not None:
+        writer.close()
+        writer = None
+
+# Função para iniciar o rastreamento de uma mensagem (None se não amostrada)
+def begin(name, tid, **args):
+    if sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+        return None
+    return Trace(name, tid, args)
+
+# Contexto vazio reutilizado quando a mensagem não é rastreada
+_null_span = nullcontext()
+
+# Span dentro do rastreamento em andamento (não faz nada se não houver)
+def span(name, **args):
+    trace = current_trace if threading.get_ident() == _loop_thread else getattr(_thread, "trace", None)
+    if trace is None:
+        return _null_span
+    return trace.span(name, **args)
+
+# Função para executar func em uma thread com os spans no rastreamento informado
+def call_traced(trace, func, *args):
+    _thread.trace = trace
+    try:
+        return func(*args)
+    finally:
+        _thread.trace = None
@@ -0,0 +1,236 @@
+import struct
+
+# Protocolo binário compacto, negociado como subprotocolo WebSocket
+#
+# Clientes que não pedem nenhum subprotocolo (ou pedem "slidecontroller.json")
+# continuam usando JSON. Com "slidecontroller.state", também em JSON, os textos
+# de status dão lugar ao estado da sala e seus deltas versionados (state.py).
+# Com "slidecontroller.bin", cada mensagem é um frame
+# binário: um byte de opcode seguido de argumentos em varint (LEB128; valores
+# com sinal em zigzag). As respostas trazem um código numérico de resultado
+# no lugar do texto.
+#
+# Cliente -> servidor:
+#   01 NEXT_SLIDE          02 PREV_SLIDE          03 START_PRESENTATION
+#   04 END_PRESENTATION    05 BLANK_SCREEN        06 SKIP_SLIDES <count zigzag>
+#   07 GOTO_SLIDE <number> 08 TIMER_START         09 TIMER_STOP
+#   0A TIMER_RESET         0B PUBLISH_NOTES <tamanho> <utf-8>
+#   0C heartbeat <timestamp>
+#   0D AUTO_ADVANCE_START <loop 0/1> <slides> <intervalo ms> <n> <duração ms>*n
+#      (0 em slides, intervalo ou n: não informado)
+#   0E AUTO_ADVANCE_PAUSE  0F AUTO_ADVANCE_RESUME  10 AUTO_ADVANCE_SKIP
+#   11 AUTO_ADVANCE_STOP
+#
+# Servidor -> cliente:
+#   80 <código> <slide>    resultado de um comando (slide atual da sala)
+#   81 <clientes>          clientes conectados na sala
+#   82 <segundos>          tempo decorrido do temporizador
+#   83                     tempo da apresentação esgotado
+#   84 <timestamp>         ping
+#   85                     conectado (boas-vindas)
+#   86                     servidor sendo desligado
+#   87 <código>            erro de conexão (limite de clientes, sala inexistente)
+#   0C <timestamp>         eco do heartbeat (o mesmo frame enviado pelo cliente)
+
+JSON_SUBPROTOCOL = "slidecontroller.json"
+BINARY_SUBPROTOCOL = "slidecontroller.bin"
+STATE_SUBPROTOCOL = "slidecontroller.state"
+SUBPROTOCOLS = [BINARY_SUBPROTOCOL, STATE_SUBPROTOCOL, JSON_SUBPROTOCOL]
+
+# Função para escolher o subprotocolo na abertura da conexão
+#
+# Diferente do padrão do websockets, clientes que não oferecem subprotocolo
+# (ou oferecem apenas outros) não são recusados: continuam sem subprotocolo, em JSON.
+def select_subprotocol(connection, subprotocols):
+    for subprotocol in SUBPROTOCOLS:
+        if subprotocol in subprotocols:
+            return subprotocol
+    return None
+
+# Opcodes dos comandos
+COMMAND_OPCODES = {
+    0x01: "NEXT_SLIDE",
+    0x02: "PREV_SLIDE",
+    0x03: "START_PRESENTATION",
+    0x04: "END_PRESENTATION",
+    0x05: "BLANK_SCREEN",
+    0x06: "SKIP_SLIDES",
+    0x07: "GOTO_SLIDE",
+    0x08: "TIMER_START",
+    0x09: "TIMER_STOP",
+    0x0A: "TIMER_RESET",
+    0x0B: "PUBLISH_NOTES",
+    0x0D: "AUTO_ADVANCE_START",
+    0x0E: "AUTO_ADVANCE_PAUSE",
+    0x0F: "AUTO_ADVANCE_RESUME",
+    0x10: "AUTO_ADVANCE_SKIP",
+    0x11: "AUTO_ADVANCE_STOP",
+}
+OPCODES = {command: opcode for opcode, command in COMMAND_OPCODES.items()}
+HEARTBEAT = 0x0C
+
+# Opcodes das mensagens do servidor
+RESULT = 0x80
+CLIENTS = 0x81
+TIMER = 0x82
+TIMER_EXPIRED = 0x83
+PING = 0x84
+WELCOME = 0x85
+SHUTDOWN = 0x86
+ERROR = 0x87
+
+# Códigos de resultado (o texto correspondente continua sendo enviado aos clientes JSON)
+NEXT_SLIDE_OK = 0
+PREV_SLIDE_OK = 1
+PRESENTATION_STARTED = 2
+PRESENTATION_ENDED = 3
+SCREEN_BLANKED = 4
+SLIDES_SKIPPED = 5
+GOTO_SLIDE_OK = 6
+TIMER_STARTED = 7
+TIMER_ALREADY_ACTIVE = 8
+TIMER_STOPPED = 9
+TIMER_NOT_ACTIVE = 10
+TIMER_RESET = 11
+NOTES_PUBLISHED = 12
+AUTO_ADVANCE_STARTED = 13
+AUTO_ADVANCE_PAUSED = 14
+AUTO_ADVANCE_RESUMED = 15
+AUTO_ADVANCE_SKIPPED = 16
+AUTO_ADVANCE_STOPPED = 17
+AUTO_ADVANCE_NOT_ACTIVE = 18
+NAVIGATION_MERGED = 19
+
+# Códigos de erro
+ERROR_MISSING_COUNT = 64
+ERROR_INVALID_SLIDE = 65
+ERROR_INVALID_NOTES = 66
+ERROR_UNKNOWN_COMMAND = 67
+ERROR_INTERNAL = 68
+ERROR_INVALID_MESSAGE = 69
+ERROR_MAX_CLIENTS = 70
+ERROR_ROOM_NOT_FOUND = 71
+ERROR_RATE_LIMITED = 72
+ERROR_INVALID_AUTO_ADVANCE = 73
+ERROR_INVALID_VERSION = 74
+ERROR_STALE_VERSION = 75
+ERROR_NAVIGATION_LOCKED = 76
+
+# Maior lista aceita em um comando binário (a validação do esquema aplica o limite real)
+MAX_VARINT_LIST = 4096
+
+# Função para codificar um inteiro sem sinal em varint
+def encode_varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+# Função para ler um varint a partir de "offset"; retorna (valor, próximo offset)
+def decode_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data) or shift > 63:
+            raise ValueError("varint truncado")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+def zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+# Função para decodificar um comando binário no mesmo formato do JSON ({"command": ..., ...})
+def decode_command(data):
+    if not data:
+        raise ValueError("mensagem vazia")
+    opcode = data[0]
+    if opcode == HEARTBEAT:
+        timestamp, _ = decode_varint(data, 1)
+        return {"heartbeat": timestamp}
+
+    command = COMMAND_OPCODES.get(opcode)
+    if command is None:
+        raise ValueError(f"opcode desconhecido: {opcode:#04x}")
+    if command == "SKIP_SLIDES":
+        count, _ = decode_varint(data, 1)
+        return {"command": command, "count": unzigzag(count)}
+    if command == "GOTO_SLIDE":
+        number, _ = decode_varint(data, 1)
+        return {"command": command, "number": number}
+    if command == "PUBLISH_NOTES":
+        length, offset = decode_varint(data, 1)
+        if offset + length > len(data):
+            raise ValueError("notas truncadas")
+        return {"command": command, "notes": bytes(data[offset:offset + length]).decode("utf-8")}
+    if command == "AUTO_ADVANCE_START":
+        values = []
+        offset = 1
+        for _ in range(4):
+            value, offset = decode_varint(data, offset)
+            values.append(value)
+        loop, slides, interval, count = values
+        if count > MAX_VARINT_LIST:
+            raise ValueError("lista de durações muito longa")
+        durations = []
+        for _ in range(count):
+            value, offset = decode_varint(data, offset)
+            durations.append(value / 1000)
+        decoded = {"command": command, "loop": bool(loop)}
+        if slides:
+            decoded["slides"] = slides
+        if interval:
+            decoded["interval"] = interval / 1000
+        if durations:
+            decoded["durations"] = durations
+        return decoded
+    return {"command": command}
+
+# Função para codificar um comando (usada por clientes e benchmarks)
+def encode_command(command, **args):
+    opcode = OPCODES[command]
+    if command == "SKIP_SLIDES":
+        return bytes((opcode,)) + encode_varint(zigzag(args["count"]))
+    if command == "GOTO_SLIDE":
+        return bytes((opcode,)) + encode_varint(args["number"])
+    if command == "PUBLISH_NOTES":
+        notes = args["notes"].encode("utf-8")
+        return bytes((opcode,)) + encode_varint(len(notes)) + notes
+    if command == "AUTO_ADVANCE_START":
+        durations = args.get("durations") or []
+        values = [
+            int(args.get("loop", False)), args.get("slides") or 0,
+            round((args.get("interval") or 0) * 1000), len(durations)
+        ] + [round(duration * 1000) for duration in durations]
+        return bytes((opcode,)) + b"".join(encode_varint(value) for value in values)
+    return bytes((opcode,))
+
+# Respostas de um byte por código (códigos e slides pequenos são o caso comum)
+_small = struct.Struct("BBB")
+
+# Função para codificar o resultado de um comando
+def encode_result(code, slide):
+    if code < 0x80 and slide < 0x80:
+        return _small.pack(RESULT, code, slide)
+    return bytes((RESULT,)) + encode_varint(code) + encode_varint(slide)
+
+# Função para codificar uma mensagem do servidor com argumentos opcionais
+def encode_event(opcode, *values):
+    return bytes((opcode,)) + b"".join(encode_varint(value) for value in values)
+
+# Função para decodificar uma mensagem do servidor; retorna (opcode, [valores])
+def decode_event(data):
+    values = []
+    offset = 1
+    while offset < len(data):
+        value, offset = decode_varint(data, offset)
+        values.append(value)
+    return data[0], values
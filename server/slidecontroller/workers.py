@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+import websockets
+
+from . import codec, follow, rooms
+
+logger = logging.getLogger("presentation-controller")
+
+# Workers de espectadores: para plateias muito grandes, N processos dividem
+# as conexões dos espectadores em uma porta compartilhada (SO_REUSEPORT, o
+# kernel distribui as conexões entre eles). O processo principal continua
+# atendendo os apresentadores e injetando as teclas; a cada mudança ele envia
+# o estado serializado uma única vez para os workers por um socket Unix, e
+# cada worker faz o fan-out para os seus espectadores.
+#
+# Protocolo do socket (uma linha por mensagem, campos separados por tab):
+#   R <json {sala: código}>   salas existentes (enviado na conexão do worker)
+#   S <sala> <estado>          estado serializado de uma sala
+
+# Limite de uma linha do socket (bytes)
+LINE_LIMIT = 1024 * 1024
+
+# Lado do processo principal: inicia os workers e repassa os estados
+class WorkerHub:
+    def __init__(self, count, host, port, max_followers):
+        self.count = count
+        self.host = host
+        self.port = port
+        self.max_followers = max_followers
+        self.directory = None
+        self.server = None
+        self.writers = set()
+        self.processes = []
+
+    async def start(self):
+        self.directory = tempfile.mkdtemp(prefix="slidecontroller-")
+        path = os.path.join(self.directory, "follow.sock")
+        self.server = await asyncio.start_unix_server(self.handle_worker, path)
+
+        # "spawn" em vez de fork: o processo principal já tem threads e um loop em execução
+        context = multiprocessing.get_context("spawn")
+        for index in range(self.count):
+            process = context.Process(
+                target=worker_main, args=(path, self.host, self.port, self.max_followers, index),
+                name=f"follow-worker-{index}"
+            )
+            process.daemon = True
+            process.start()
+            self.processes.append(process)
+
+        follow.relays.append(self.relay)
+        logger.info(f"{self.count} worker(s) de espectadores em {self.host}:{self.port}")
+
+    async def handle_worker(self, reader, writer):
+        directory = {room.name: room.join_code for room in rooms.rooms.values()}
+        writer.write(f"R\t{json.dumps(directory)}\n".encode())
+        for room in rooms.rooms.values():
+            writer.write(f"S\t{room.name}\t{codec.dumps(follow.room_snapshot(room))}\n".encode())
+        self.writers.add(writer)
+        try:
+            # O worker não envia nada; EOF significa que ele terminou
+            await reader.read()
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    def relay(self, room, message):
+        line = f"S\t{room.name}\t{message}\n".encode()
+        for writer in self.writers:
+            writer.write(line)
+
+    async def stop(self):
+        if self.relay in follow.relays:
+            follow.relays.remove(self.relay)
+
+        # Fechar o socket faz os workers desconectarem seus espectadores e encerrarem
+        for writer in list(self.writers):
+            writer.close()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+        for process in self.processes:
+            await asyncio.to_thread(process.join, 5)
+            if process.is_alive():
+                process.terminate()
+        if self.directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+# Lado do worker: recebe os estados e atende os espectadores
+async def run_worker(path, host, port, max_followers, index):
+    reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+
+    # Registrar as salas antes de aceitar conexões
+    kind, _, rest = (await reader.readline()).decode().rstrip("\n").partition("\t")
+    if kind != "R":
+        logger.error("Worker de espectadores: resposta inesperada do processo principal")
+        return
+    for name, join_code in json.loads(rest).items():
+        rooms.add_room(name, None, join_code)
+
+    async def handle_connection(websocket):
+        client_info = f"{websocket.remote_address[0]}:{websocket.remote_address[1]}"
+        room, _ = rooms.find_room(websocket.request.path)
+        if room is None:
+            await websocket.send(codec.dumps({
+                "status": "Erro: Sala não encontrada",
+                "error": "ROOM_NOT_FOUND"
+            }))
+            return
+        await follow.handle_follower(websocket, room, max_followers, client_info, refresh=False)
+
+    server = await websockets.serve(handle_connection, host, port, reuse_port=True, compression=None)
+    logger.info(f"Aceitando espectadores em {host}:{port} (pid {os.getpid()})")
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            kind, _, rest = line.decode().rstrip("\n").partition("\t")
+            if kind == "S":
+                name, _, message = rest.partition("\t")
+                room = rooms.rooms.get(name)
+                if room is not None:
+                    follow.deliver(room, message)
+    finally:
+        # Processo principal encerrado: avisar e desconectar os espectadores
+        followers = [websocket for room in rooms.rooms.values() for websocket in room.followers]
+        follow.broadcast(followers, codec.dumps({"status": "Servidor sendo desligado", "server_shutdown": True}))
+        server.close()
+        await server.wait_closed()
+        writer.close()
+
+# Ponto de entrada do processo worker
+def worker_main(path, host, port, max_followers, index):
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s [%(levelname)s] [worker {index}] %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+    try:
+        asyncio.run(run_worker(path, host, port, max_followers, index))
+    except KeyboardInterrupt:
+        # Ctrl+C chega a todo o grupo de processos; o principal encerra os workers
+        pass
@@ -0,0 +1,6 @@
+# Testes do servidor: python -m pytest tests (a partir de server/)
+import os
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+import zlib
+
+import pytest
+
+from slidecontroller import cmdlog, stats, wire
+
+
+def test_gravar_e_ler(tmp_path):
+    log = cmdlog.CommandLog(str(tmp_path))
+    log.append(7, 1000.5, "NEXT_SLIDE", "192.168.0.10")
+    log.append(7, 1001.0, "SKIP_SLIDES", "192.168.0.10", {"count": -3})
+    log.append(7, 1002.0, "GOTO_SLIDE", "10.0.0.7", {"number": 12})
+    log.append(None, 1003.0, "COMANDO_NOVO", "auto")
+    log.close()
+
+    records = list(cmdlog.read_records(str(tmp_path)))
+    assert records == [
+        (1000.5, 7, wire.OPCODES["NEXT_SLIDE"], 0, zlib.crc32(b"192.168.0.10"), 0),
+        (1001.0, 7, wire.OPCODES["SKIP_SLIDES"], 0, zlib.crc32(b"192.168.0.10"), -3),
+        (1002.0, 7, wire.OPCODES["GOTO_SLIDE"], 0, zlib.crc32(b"10.0.0.7"), 12),
+        (1003.0, 0, cmdlog.UNKNOWN_COMMAND, 0, zlib.crc32(b"auto"), 0),
+    ]
+
+
+def test_cada_inicio_abre_um_segmento(tmp_path):
+    for session in (1, 2):
+        log = cmdlog.CommandLog(str(tmp_path))
+        log.append(session, 1.0, "NEXT_SLIDE", "a")
+        log.close()
+    segments = cmdlog.list_segments(str(tmp_path))
+    assert [(first, last) for first, last, _ in segments] == [(1, 1), (2, 2)]
+    assert [record[1] for record in cmdlog.read_records(str(tmp_path))] == [1, 2]
+
+
+def test_rotacao_por_tamanho(tmp_path):
+    log = cmdlog.CommandLog(str(tmp_path), segment_bytes=cmdlog.HEADER.size + 10 * cmdlog.RECORD.size)
+    for i in range(25):
+        log.append(1, float(i), "NEXT_SLIDE", "a")
+    log.close()
+    assert len(cmdlog.list_segments(str(tmp_path))) == 3
+    assert [record[0] for record in cmdlog.read_records(str(tmp_path))] == [float(i) for i in range(25)]
+
+
+def test_registro_incompleto_no_fim_e_ignorado(tmp_path):
+    log = cmdlog.CommandLog(str(tmp_path))
+    log.append(1, 1.0, "NEXT_SLIDE", "a")
+    log.append(1, 2.0, "PREV_SLIDE", "a")
+    path = cmdlog.list_segments(str(tmp_path))[0][2]
+    log.close()
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    assert [record[0] for record in cmdlog.read_records(str(tmp_path))] == [1.0, 2.0]
+
+
+def test_segmento_invalido(tmp_path):
+    with open(tmp_path / cmdlog.segment_name(1, 1), "wb") as f:
+        f.write(cmdlog.HEADER.pack(b"OUTROLOG", cmdlog.RECORD.size))
+    with pytest.raises(ValueError):
+        list(cmdlog.read_records(str(tmp_path)))
+
+
+def test_compactacao_junta_segmentos_fechados(tmp_path):
+    for session in range(1, 5):
+        log = cmdlog.CommandLog(str(tmp_path))
+        log.append(session, float(session), "NEXT_SLIDE", "a")
+        log.close()
+    active = cmdlog.CommandLog(str(tmp_path))
+    active.append(5, 5.0, "NEXT_SLIDE", "a")
+
+    assert cmdlog.compact(str(tmp_path), active=active.number) == 4
+    active.close()
+    segments = cmdlog.list_segments(str(tmp_path))
+    assert [(first, last) for first, last, _ in segments] == [(1, 4), (5, 5)]
+    assert [record[1] for record in cmdlog.read_records(str(tmp_path))] == [1, 2, 3, 4, 5]
+
+
+def test_restos_de_compactacao_interrompida(tmp_path):
+    for session in (1, 2):
+        log = cmdlog.CommandLog(str(tmp_path))
+        log.append(session, float(session), "NEXT_SLIDE", "a")
+        log.close()
+    # Simular uma queda depois do segmento juntado e antes de apagar os antigos
+    segments = cmdlog.list_segments(str(tmp_path))
+    with open(tmp_path / cmdlog.segment_name(1, 2), "wb") as out:
+        out.write(cmdlog.HEADER.pack(cmdlog.MAGIC, cmdlog.RECORD.size))
+        for _, _, path in segments:
+            with open(path, "rb") as f:
+                out.write(f.read()[cmdlog.HEADER.size:])
+
+    valid, covered = cmdlog.scan_segments(str(tmp_path))
+    assert [(first, last) for first, last, _ in valid] == [(1, 2)]
+    assert len(covered) == 2
+    assert [record[1] for record in cmdlog.read_records(str(tmp_path))] == [1, 2]
+
+    cmdlog.compact(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == [cmdlog.segment_name(1, 2)]
+
+
+def test_conversao_para_sqlite(tmp_path):
+    directory = str(tmp_path / "cmdlog")
+    log = cmdlog.CommandLog(directory)
+    log.append(3, 1000.0, "NEXT_SLIDE", "192.168.0.10")
+    log.append(3, 1001.0, "GOTO_SLIDE", "192.168.0.10", {"number": 4})
+    log.close()
+    db_path = str(tmp_path / "stats.db")
+    stats.init_stats_db(db_path)
+
+    assert cmdlog.convert_to_sqlite(directory, db_path, batch_size=1) == 2
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT session_id, command, client_ip, args FROM commands ORDER BY id").fetchall()
+    conn.close()
+    client = f"hash:{zlib.crc32(b'192.168.0.10'):08x}"
+    assert rows == [(3, "NEXT_SLIDE", client, None), (3, "GOTO_SLIDE", client, json.dumps({"number": 4}))]
+
+    # Os segmentos convertidos são apagados: uma nova conversão não duplica os comandos
+    assert cmdlog.list_segments(directory) == []
+    assert cmdlog.convert_to_sqlite(directory, db_path) == 0
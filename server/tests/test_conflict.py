@@ -0,0 +1,135 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from slidecontroller import conflict, wire
+from slidecontroller.conflict import LOCKED, MERGED, STALE, NavigationPolicy
+
+
+# Relógio controlado pelos testes (conflict usa time.monotonic)
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(conflict.time, "monotonic", lambda: now[0])
+    return now
+
+
+def client(address):
+    return SimpleNamespace(remote_address=(address, 50000))
+
+
+def room(slide_version=5, state_version=7):
+    return SimpleNamespace(slide_version=slide_version, state_version=state_version)
+
+
+NEXT = {"command": "NEXT_SLIDE"}
+
+
+def test_politica_desconhecida():
+    with pytest.raises(ValueError):
+        NavigationPolicy("primeiro-vence")
+
+
+def test_none_aplica_tudo(clock):
+    policy = NavigationPolicy("none")
+    a = client("10.0.0.1")
+    assert policy.check(room(), a, "NEXT_SLIDE", {"command": "NEXT_SLIDE", "version": 0}) is None
+
+
+def test_comandos_sem_versao_de_navegacao_ignorados(clock):
+    policy = NavigationPolicy("lease")
+    a, b = client("10.0.0.1"), client("10.0.0.2")
+    policy.applied(a, "NEXT_SLIDE", NEXT)
+    assert policy.check(room(), b, "TIMER_START", {"command": "TIMER_START"}) is None
+
+
+def test_reject_stale(clock):
+    policy = NavigationPolicy("reject-stale")
+    a = client("10.0.0.1")
+    r = room(slide_version=5)
+    assert policy.check(r, a, "NEXT_SLIDE", {"command": "NEXT_SLIDE", "version": 4}) == STALE
+    assert policy.check(r, a, "NEXT_SLIDE", {"command": "NEXT_SLIDE", "version": 5}) is None
+    assert policy.check(r, a, "NEXT_SLIDE", {"command": "NEXT_SLIDE", "version": 9}) is None
+    # Sem versão, nunca é recusado por versão
+    assert policy.check(r, a, "NEXT_SLIDE", NEXT) is None
+
+
+def test_merge_window_combina_toques_simultaneos(clock):
+    policy = NavigationPolicy("merge-window", window=0.5)
+    a, b = client("10.0.0.1"), client("10.0.0.2")
+    r = room(slide_version=5)
+    policy.applied(a, "NEXT_SLIDE", NEXT)
+    r.slide_version = 6
+
+    clock[0] += 0.3
+    # Mesmo comando, de outro controle, que não tinha visto o anterior
+    assert policy.check(r, b, "NEXT_SLIDE", {"command": "NEXT_SLIDE", "version": 5}) == MERGED
+    assert policy.check(r, b, "NEXT_SLIDE", NEXT) == MERGED
+    # O mesmo controle, ou quem já viu o comando anterior, navega de novo
+    assert policy.check(r, a, "NEXT_SLIDE", NEXT) is None
+    assert policy.check(r, b, "NEXT_SLIDE", {"command": "NEXT_SLIDE", "version": 6}) is None
+    # Comando ou argumentos diferentes não são combinados
+    assert policy.check(r, b, "PREV_SLIDE", {"command": "PREV_SLIDE"}) is None
+    assert policy.check(r, b, "PREV_SLIDE", {"command": "PREV_SLIDE", "version": 5}) == STALE
+
+    clock[0] += 0.3
+    assert policy.check(r, b, "NEXT_SLIDE", NEXT) is None
+    assert policy.check(r, b, "NEXT_SLIDE", {"command": "NEXT_SLIDE", "version": 5}) == STALE
+
+
+def test_merge_window_compara_argumentos(clock):
+    policy = NavigationPolicy("merge-window")
+    a, b = client("10.0.0.1"), client("10.0.0.2")
+    policy.applied(a, "GOTO_SLIDE", {"command": "GOTO_SLIDE", "number": 4})
+    assert policy.check(room(), b, "GOTO_SLIDE", {"command": "GOTO_SLIDE", "number": 4}) == MERGED
+    assert policy.check(room(), b, "GOTO_SLIDE", {"command": "GOTO_SLIDE", "number": 5}) is None
+
+
+def test_lease(clock):
+    policy = NavigationPolicy("lease", lease=3.0, priorities={"10.0.0.9": 5})
+    a, b, moderator = client("10.0.0.1"), client("10.0.0.2"), client("10.0.0.9")
+    r = room()
+    policy.applied(a, "NEXT_SLIDE", NEXT)
+
+    clock[0] += 2.0
+    assert policy.check(r, b, "NEXT_SLIDE", NEXT) == LOCKED
+    assert policy.check(r, a, "NEXT_SLIDE", NEXT) is None
+    # Cada comando do dono renova a posse
+    policy.applied(a, "NEXT_SLIDE", NEXT)
+    clock[0] += 2.0
+    assert policy.check(r, b, "NEXT_SLIDE", NEXT) == LOCKED
+
+    # Prioridade maior passa por cima e fica com a posse
+    assert policy.check(r, moderator, "PREV_SLIDE", {"command": "PREV_SLIDE"}) is None
+    policy.applied(moderator, "PREV_SLIDE", {"command": "PREV_SLIDE"})
+    assert policy.check(r, a, "NEXT_SLIDE", NEXT) == LOCKED
+
+    # A posse expira
+    clock[0] += 3.1
+    assert policy.check(r, b, "NEXT_SLIDE", NEXT) is None
+
+
+def test_lease_liberada_ao_desconectar(clock):
+    policy = NavigationPolicy("lease")
+    a, b = client("10.0.0.1"), client("10.0.0.2")
+    policy.applied(a, "NEXT_SLIDE", NEXT)
+    policy.release(b)
+    assert policy.check(room(), b, "NEXT_SLIDE", NEXT) == LOCKED
+    policy.release(a)
+    assert policy.check(room(), b, "NEXT_SLIDE", NEXT) is None
+
+
+def test_lease_tambem_recusa_versao_antiga(clock):
+    policy = NavigationPolicy("lease")
+    a = client("10.0.0.1")
+    assert policy.check(room(slide_version=5), a, "NEXT_SLIDE", {"command": "NEXT_SLIDE", "version": 3}) == STALE
+
+
+def test_resposta_json_dos_conflitos():
+    r = room(state_version=12)
+    stale = json.loads(conflict.conflict_message(r, STALE))
+    assert stale["error"] == "STALE_VERSION" and stale["version"] == 12
+    merged = json.loads(conflict.conflict_message(r, MERGED))
+    assert "error" not in merged and merged["version"] == 12
+    assert conflict.OUTCOMES[LOCKED][0] == wire.ERROR_NAVIGATION_LOCKED
@@ -0,0 +1,168 @@
+import asyncio
+
+from slidecontroller import scheduler as scheduler_module
+from slidecontroller.scheduler import Scheduler
+
+
+# Função para executar um teste no loop, com um agendador novo
+def run(test):
+    async def main():
+        scheduler = Scheduler()
+        try:
+            await test(scheduler)
+        finally:
+            scheduler.stop()
+    asyncio.run(main())
+
+
+def test_ordem_dos_prazos():
+    async def test(scheduler):
+        order = []
+        scheduler.call_later(0.03, order.append, "c")
+        scheduler.call_later(0.01, order.append, "a")
+        scheduler.call_later(0.02, order.append, "b")
+        scheduler.call_later(0.02, order.append, "b2")
+        await asyncio.sleep(0.08)
+        assert order == ["a", "b", "b2", "c"]
+        assert scheduler.pending() == 0
+    run(test)
+
+
+def test_folga_junta_despertares():
+    async def test(scheduler):
+        ran = {}
+        start = scheduler.time()
+        # "folgada" vence antes, mas pode esperar até 0,1 s: roda junto com "fixa"
+        scheduler.call_later(0.01, lambda: ran.setdefault("folgada", scheduler.time()), slack=0.1)
+        scheduler.call_later(0.05, lambda: ran.setdefault("fixa", scheduler.time()))
+        await asyncio.sleep(0.02)
+        assert ran == {}
+        await asyncio.sleep(0.08)
+        assert set(ran) == {"folgada", "fixa"}
+        assert ran["folgada"] - start >= 0.05
+        assert abs(ran["folgada"] - ran["fixa"]) < 0.005
+    run(test)
+
+
+def test_folga_sem_outra_tarefa():
+    async def test(scheduler):
+        ran = []
+        start = scheduler.time()
+        scheduler.call_later(0.01, lambda: ran.append(scheduler.time()), slack=0.03)
+        await asyncio.sleep(0.08)
+        assert len(ran) == 1
+        assert 0.01 <= ran[0] - start <= 0.07
+    run(test)
+
+
+def test_cancelamento():
+    async def test(scheduler):
+        ran = []
+        job = scheduler.call_later(0.01, ran.append, "cancelada")
+        scheduler.call_later(0.02, ran.append, "mantida")
+        job.cancel()
+        job.cancel()
+        assert scheduler.pending() == 1
+        await asyncio.sleep(0.05)
+        assert ran == ["mantida"]
+    run(test)
+
+
+def test_cancelar_unica_tarefa_desarma_o_loop():
+    async def test(scheduler):
+        job = scheduler.call_later(10, lambda: None)
+        assert scheduler.handle is not None
+        job.cancel()
+        assert scheduler.handle is None
+        assert scheduler.pending() == 0
+    run(test)
+
+
+def test_cancelada_por_outra_do_mesmo_despertar():
+    async def test(scheduler):
+        ran = []
+        deadline = scheduler.time() + 0.01
+
+        # Como o temporizador que encerra o avanço automático no mesmo despertar
+        def first():
+            ran.append("a")
+            second.cancel()
+
+        scheduler.call_at(deadline, first)
+        second = scheduler.call_at(deadline, ran.append, "b")
+        await asyncio.sleep(0.05)
+        assert ran == ["a"]
+        assert scheduler.pending() == 0
+    run(test)
+
+
+def test_tarefa_periodica():
+    async def test(scheduler):
+        ran = []
+        job = scheduler.every(0.01, ran.append, 1, name="periódica")
+        await asyncio.sleep(0.055)
+        job.cancel()
+        count = len(ran)
+        assert 3 <= count <= 6
+        await asyncio.sleep(0.03)
+        assert len(ran) == count
+    run(test)
+
+
+def test_cancelar_dentro_da_propria_tarefa():
+    async def test(scheduler):
+        ran = []
+
+        def tick():
+            ran.append(1)
+            job.cancel()
+
+        job = scheduler.every(0.01, tick)
+        await asyncio.sleep(0.05)
+        assert ran == [1]
+        assert scheduler.pending() == 0
+    run(test)
+
+
+def test_corrotina_executada_como_tarefa():
+    async def test(scheduler):
+        ran = []
+
+        async def callback(value):
+            await asyncio.sleep(0)
+            ran.append(value)
+
+        scheduler.call_later(0.01, callback, "ok")
+        await asyncio.sleep(0.03)
+        assert ran == ["ok"]
+        assert not scheduler.tasks
+    run(test)
+
+
+def test_erro_na_tarefa_nao_interrompe_as_outras():
+    async def test(scheduler):
+        ran = []
+        scheduler.call_later(0.01, lambda: 1 / 0)
+        scheduler.call_later(0.01, ran.append, "depois")
+        await asyncio.sleep(0.03)
+        assert ran == ["depois"]
+    run(test)
+
+
+def test_canceladas_nao_acumulam_nos_heaps():
+    async def test(scheduler):
+        ran = []
+        scheduler.call_later(0.02, ran.append, "mantida")
+        # Como o avanço automático: cancelar e recriar uma tarefa longa a cada navegação
+        job = None
+        for _ in range(10000):
+            if job is not None:
+                job.cancel()
+            job = scheduler.call_later(86400, ran.append, "longa")
+        assert scheduler.pending() == 2
+        assert len(scheduler.deadlines) <= 2 * scheduler_module.COMPACT_THRESHOLD + 2
+        assert len(scheduler.latest) <= 2 * scheduler_module.COMPACT_THRESHOLD + 2
+        await asyncio.sleep(0.05)
+        assert ran == ["mantida"]
+        assert scheduler.handle is not None
+    run(test)
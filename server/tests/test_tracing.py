@@ -0,0 +1,43 @@
+import asyncio
+
+from slidecontroller import core, rooms, tracing
+from slidecontroller.backends import RecordingBackend
+
+
+def test_spans_das_teclas_injetadas_em_thread():
+    async def main():
+        room = rooms.Room("teste", RecordingBackend())
+        trace = tracing.Trace("message", 1, {})
+        other = tracing.Trace("message", 2, {})
+        try:
+            tracing.current_trace = trace
+            code, _ = core.control_presentation(room, "GOTO_SLIDE", {"number": 12})
+            # Como no handler: o loop passa a rastrear outra mensagem durante a injeção
+            tracing.current_trace = other
+            assert await room.injection is None
+        finally:
+            tracing.current_trace = None
+        return code, room, trace, other
+
+    code, room, trace, other = asyncio.run(main())
+    assert code == core.wire.GOTO_SLIDE_OK
+    keys = [event["args"]["key"] for event in trace.events if event["name"] == "inject_key"]
+    assert keys == ["home", "1", "2", "enter"]
+    assert all(event["args"]["backend"] == "recording" for event in trace.events)
+    assert other.events == []
+    assert [key for _, event, key in room.backend.events if event == "press"] == keys
+
+
+def test_sem_rastreamento_na_thread():
+    async def main():
+        room = rooms.Room("teste", RecordingBackend())
+        core.control_presentation(room, "NEXT_SLIDE", {})
+        # Rastreamento de outra mensagem no loop: não recebe as teclas
+        tracing.current_trace = other = tracing.Trace("message", 2, {})
+        try:
+            await room.injection
+        finally:
+            tracing.current_trace = None
+        return other
+
+    assert asyncio.run(main()).events == []